@@ -67,6 +67,11 @@ REST_FRAMEWORK = {
         'core.authentication.IsAuthenticatedExceptPaths',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Same output as rest_framework.renderers.JSONRenderer, encoded with orjson
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.utils.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -107,8 +112,16 @@ SIMPLE_JWT = {
     'COOKIE_SAMESITE': 'Strict',
 }
 
+# In-process cache of verified access tokens (core.utils.token_cache)
+AUTH_TOKEN_CACHE_SIZE = 1024
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+
 MIDDLEWARE = [
+    'core.middleware.RequestContextMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.QueryDetectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.RateLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -118,6 +131,35 @@ MIDDLEWARE = [
     'core.middleware.DisableAuthForSwaggerMiddleware',
 ]
 
+# Route based rate limits, enforced by core.middleware.RateLimitMiddleware
+# before URL resolution. First matching rule wins.
+RATE_LIMITS = [
+    {'path': r'^/api/login/$', 'methods': ['POST'], 'max_calls': 10, 'period': 60, 'key': 'ip'},
+    {'path': r'^/api/refresh-token/$', 'methods': ['POST'], 'max_calls': 30, 'period': 60, 'key': 'ip'},
+]
+
+# Per route timings and query counts aggregated for /api/_metrics/
+# (core.middleware.RequestMetricsMiddleware). Off by default.
+REQUEST_METRICS = False
+# Also send each request's timings in a Server-Timing response header, which
+# every client can read (database time, query count, ...). Only with
+# REQUEST_METRICS, meant for development.
+SERVER_TIMING = False
+# Bearer token of the scraper reading /api/_metrics/, which staff users can
+# also read with their login cookie. None: staff users only.
+METRICS_TOKEN = None
+
+# Development aid (core.middleware.QueryDetectorMiddleware): log the query
+# shapes run N_PLUS_ONE_THRESHOLD times or more in one request (N+1) and
+# the queries slower than SLOW_QUERY_MS, with the line in core/ that ran
+# them. Always on under core.tests.runner, which fails the API tests whose
+# requests run an N+1.
+QUERY_DETECTOR = False
+N_PLUS_ONE_THRESHOLD = 3
+SLOW_QUERY_MS = 100
+
+TEST_RUNNER = 'core.tests.runner.QueryDetectorTestRunner'
+
 ROOT_URLCONF = 'EvMan.urls'
 
 TEMPLATES = [
@@ -169,6 +211,13 @@ DATABASES = {
 
 
 
+# Largest batch accepted by POST /api/attendees/bulk/
+ATTENDEE_IMPORT_MAX_ROWS = 5000
+
+# Largest batch accepted by POST /api/sessions/bulk/
+SESSION_IMPORT_MAX_ROWS = 1000
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -218,9 +267,21 @@ from pathlib import Path
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 Path(LOG_DIR).mkdir(parents=True, exist_ok=True)
 
+# Log records are written by a background thread (core.utils.log), so a
+# slow disk never stalls a request. The file gets one JSON object per line
+# with the request id and the time elapsed in the request.
+LOG_FILE = os.path.join(LOG_DIR, 'warning_error.log')
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 5
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {
+            '()': 'core.utils.log.RequestContextFilter',
+        },
+    },
     'formatters': {
         'verbose': {
             'format': '{levelname} {asctime} {module} {message}',
@@ -230,13 +291,24 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.utils.log.JSONLinesFormatter',
+        },
     },
     'handlers': {
         'file': {
             'level': 'WARNING',
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(BASE_DIR, 'logs/warning_error.log'),
-            'formatter': 'verbose',
+            '()': 'core.utils.log.BackgroundHandler',
+            'target': {
+                'class': 'logging.handlers.RotatingFileHandler',
+                'filename': LOG_FILE,
+                'maxBytes': LOG_FILE_MAX_BYTES,
+                'backupCount': LOG_FILE_BACKUP_COUNT,
+                'encoding': 'utf-8',
+                'delay': True,
+            },
+            'filters': ['request_context'],
+            'formatter': 'json',
         },
         'console': {
             'level': 'WARNING',
@@ -20,7 +20,7 @@ from django.urls import path
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from core.apis import EventViewSet, SessionViewSet, AttendeeViewSet, TrackViewSet
+from core.apis import EventViewSet, SessionViewSet, AttendeeViewSet, TrackViewSet, MetricsView
 from core.serializers import CustomTokenObtainPairView, CustomTokenRefreshView
 
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
@@ -53,4 +53,5 @@ urlpatterns = [
 
     path("api/login/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/refresh-token/", CustomTokenRefreshView.as_view(), name="token_refresh"),
+    path("api/_metrics/", MetricsView.as_view(), name="metrics"),
 ]
@@ -0,0 +1,76 @@
+"""
+Time to first byte and peak memory of GET /api/attendees/by-event/{id}/.
+
+    python benchmarks/attendee_export.py [attendees]
+
+Runs against a throwaway test database created from the configured one.
+"json" is the regular BaseResponse list, built in memory; "csv" and
+"ndjson" are the streamed exports. Peak memory is measured with tracemalloc
+while the whole body is consumed.
+"""
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'EvMan.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from core.models import Event, Attendee  # noqa: E402
+
+
+def measure(client, url, export_format):
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, {'format': export_format})
+    if response.streaming:
+        chunks = iter(response.streaming_content)
+        size = len(next(chunks))
+        first_byte = time.perf_counter() - start
+        for chunk in chunks:
+            size += len(chunk)
+    else:
+        size = len(response.content)
+        first_byte = time.perf_counter() - start
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_byte * 1e3, total * 1e3, peak / 2**20, size / 2**20
+
+
+if __name__ == '__main__':
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    settings.ALLOWED_HOSTS = ['*']
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        event = Event.objects.create(
+            name="Export", description="Export", venue="Hall",
+            start_date=datetime(2030, 1, 1, 10, 0), end_date=datetime(2030, 1, 1, 18, 0),
+            capacity=total,
+        )
+        Attendee.objects.bulk_create(
+            [Attendee(name=f"Attendee {i}", email=f"attendee{i}@example.com", event=event) for i in range(total)],
+            batch_size=5000,
+        )
+
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username='bench', password='bench'))
+        url = f"/api/attendees/by-event/{event.id}/"
+
+        for export_format in ('json', 'csv', 'ndjson'):
+            first_byte, elapsed, peak, size = measure(client, url, export_format)
+            print(f"{export_format:>6}: first byte {first_byte:8.1f} ms  total {elapsed:8.1f} ms  "
+                  f"peak {peak:7.1f} MiB  body {size:5.1f} MiB")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark of the per-request public path check done by
+JWTCookieAuthentication.authenticate and IsAuthenticatedExceptPaths.has_permission.
+
+    python benchmarks/auth_public_paths.py
+
+"before" replays the previous implementation (two lists of raw patterns,
+re.match in a loop in each class), "after" uses core.authentication.public_paths.
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'EvMan.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from core.authentication import public_paths  # noqa: E402
+
+
+AUTH_PUBLIC_PATHS = [
+    r'^/api/events/[^/]+/details/$',
+    r'^/api/events/current/$',
+    r'^/api/schema/$',
+    r'^/api/docs/$',
+]
+
+PERMISSION_PUBLIC_PATHS = [
+    {'url': r'^/api/events/[^/]+/details/$', 'method': 'GET'},
+    {'url': '/api/attendees/', 'method': 'POST'},
+    {'url': '/api/events/current/', 'method': 'GET'},
+    {'url': '/api/schema/', 'method': 'GET'},
+    {'url': '/api/docs/', 'method': 'GET'},
+]
+
+
+def before(method, path):
+    # JWTCookieAuthentication.authenticate
+    public = method == "POST" and path == "/api/attendees/"
+    if not public:
+        for pattern in AUTH_PUBLIC_PATHS:
+            if re.match(pattern, path):
+                public = True
+                break
+
+    # IsAuthenticatedExceptPaths.has_permission
+    for path_config in PERMISSION_PUBLIC_PATHS:
+        url_pattern = path_config['url']
+        if '{id}' in url_pattern:
+            pattern = url_pattern.replace('{id}', '[^/]+')
+            if re.match(pattern, path) and method == path_config['method']:
+                return True
+        elif re.match(url_pattern, path) and method == path_config['method']:
+            return True
+    return public
+
+
+def after(method, path):
+    # Same registry consulted by both classes
+    public_paths.is_public(method, path)
+    return public_paths.is_public(method, path)
+
+
+REQUESTS = [
+    ('GET', '/api/events/current/'),
+    ('GET', '/api/events/3fa85f64-5717-4562-b3fc-2c963f66afa6/'),
+    ('GET', '/api/sessions/'),
+    ('POST', '/api/attendees/'),
+    ('GET', '/api/tracks/3fa85f64-5717-4562-b3fc-2c963f66afa6/'),
+]
+
+
+def run(func, number=20000):
+    def loop():
+        for method, path in REQUESTS:
+            func(method, path)
+
+    best = min(timeit.repeat(loop, number=number, repeat=5))
+    return best / (number * len(REQUESTS)) * 1e6
+
+
+if __name__ == '__main__':
+    before_us = run(before)
+    after_us = run(after)
+    print(f"before: {before_us:.3f} us/request")
+    print(f"after:  {after_us:.3f} us/request")
+    print(f"speedup: {before_us / after_us:.1f}x")
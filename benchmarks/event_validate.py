@@ -0,0 +1,75 @@
+"""
+EventSerializer.validate's 3 days gap and overlap rules as two queries
+(latest event row, then an overlap EXISTS) vs core.utils.validation's
+event_timeline(), at 1k, 10k and 50k past events.
+
+    python benchmarks/event_validate.py
+
+Runs against a throwaway test database created from the configured one.
+The candidate is a new event placed after the others, as on creation, and
+an update of an event in the middle of the history. Timings are the best
+of 5 runs, per validation.
+"""
+import os
+import sys
+import timeit
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'EvMan.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from core.models import Event  # noqa: E402
+from core.utils.validation import event_timeline  # noqa: E402
+
+SIZES = (1000, 10000, 50000)
+BASE = timezone.now().replace(microsecond=0) - timedelta(days=200000)
+
+
+def seed(start, stop):
+    Event.objects.bulk_create([
+        Event(name=f"Event {i}", description="Past", venue="Hall", capacity=10,
+              start_date=BASE + timedelta(days=4 * i), end_date=BASE + timedelta(days=4 * i, hours=8))
+        for i in range(start, stop)
+    ], batch_size=5000)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE core_event")
+
+
+def two_queries(start_date, end_date, exclude_id=None):
+    latest = Event.objects.exclude(id=exclude_id).order_by('-end_date').first()
+    overlaps = Event.objects.filter(start_date__lt=end_date, end_date__gt=start_date).exclude(id=exclude_id).exists()
+    return latest.end_date if latest else None, overlaps
+
+
+def best(check, *args, number=200):
+    return min(timeit.repeat(lambda: check(*args), number=number, repeat=5)) / number * 1e3
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seeded = 0
+        for size in SIZES:
+            seed(seeded, size)
+            seeded = size
+            new_start = BASE + timedelta(days=4 * size + 10)
+            middle = Event.objects.get(name=f"Event {size // 2}")
+            cases = {
+                "create": (new_start, new_start + timedelta(hours=8)),
+                "update": (middle.start_date, middle.end_date + timedelta(hours=1), middle.id),
+            }
+            for name, args in cases.items():
+                assert two_queries(*args) == event_timeline(*args), name
+                before_ms, after_ms = best(two_queries, *args), best(event_timeline, *args)
+                print(f"{size:>6} events  {name:<7} two queries: {before_ms:.3f} ms  "
+                      f"event_timeline: {after_ms:.3f} ms  x{before_ms / after_ms:.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,94 @@
+"""
+DRF's JSONRenderer vs core.utils.renderers.FastJSONRenderer on the payloads
+of GET /api/events/current/ and of a paginated list page.
+
+    python benchmarks/json_renderer.py
+
+Runs against a throwaway test database created from the configured one.
+The payloads are built by the real code paths (the current event loader,
+the session list serializers) and rendered by both renderers, which must
+produce the same bytes. Timings are the best of 5 runs, per render.
+"""
+import os
+import sys
+import timeit
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'EvMan.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from core.models import Event, Track, Session  # noqa: E402
+from core.serializers import SessionSerializer  # noqa: E402
+from core.utils.base_response import BaseResponse  # noqa: E402
+from core.utils.fast_serializers import ValuesSerializer  # noqa: E402
+from core.utils.loaders import load_current_event  # noqa: E402
+from core.utils.renderers import FastJSONRenderer, orjson  # noqa: E402
+
+
+def seed(tracks=10, sessions_per_track=20):
+    now = timezone.now()
+    event = Event.objects.create(
+        name="Current", description="Description " * 20, venue="Hall", capacity=1000,
+        start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=8),
+    )
+    created = Track.objects.bulk_create([Track(name=f"Track {i}", event=event) for i in range(tracks)])
+    Session.objects.bulk_create([
+        Session(title=f"Talk {t}.{s}", description="Abstract " * 30, speaker=f"Speaker {s}",
+                event=event, track=track,
+                start_time=event.start_date + timedelta(minutes=20 * s),
+                end_time=event.start_date + timedelta(minutes=20 * s + 15))
+        for t, track in enumerate(created) for s in range(sessions_per_track)
+    ])
+    return now
+
+
+def payloads(now, page_size=100):
+    current = BaseResponse.success_response(
+        data=load_current_event(now), message="Event details retrieved successfully"
+    )
+    queryset = Session.objects.order_by('start_time', 'id')[:page_size]
+    fast = ValuesSerializer.for_serializer(SessionSerializer)
+
+    def page(data):
+        return {
+            "count": Session.objects.count(),
+            "next": "http://testserver/api/sessions/?page=2",
+            "previous": None,
+            "results": BaseResponse.success_response(data=data, message="Sessions retrieved successfully"),
+        }
+
+    return {
+        "current event": current,
+        f"list page ({page_size}, serializer)": page(SessionSerializer(queryset, many=True).data),
+        f"list page ({page_size}, values)": page(fast.serialize(queryset.values(*fast.columns))),
+    }
+
+
+def best(renderer, data, number=200):
+    return min(timeit.repeat(lambda: renderer.render(data), number=number, repeat=5)) / number * 1e3
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        now = seed()
+        print(f"orjson: {orjson.__version__ if orjson else 'not installed, stdlib fallback'}")
+        for name, data in payloads(now).items():
+            before, after = JSONRenderer(), FastJSONRenderer()
+            content = before.render(data)
+            assert after.render(data) == content, name
+            before_ms, after_ms = best(before, data), best(after, data)
+            print(f"{name:<28} {len(content) / 1024:>6.1f} KiB  "
+                  f"JSONRenderer: {before_ms:.3f} ms  FastJSONRenderer: {after_ms:.3f} ms  "
+                  f"x{before_ms / after_ms:.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,71 @@
+"""
+ModelSerializer vs the values() path (core.utils.fast_serializers) for the
+list endpoints, at 10, 100 and 1000 rows.
+
+    python benchmarks/list_serializers.py
+
+Runs against a throwaway test database created from the configured one.
+Each timing includes the SELECT: "before" is Serializer(queryset, many=True)
+.data, "after" is ValuesSerializer.serialize(queryset.values(...)).
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'EvMan.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from core.models import Event, Track, Session, Attendee  # noqa: E402
+from core.serializers import EventSerializer, SessionSerializer, TrackSerializer, AttendeeSerializer  # noqa: E402
+from core.utils.fast_serializers import ValuesSerializer  # noqa: E402
+
+SIZES = (10, 100, 1000)
+
+
+def seed(rows):
+    base = datetime(2030, 1, 1, 8, 0)
+    events = Event.objects.bulk_create([
+        Event(name=f"Event {i}", description="Description " * 20, venue="Hall", capacity=rows,
+              start_date=base + timedelta(days=i), end_date=base + timedelta(days=i, hours=12))
+        for i in range(rows)
+    ])
+    tracks = Track.objects.bulk_create([Track(name=f"Track {i}", event=event) for i, event in enumerate(events)])
+    Session.objects.bulk_create([
+        Session(title=f"Talk {i}", description="Abstract " * 20, event=track.event, track=track, speaker="Speaker",
+                start_time=track.event.start_date, end_time=track.event.start_date + timedelta(hours=1))
+        for i, track in enumerate(tracks)
+    ])
+    Attendee.objects.bulk_create([
+        Attendee(name=f"Fan {i}", email=f"fan{i}@example.com", event=events[0]) for i in range(rows)
+    ])
+
+
+def run(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e3
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(max(SIZES))
+        for serializer_class in (SessionSerializer, EventSerializer, TrackSerializer, AttendeeSerializer):
+            model = serializer_class.Meta.model
+            fast = ValuesSerializer.for_serializer(serializer_class)
+            print(serializer_class.__name__)
+            for rows in SIZES:
+                queryset = model.objects.order_by('pk')[:rows]
+                assert fast.serialize(queryset.values(*fast.columns)) == serializer_class(queryset, many=True).data
+                number = max(5, 2000 // rows)
+                before = run(lambda: serializer_class(queryset.all(), many=True).data, number)
+                after = run(lambda: fast.serialize(queryset.values(*fast.columns)), number)
+                print(f"  {rows:>5} rows  before: {before:8.3f} ms  after: {after:8.3f} ms  ({before / after:.1f}x)")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,90 @@
+"""
+Request latency while the log disk stalls: the records written in the
+request thread (a FileHandler, as before) vs handed to a writer thread
+(core.utils.log.BackgroundHandler).
+
+    python benchmarks/logging_latency.py
+
+Runs against a throwaway test database created from the configured one.
+Each request is a GET of a missing event, which logs two warnings (the
+view's and django.request's). The log file's handler stalls for 20 ms on
+every 10th write, like an fsync behind a busy disk.
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'EvMan.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import logging  # noqa: E402
+import logging.handlers  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from core.utils.log import BackgroundHandler, JSONLinesFormatter, RequestContextFilter  # noqa: E402
+
+REQUESTS = 300
+STALL_EVERY, STALL_SECONDS = 10, 0.02
+
+
+class StallingFileHandler(logging.FileHandler):
+    writes = 0
+
+    def emit(self, record):
+        super().emit(record)
+        StallingFileHandler.writes += 1
+        if StallingFileHandler.writes % STALL_EVERY == 0:
+            time.sleep(STALL_SECONDS)
+
+
+logging.handlers.StallingFileHandler = StallingFileHandler
+
+
+def use_handler(handler):
+    handler.setFormatter(JSONLinesFormatter())
+    handler.addFilter(RequestContextFilter())
+    for name in ('core', 'django'):
+        logger = logging.getLogger(name)
+        logger.handlers = [handler]
+        logger.propagate = False
+
+
+def measure(client):
+    latencies = []
+    for _ in range(REQUESTS):
+        started = time.perf_counter()
+        client.get(f'/api/events/{uuid.uuid4()}/')
+        latencies.append((time.perf_counter() - started) * 1e3)
+    latencies.sort()
+    return {p: latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] for p in (50, 95, 99)} | {'max': latencies[-1]}
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        client = APIClient()
+        client.force_authenticate(user=get_user_model().objects.create_user(username='bench', password='bench123'))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'app.log')
+            handlers = {
+                "FileHandler (request thread)": StallingFileHandler(path),
+                "BackgroundHandler": BackgroundHandler({'class': 'logging.handlers.StallingFileHandler', 'filename': path}),
+            }
+            for name, handler in handlers.items():
+                use_handler(handler)
+                measure(client)  # warm up
+                stats = measure(client)
+                handler.close()
+                print(f"{name:<30} " + "  ".join(f"{key if key == 'max' else f'p{key}'}: {value:6.2f} ms"
+                                                 for key, value in stats.items()))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
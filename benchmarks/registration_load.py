@@ -0,0 +1,124 @@
+"""
+Load test of attendee admission (capacity check + seat reservation).
+
+    python benchmarks/registration_load.py [attendees]
+
+Runs against a throwaway test database created from the configured one.
+The event is filled up to 1k/10k/100k attendees and the admission cost is
+measured at each level:
+
+"before" replays the previous capacity check (COUNT(*) of the event's
+attendees on every registration), "after" is the registered_count read done
+by Attendee.clean plus the conditional UPDATE done by Attendee.save.
+
+It then has 50 threads race for the last 10 seats and checks that the event
+is not overbooked.
+"""
+import os
+import sys
+import threading
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'EvMan.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.exceptions import ValidationError  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from core.models import Event, Attendee  # noqa: E402
+from core.utils.registration import reserve_seats  # noqa: E402
+
+
+class Rollback(Exception):
+    pass
+
+
+def before(event):
+    return Attendee.objects.filter(event_id=event.pk).count() < event.capacity
+
+
+def after(event):
+    registered_count, capacity = Event.objects.filter(pk=event.pk) \
+        .values_list('registered_count', 'capacity').get()
+    return registered_count < capacity and reserve_seats(event.pk)
+
+
+def run(func, event, number=200):
+    def once():
+        try:
+            with transaction.atomic():
+                func(event)
+                raise Rollback
+        except Rollback:
+            pass
+
+    best = min(timeit.repeat(once, number=number, repeat=3))
+    return best / number * 1e3
+
+
+def fill(event, upto):
+    start = event.registered_count
+    Attendee.objects.bulk_create(
+        [Attendee(name=f"Attendee {i}", email=f"attendee{i}@example.com", event=event) for i in range(start, upto)],
+        batch_size=5000,
+    )
+    Event.objects.filter(pk=event.pk).update(registered_count=upto)
+    event.refresh_from_db()
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE core_attendee")
+
+
+def race(capacity=10, threads=50):
+    event = Event.objects.create(
+        name="Race", description="Race", venue="Room",
+        start_date=datetime(2031, 1, 1, 10, 0), end_date=datetime(2031, 1, 1, 18, 0),
+        capacity=capacity,
+    )
+    barrier = threading.Barrier(threads)
+    admitted = []
+
+    def register(i):
+        try:
+            barrier.wait()
+            Attendee.objects.create(name=f"Fan {i}", email=f"fan{i}@example.com", event=event)
+            admitted.append(i)
+        except ValidationError:
+            pass
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=register, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    event.refresh_from_db()
+    return len(admitted), event.registered_count, Attendee.objects.filter(event=event).count()
+
+
+if __name__ == '__main__':
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        event = Event.objects.create(
+            name="Load", description="Load", venue="Hall",
+            start_date=datetime(2030, 1, 1, 10, 0), end_date=datetime(2030, 1, 1, 18, 0),
+            capacity=total + 1,
+        )
+        for level in (1_000, 10_000, total):
+            fill(event, level)
+            before_ms = run(before, event)
+            after_ms = run(after, event)
+            print(f"{level:>7} attendees  before: {before_ms:.3f} ms  after: {after_ms:.3f} ms")
+
+        admitted, counter, rows = race()
+        print(f"race for 10 seats: admitted={admitted} registered_count={counter} rows={rows}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
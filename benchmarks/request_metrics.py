@@ -0,0 +1,113 @@
+"""
+Cost of core.middleware.RequestMetricsMiddleware per request: the same
+requests with REQUEST_METRICS off (middleware removed), and on.
+
+    python benchmarks/request_metrics.py
+
+Runs against a throwaway test database created from the configured one.
+Requests are a 100 row page of sessions and a single event. Runs of 200
+requests alternate between both settings, timings are the best of 10
+runs, per request. As the difference is close to the run to run noise,
+the middleware's own bookkeeping and the cost of the serializer/renderer
+hooks outside a measured request are timed separately as well.
+"""
+import os
+import sys
+import time
+import timeit
+from contextlib import ExitStack
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'EvMan.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from core.models import Event, Track, Session  # noqa: E402
+from core.utils.metrics import MetricsRegistry, start_timer, stop_timer, timed  # noqa: E402
+
+NUMBER, REPEAT = 200, 10
+
+
+def seed():
+    now = timezone.now()
+    event = Event.objects.create(
+        name="Metered", description="Description", venue="Hall", capacity=100,
+        start_date=now, end_date=now + timedelta(hours=10),
+    )
+    track = Track.objects.create(name="Main", event=event)
+    Session.objects.bulk_create([
+        Session(title=f"Talk {i}", speaker="Speaker", event=event, track=track,
+                start_time=now + timedelta(minutes=5 * i), end_time=now + timedelta(minutes=5 * i + 4))
+        for i in range(100)
+    ])
+    return event
+
+
+def run(client, url):
+    started = time.perf_counter()
+    for _ in range(NUMBER):
+        client.get(url)
+    return (time.perf_counter() - started) / NUMBER * 1e3
+
+
+def bookkeeping(registry=MetricsRegistry()):
+    """ What the middleware adds around a request, without the request """
+    timer, token = start_timer()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timer.execute_wrapper))
+    stop_timer(token)
+    timer.server_timing(0.002)
+    registry.observe('event-list', 'GET', 200, {
+        'request_duration_seconds': 0.002, 'request_db_seconds': 0.0005, 'request_db_queries': 2,
+        'request_serialize_seconds': 0.0001, 'request_render_seconds': 0.00003, 'response_size_bytes': 500,
+    })
+
+
+@timed('serialize')
+def hooked():
+    pass
+
+
+def plain():
+    pass
+
+
+def micro(function, number=100000):
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        event = seed()
+        user = get_user_model().objects.create_user(username='bench', password='bench123')
+        urls = {"session page (100)": '/api/sessions/?page_size=100', "event detail": f'/api/events/{event.id}/'}
+        clients = {}
+        for enabled in (False, True):
+            with override_settings(REQUEST_METRICS=enabled):
+                # The middleware stack is loaded on a client's first request
+                clients[enabled] = APIClient()
+                clients[enabled].force_authenticate(user=user)
+                clients[enabled].get('/api/events/')
+        for name, url in urls.items():
+            timings = {False: [], True: []}
+            for _ in range(REPEAT):
+                for enabled, client in clients.items():
+                    timings[enabled].append(run(client, url))
+            off, on = min(timings[False]), min(timings[True])
+            print(f"{name:<20} off: {off:.3f} ms  on: {on:.3f} ms  {(on - off) * 1e3:+.0f} us")
+
+        print(f"middleware bookkeeping per request: {micro(bookkeeping):.1f} us")
+        print(f"disabled serializer/renderer hook: +{micro(hooked) - micro(plain):.2f} us per call")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
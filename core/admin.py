@@ -1,3 +1,44 @@
 from django.contrib import admin
+from .models import Event, Track, Session, Attendee
 
-# Register your models here.
+# The __str__ of tracks, sessions and attendees read their related event
+# (and track), so changelists and foreign key choices preload them.
+
+
+class RelatedChoicesAdmin(admin.ModelAdmin):
+    """ Foreign key dropdowns labelled without a query per option """
+    related_choices = {}
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.related_choices:
+            kwargs['queryset'] = db_field.related_model.objects.select_related(*self.related_choices[db_field.name])
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('name', 'start_date', 'end_date', 'venue', 'capacity', 'registered_count')
+    search_fields = ('name', 'venue')
+
+
+@admin.register(Track)
+class TrackAdmin(admin.ModelAdmin):
+    list_display = ('name', 'event')
+    list_select_related = ('event',)
+    search_fields = ('name',)
+
+
+@admin.register(Session)
+class SessionAdmin(RelatedChoicesAdmin):
+    list_display = ('title', 'track', 'event', 'start_time', 'end_time', 'speaker')
+    # Track.__str__ reads the track's event as well
+    list_select_related = ('event', 'track__event')
+    related_choices = {'track': ('event',)}
+    search_fields = ('title', 'speaker')
+
+
+@admin.register(Attendee)
+class AttendeeAdmin(admin.ModelAdmin):
+    list_display = ('name', 'email', 'event')
+    list_select_related = ('event',)
+    search_fields = ('name', 'email')
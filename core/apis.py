@@ -1,4 +1,4 @@
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.db import connection
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework.decorators import action
@@ -11,26 +11,46 @@ from .models import Event, Session, Attendee, Track
 from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.exceptions import ValidationError
-from .authentication import JWTCookieAuthentication, IsAuthenticatedExceptPaths
+from .authentication import (
+    JWTCookieAuthentication, JWTCookieTokenUserAuthentication, IsAuthenticatedExceptPaths, TokenUserAuthenticationMixin,
+    MetricsTokenAuthentication, CanReadMetrics
+)
 from rest_framework.decorators import action
 from django.db.utils import IntegrityError
-from .serializers import EventSerializer, SessionSerializer, AttendeeSerializer, TrackSerializer
-from .utils.limit import rate_limiter 
+from .serializers import EventSerializer, SessionSerializer, AttendeeSerializer, AttendeeImportRowSerializer, SessionImportRowSerializer, TrackSerializer
+from .utils.loaders import get_current_event_snapshot
+from .utils.limit import RateLimit, RateLimitMixin
+from .utils.pagination import KeysetPagination
+from .utils.listing import PaginatedListMixin
+from .utils.conditional import make_validators
+from .utils.fieldsets import SparseFieldsetMixin
+from .utils.fast_serializers import ValuesSerializer
+from .utils.parsers import CSVParser
+from .utils.renderers import CSVRenderer, NDJSONRenderer
+from .utils.export import EXPORT_CHUNK_SIZE, STREAM_FORMATS, streaming_export
+from rest_framework.settings import api_settings
+from .utils.registration import import_attendees
+from .utils.schedule import schedule_sessions
+from .utils.constraints import ExclusionViolation
+from .utils.metrics import PROMETHEUS_CONTENT_TYPE, registry as metrics_registry
+from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser
+from django.conf import settings
 from django.utils import timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class EventPagination(PageNumberPagination):
+class EventPagination(KeysetPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    keyset_ordering = ('start_date', 'id')
 
 @extend_schema(tags=['Events'])
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(SparseFieldsetMixin, PaginatedListMixin, viewsets.ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     # permission_classes = [IsAuthenticated]
@@ -38,6 +58,13 @@ class EventViewSet(viewsets.ModelViewSet):
     pagination_class = EventPagination
     authentication_classes = [JWTCookieAuthentication]
     http_method_names = ['get', 'post', 'put', 'delete']
+    list_messages = {
+        'empty': "No events found",
+        'out_of_range': "No events found for the given page",
+        'success': "Events retrieved successfully",
+    }
+    # ETag / Last-Modified and 304 on list and retrieve
+    last_modified_field = 'updated_at'
 
     @extend_schema(
         summary="List Events",
@@ -62,37 +89,7 @@ class EventViewSet(viewsets.ModelViewSet):
     )
 
     def list(self, request, *args, **kwargs):
-        try:
-            queryset = self.filter_queryset(self.get_queryset())
-            queryset = self.get_queryset()
-
-            user_id = request.user.id
-            logger.debug(f"User ID: {user_id}")
-
-            if not queryset.exists():
-                logger.warning("No events found")
-                return Response(
-                    BaseResponse.error_response("No events found"),
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            page = self.paginate_queryset(queryset)
-            if not page:
-                logger.warning("No events found for the given page")
-                return Response(
-                    BaseResponse.error_response("No events found for the given page"),
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(BaseResponse.success_response(
-                data=serializer.data,
-                message="Events retrieved successfully"
-            ))
-        except Exception as e:
-            logger.error(f"Error in list view: {str(e)}")
-            return Response(
-                BaseResponse.error_response(str(e)),
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return super().list(request, *args, **kwargs)
 
     @extend_schema(
         summary="Create Event",
@@ -118,18 +115,18 @@ class EventViewSet(viewsets.ModelViewSet):
                 for field, errors in e.detail.items():
                     if isinstance(errors, list):
                         error_message = errors[0]
-                        logger.warning(f"Validation error in create view: {error_message}")
+                        logger.warning("Validation error in create view: %s", error_message)
                         return Response(
                             BaseResponse.error_response(str(error_message)),
                             status=status.HTTP_400_BAD_REQUEST
                         )
-            logger.warning(f"Validation error in create view: {str(e.detail)}")
+            logger.warning("Validation error in create view: %s", e.detail)
             return Response(
                 BaseResponse.error_response(str(e.detail)),
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            logger.error(f"Internal Server Error in create view: {str(e)}", exc_info=True)
+            logger.error("Internal Server Error in create view: %s", e, exc_info=True)
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -138,23 +135,28 @@ class EventViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
+            validators = self.get_object_validators(instance)
+            not_modified = self.conditional_response(validators)
+            if not_modified is not None:
+                return not_modified
+
             serializer = self.get_serializer(instance)
-            logger.info(f"Event retrieved successfully: {instance.id}")
-            return Response(
+            logger.info("Event retrieved successfully: %s", instance.id)
+            return self.with_validators(Response(
                 BaseResponse.success_response(
                     data=serializer.data,
                     message="Event retrieved successfully"
                 ),
                 status=status.HTTP_200_OK
-            )
+            ), validators)
         except Event.DoesNotExist:
-            logger.warning(f"Event not found: ID {kwargs.get('pk')}")
+            logger.warning("Event not found: ID %s", kwargs.get('pk'))
             return Response(
                 BaseResponse.error_response("Event not found"),
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error in retrieve view: {str(e)}", exc_info=True)
+            logger.error("Error in retrieve view: %s", e, exc_info=True)
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -189,7 +191,7 @@ class EventViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(instance, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
             self.perform_update(serializer)
-            logger.info(f"Event updated successfully: {instance.id}")
+            logger.info("Event updated successfully: %s", instance.id)
             return Response(
                 BaseResponse.success_response(
                     data=serializer.data,
@@ -203,24 +205,24 @@ class EventViewSet(viewsets.ModelViewSet):
                 for field, errors in e.detail.items():
                     if isinstance(errors, list):
                         error_message = errors[0]
-                        logger.warning(f"Validation error in update view: {error_message}")
+                        logger.warning("Validation error in update view: %s", error_message)
                         return Response(
                             BaseResponse.error_response(str(error_message)),
                             status=status.HTTP_400_BAD_REQUEST
                         )
-            logger.warning(f"Validation error in update view: {str(e.detail)}")
+            logger.warning("Validation error in update view: %s", e.detail)
             return Response(
                 BaseResponse.error_response(str(e.detail)),
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Event.DoesNotExist:
-            logger.warning(f"Event not found: ID {kwargs.get('pk')}")
+            logger.warning("Event not found: ID %s", kwargs.get('pk'))
             return Response(
                 BaseResponse.error_response("Event not found"),
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error in update view: {str(e)}", exc_info=True)
+            logger.error("Error in update view: %s", e, exc_info=True)
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -235,7 +237,7 @@ class EventViewSet(viewsets.ModelViewSet):
         try:
             instance = self.get_object()
             instance.delete()
-            logger.info(f"Event deleted successfully: {instance.id}")
+            logger.info("Event deleted successfully: %s", instance.id)
             return Response(
                 BaseResponse.success_response(
                     message="Event deleted successfully"
@@ -243,13 +245,13 @@ class EventViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_204_NO_CONTENT
             )
         except Event.DoesNotExist:
-            logger.warning(f"Event not found: ID {kwargs.get('pk')}")
+            logger.warning("Event not found: ID %s", kwargs.get('pk'))
             return Response(
                 BaseResponse.error_response("Event not found"),
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error in destroy view: {str(e)}", exc_info=True)
+            logger.error("Error in destroy view: %s", e, exc_info=True)
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -257,112 +259,74 @@ class EventViewSet(viewsets.ModelViewSet):
 
 
     @action(detail=False, methods=["get"], url_path="current")
-    @rate_limiter(10, 1, 2)
     def get_current_event(self, request):
         """
         This is a long handler with a long execution time, 
         I decided to use raw query for the sake of performance.
+        The event, tracks and sessions are loaded with a fixed number of queries
+        and the result is cached until the event ends or the tree is written to.
+        Clients revalidating with If-None-Match / If-Modified-Since get a 304.
         """
         try:
             logger.info("Fetching current event")
-            with connection.cursor() as cursor:
-                current_time = timezone.now()
-                
-                cursor.execute("""
-                    SELECT id, name, description, start_date, end_date, venue, capacity, created_at, updated_at
-                    FROM core_event
-                    WHERE %s BETWEEN start_date AND end_date
-                    LIMIT 1
-                """, [current_time])
-                
-                event = cursor.fetchone()
-
-                if not event:
-                    logger.warning("No ongoing event found")
-                    return Response(
-                        BaseResponse.error_response("No ongoing event found"),
-                        status=status.HTTP_404_NOT_FOUND
-                    )
-
-                event_data = {
-                    "id": event[0],
-                    "name": event[1],
-                    "description": event[2],
-                    "start_date": event[3],
-                    "end_date": event[4],
-                    "venue": event[5],
-                    "capacity": event[6],
-                    "created_at": event[7],
-                    "updated_at": event[8],
-                    "tracks": []
-                }
-
-                logger.info(f"Event found: {event_data['name']} (ID: {event_data['id']})")
-
-                cursor.execute("""
-                    SELECT id, name
-                    FROM core_track
-                    WHERE event_id = %s
-                """, [event[0]])
-                tracks = cursor.fetchall()
-
-                for track in tracks:
-                    track_data = {
-                        "id": track[0],
-                        "name": track[1],
-                        "sessions": []
-                    }
-
-                    cursor.execute("""
-                        SELECT id, title, description, start_time, end_time, speaker
-                        FROM core_session
-                        WHERE track_id = %s
-                    """, [track[0]])
-                    sessions = cursor.fetchall()
-
-                    for session in sessions:
-                        session_data = {
-                            "id": session[0],
-                            "title": session[1],
-                            "description": session[2],
-                            "start_time": session[3],
-                            "end_time": session[4],
-                            "speaker": session[5]
-                        }
-                        track_data["sessions"].append(session_data)
-
-                    event_data["tracks"].append(track_data)
-
-                logger.info(f"Event details retrieved successfully: {event_data['name']} (ID: {event_data['id']})")
+            event_data = get_current_event_snapshot(timezone.now())
+
+            if not event_data:
+                logger.warning("No ongoing event found")
                 return Response(
-                    BaseResponse.success_response(
-                        data=event_data,
-                        message="Event details retrieved successfully"
-                    ),
-                    status=status.HTTP_200_OK
+                    BaseResponse.error_response("No ongoing event found"),
+                    status=status.HTTP_404_NOT_FOUND
                 )
 
+            # The snapshot is rebuilt after every write to the event tree,
+            # and each of them moves the event's updated_at
+            validators = make_validators(
+                'current', event_data['id'], event_data['updated_at'], last_modified=event_data['updated_at']
+            ) if self.conditional_enabled() else None
+            not_modified = self.conditional_response(validators)
+            if not_modified is not None:
+                return not_modified
+
+            logger.info("Event details retrieved successfully: %s (ID: %s)", event_data['name'], event_data['id'])
+            return self.with_validators(Response(
+                BaseResponse.success_response(
+                    data=event_data,
+                    message="Event details retrieved successfully"
+                ),
+                status=status.HTTP_200_OK
+            ), validators)
+
         except Exception as e:
-            logger.error(f"Error in get_current_event view: {str(e)}", exc_info=True)
+            logger.error("Error in get_current_event view: %s", e, exc_info=True)
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 
-class SessionPagination(PageNumberPagination):
+class SessionPagination(KeysetPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    keyset_ordering = ('start_time', 'id')
 
 
 @extend_schema(tags=['Sessions'])
-class SessionViewSet(viewsets.ModelViewSet):
-    queryset = Session.objects.all()
+class SessionViewSet(TokenUserAuthenticationMixin, SparseFieldsetMixin, PaginatedListMixin, viewsets.ModelViewSet):
+    # __str__ of a session reads its track and event
+    queryset = Session.objects.select_related('event', 'track')
     serializer_class = SessionSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = SessionPagination
     http_method_names = ['get', 'post', 'put', 'delete']
+    list_messages = {
+        'empty': "No sessions found",
+        'out_of_range': "No sessions found for the given page",
+        'success': "Sessions retrieved successfully",
+    }
+    # ETag / Last-Modified and 304 on list and retrieve
+    last_modified_field = 'updated_at'
+    token_user_actions = ('list',)
 
     @extend_schema(
         summary="List Sessions",
@@ -375,38 +339,14 @@ class SessionViewSet(viewsets.ModelViewSet):
         ]
     )
     def list(self, request, *args, **kwargs):
-        try:
-            queryset = self.filter_queryset(self.get_queryset())
-
-            event_id = request.query_params.get('event_id')
-            if event_id:
-                queryset = queryset.filter(event_id=event_id)
-
-            if not queryset.exists():
-                return Response(
-                    BaseResponse.error_response("No sessions found"),
-                    status=status.HTTP_404_NOT_FOUND
-                )
+        return super().list(request, *args, **kwargs)
 
-            page = self.paginate_queryset(queryset)
-            if not page:
-                logger.warning("No sessions found for the given page")
-                return Response(
-                    BaseResponse.error_response("No sessions found for the given page"),
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(BaseResponse.success_response(
-                data=serializer.data,
-                message="Sessions retrieved successfully"
-            ))
-        except Exception as e:
-            logger.error(f"Error in list view: {str(e)}", exc_info=True)
-            return Response(
-                BaseResponse.error_response(str(e)),
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+    def get_list_queryset(self):
+        queryset = super().get_list_queryset()
+        event_id = self.request.query_params.get('event_id')
+        if event_id:
+            queryset = queryset.filter(event_id=event_id)
+        return queryset
 
     @extend_schema(
         summary="Create Session",
@@ -428,7 +368,7 @@ class SessionViewSet(viewsets.ModelViewSet):
             )
         except ValidationError as e:
             error_message = str(e.detail)
-            logger.warning(f"Validation error in create view: {error_message}")
+            logger.warning("Validation error in create view: %s", error_message)
             error_dict = e.detail
             if 'track' in error_dict:
                 error_message = error_dict['track'][0]
@@ -442,7 +382,7 @@ class SessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            logger.error(f"Internal Server Error in create view: {str(e)}", exc_info=True)
+            logger.error("Internal Server Error in create view: %s", e, exc_info=True)
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -456,14 +396,19 @@ class SessionViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
+            validators = self.get_object_validators(instance)
+            not_modified = self.conditional_response(validators)
+            if not_modified is not None:
+                return not_modified
+
             serializer = self.get_serializer(instance)
-            return Response(
+            return self.with_validators(Response(
                 BaseResponse.success_response(
                     data=serializer.data,
                     message="Session retrieved successfully"
                 ),
                 status=status.HTTP_200_OK
-            )
+            ), validators)
         except Session.DoesNotExist:
             logger.warning("Session not found")
             return Response(
@@ -471,7 +416,7 @@ class SessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error in retrieve view: {str(e)}", exc_info=True)
+            logger.error("Error in retrieve view: %s", e, exc_info=True)
             return Response(
                 BaseResponse.error_response(str(e)),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -485,16 +430,17 @@ class SessionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='by-event/(?P<event_id>[^/.]+)')
     def get_sessions_by_event(self, request, event_id=None):
         try:
-            queryset = Session.objects.filter(event_id=event_id)
-            if not queryset.exists():
+            fast = ValuesSerializer.for_serializer(SessionSerializer)
+            rows = Session.objects.filter(event_id=event_id).values(*fast.columns)
+            data = fast.serialize(rows)
+            if not data:
                 return Response(
                     BaseResponse.error_response("No sessions found for the given event"),
                     status=status.HTTP_404_NOT_FOUND
                 )
-            serializer = self.get_serializer(queryset, many=True)
             return Response(
                 BaseResponse.success_response(
-                    data=serializer.data,
+                    data=data,
                     message="Sessions retrieved successfully"
                 ),
                 status=status.HTTP_200_OK
@@ -526,7 +472,7 @@ class SessionViewSet(viewsets.ModelViewSet):
             )
         except ValidationError as e:
             error_message = str(e.detail)
-            logger.warning(f"Validation error in update view: {error_message}")
+            logger.warning("Validation error in update view: %s", error_message)
             error_message = str(e.detail) if isinstance(e.detail, str) else str(e.detail.get('non_field_errors', ['Validation error'])[0])
             return Response(
                 BaseResponse.error_response(error_message),
@@ -539,7 +485,7 @@ class SessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error in update view: {str(e)}", exc_info=True)
+            logger.error("Error in update view: %s", e, exc_info=True)
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -567,26 +513,124 @@ class SessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error in destroy view: {str(e)}", exc_info=True)
+            logger.error("Error in destroy view: %s", e, exc_info=True)
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 
-class AttendeePagination(PageNumberPagination):
+    @extend_schema(
+        summary="Bulk create sessions",
+        description=(
+            "Create many sessions at once (e.g. a day's agenda) from a JSON array or a text/csv "
+            "body with a `title,description,speaker,event,track,start_time,end_time` header. "
+            "Sessions are checked against each other and the stored ones in one pass, earlier "
+            "rows win. The accepted sessions are created in one transaction, the rejected rows "
+            "are reported by row number (1 = first session), with the sessions and rows they overlap."
+        ),
+        request=SessionImportRowSerializer(many=True),
+        responses={
+            201: {"type": "object", "properties": {
+                "success": {"type": "boolean"},
+                "message": {"type": "string"},
+                "data": {"type": "object", "properties": {
+                    "created": {"type": "integer"},
+                    "failed": {"type": "integer"},
+                    "errors": {"type": "array", "items": {"type": "object"}}
+                }}
+            }}
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[JSONParser, CSVParser])
+    def bulk(self, request):
+        try:
+            rows = request.data
+            if not isinstance(rows, list) or not rows:
+                return Response(
+                    BaseResponse.error_response("Expected a non-empty list of sessions."),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            max_rows = getattr(settings, 'SESSION_IMPORT_MAX_ROWS', 1000)
+            if len(rows) > max_rows:
+                return Response(
+                    BaseResponse.error_response(f"At most {max_rows} sessions can be created at once."),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            errors = {}
+            valid = {}
+            for number, row in enumerate(rows, start=1):
+                serializer = SessionImportRowSerializer(data=row)
+                if serializer.is_valid():
+                    valid[number] = serializer.validated_data
+                else:
+                    errors[number] = serializer.errors
+
+            created, schedule_errors = schedule_sessions(valid) if valid else ([], {})
+            errors.update(schedule_errors)
+
+            report = {
+                "created": len(created),
+                "failed": len(errors),
+                "errors": [{"row": number, "errors": errors[number]} for number in sorted(errors)],
+            }
+            logger.info("Bulk session import: %s created, %s failed", report["created"], report["failed"])
+
+            if not created:
+                return Response(
+                    BaseResponse.error_response("No session was created.", data=report),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(
+                BaseResponse.success_response(
+                    data=report,
+                    message="Sessions created successfully"
+                ),
+                status=status.HTTP_201_CREATED
+            )
+        except ExclusionViolation as e:
+            # A concurrent write took one of the slots, nothing was created
+            logger.warning("Exclusion violation in bulk session import: %s", e.messages[0])
+            return Response(
+                BaseResponse.error_response(e.messages[0]),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error("Unexpected error on bulk session import: %s", e, exc_info=True)
+            return Response(
+                BaseResponse.error_response("An internal server error occurred. Please try again later."),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class AttendeePagination(KeysetPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    keyset_ordering = ('event_id', 'email')
+    # The attendee table is the one that grows, skip the full COUNT(*) there
+    estimated_count_threshold = 100_000
 
-class AttendeeViewSet(viewsets.ModelViewSet):
-    queryset = Attendee.objects.all()
+class AttendeeViewSet(RateLimitMixin, SparseFieldsetMixin, PaginatedListMixin, viewsets.ModelViewSet):
+    queryset = Attendee.objects.select_related('event')
     serializer_class = AttendeeSerializer
     # permission_classes = [IsAuthenticated]
     permission_classes = [IsAuthenticatedExceptPaths]
     authentication_classes = [JWTCookieAuthentication]
-    pagination_class = SessionPagination
+    pagination_class = AttendeePagination
     http_method_names = ['get', 'post']
+    list_messages = {
+        'empty': "No attendee found",
+        'out_of_range': "No attendee found for the given page",
+        'success': "Attendees retrieved successfully",
+    }
+    # Registration is public, keep a single client from flooding it
+    rate_limits = {
+        'create': RateLimit(30, 60, key='ip', scope='attendee-create'),
+    }
+    # Rows per server-side cursor fetch and per streamed chunk of exports
+    export_chunk_size = EXPORT_CHUNK_SIZE
 
 
     @extend_schema(
@@ -600,40 +644,15 @@ class AttendeeViewSet(viewsets.ModelViewSet):
         ]
     )
     def list(self, request, *args, **kwargs):
-        try:
-            queryset = self.filter_queryset(self.get_queryset())
+        return super().list(request, *args, **kwargs)
 
-            # Filter berdasarkan attendee_id jika diberikan
-            attendee_id = request.query_params.get('attendee_id')
-            if attendee_id:
-                queryset = queryset.filter(attendee_id=attendee_id)
-
-            if not queryset.exists():
-                logger.info("No attendee found for given filter: attendee_id=%s", attendee_id)
-                return Response(
-                    BaseResponse.error_response("No attendee found"),
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            page = self.paginate_queryset(queryset)
-            if not page:
-                logger.info("No attendee found for page: %s", request.query_params.get('page'))
-                return Response(
-                    BaseResponse.error_response("No attendee found for the given page"),
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(BaseResponse.success_response(
-                data=serializer.data,
-                message="Attendees retrieved successfully"
-            ))
-        except Exception as e:
-            logger.error("Error retrieving attendees: %s", str(e), exc_info=True)
-            return Response(
-                BaseResponse.error_response("An internal server error occurred. Please try again later."),
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+    def get_list_queryset(self):
+        queryset = super().get_list_queryset()
+        # Filter berdasarkan attendee_id jika diberikan
+        attendee_id = self.request.query_params.get('attendee_id')
+        if attendee_id:
+            queryset = queryset.filter(attendee_id=attendee_id)
+        return queryset
 
     @extend_schema(
         summary="Create Attendee",
@@ -667,7 +686,7 @@ class AttendeeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            logger.error("Unexpected error on attendee creation: %s", str(e), exc_info=True)
+            logger.error("Unexpected error on attendee creation: %s", e, exc_info=True)
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -676,27 +695,47 @@ class AttendeeViewSet(viewsets.ModelViewSet):
 
     @extend_schema(
         summary="List Attendee by event",
-        description="Get all attendee filtered by event ID",
+        description=(
+            "Get all attendee filtered by event ID. With format=csv or format=ndjson "
+            "the attendees are streamed as a file export instead."
+        ),
         responses={200: AttendeeSerializer(many=True)},
         parameters=[
             OpenApiParameter(name='page', type=int, description='Page number'),
             OpenApiParameter(name='page_size', type=int, description='Number of items per page'),
-            OpenApiParameter(name='event_id', type=str, description='Filter by event UUID')
+            OpenApiParameter(name='event_id', type=str, description='Filter by event UUID'),
+            OpenApiParameter(name='format', type=str, enum=['json', 'csv', 'ndjson'], description='Response format')
         ]
     )
-    @action(detail=False, methods=['get'], url_path='by-event/(?P<event_id>[^/.]+)')
+    @action(
+        detail=False, methods=['get'], url_path='by-event/(?P<event_id>[^/.]+)',
+        renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer, NDJSONRenderer]
+    )
     def list_by_event(self, request, event_id=None):
         try:
             queryset = Attendee.objects.filter(event_id=event_id)
-            if not queryset.exists():
+
+            export_format = request.accepted_renderer.format
+            if export_format in STREAM_FORMATS:
+                return streaming_export(
+                    queryset.order_by('email'),
+                    ('id', 'name', 'email', 'event_id'),
+                    export_format,
+                    filename=f"attendees-{event_id}",
+                    columns=('id', 'name', 'email', 'event'),
+                    chunk_size=self.export_chunk_size,
+                )
+
+            fast = ValuesSerializer.for_serializer(AttendeeSerializer)
+            data = fast.serialize(queryset.values(*fast.columns))
+            if not data:
                 return Response(
                     BaseResponse.error_response("No attendees found for the given event"),
                     status=status.HTTP_404_NOT_FOUND
                 )
-            serializer = self.get_serializer(queryset, many=True)
             return Response(
                 BaseResponse.success_response(
-                    data=serializer.data,
+                    data=data,
                     message="Attendees retrieved successfully"
                 ),
                 status=status.HTTP_200_OK
@@ -708,20 +747,113 @@ class AttendeeViewSet(viewsets.ModelViewSet):
             )
 
 
-class TrackPagination(PageNumberPagination):
+    @extend_schema(
+        summary="Bulk import attendees",
+        description=(
+            "Register many attendees at once from a JSON array or a text/csv body "
+            "with a `name,email,event` header. Valid rows are created, invalid rows "
+            "are reported by row number (1 = first attendee)."
+        ),
+        request=AttendeeImportRowSerializer(many=True),
+        responses={
+            201: {"type": "object", "properties": {
+                "success": {"type": "boolean"},
+                "message": {"type": "string"},
+                "data": {"type": "object", "properties": {
+                    "created": {"type": "integer"},
+                    "failed": {"type": "integer"},
+                    "errors": {"type": "array", "items": {"type": "object"}}
+                }}
+            }}
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[JSONParser, CSVParser])
+    def bulk(self, request):
+        try:
+            rows = request.data
+            if not isinstance(rows, list) or not rows:
+                return Response(
+                    BaseResponse.error_response("Expected a non-empty list of attendees."),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            max_rows = getattr(settings, 'ATTENDEE_IMPORT_MAX_ROWS', 5000)
+            if len(rows) > max_rows:
+                return Response(
+                    BaseResponse.error_response(f"At most {max_rows} attendees can be imported at once."),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            errors = {}
+            valid = []
+            for index, row in enumerate(rows):
+                serializer = AttendeeImportRowSerializer(data=row)
+                if serializer.is_valid():
+                    valid.append((index, serializer.validated_data))
+                else:
+                    errors[index] = serializer.errors
+
+            created, import_errors = import_attendees([data for _, data in valid]) if valid else ([], {})
+            for position, message in import_errors.items():
+                errors[valid[position][0]] = {"non_field_errors": [message]}
+
+            report = {
+                "created": len(created),
+                "failed": len(errors),
+                "errors": [{"row": index + 1, "errors": errors[index]} for index in sorted(errors)],
+            }
+            logger.info("Bulk attendee import: %s created, %s failed", report["created"], report["failed"])
+
+            if not created:
+                return Response(
+                    BaseResponse.error_response("No attendee was imported.", data=report),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(
+                BaseResponse.success_response(
+                    data=report,
+                    message="Attendees imported successfully"
+                ),
+                status=status.HTTP_201_CREATED
+            )
+        except IntegrityError:
+            # A single registration raced the import for the same email
+            logger.warning("Integrity error: Duplicate email in bulk attendee import")
+            return Response(
+                BaseResponse.error_response("Email has been registered for this event."),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error("Unexpected error on bulk attendee import: %s", e, exc_info=True)
+            return Response(
+                BaseResponse.error_response("An internal server error occurred. Please try again later."),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class TrackPagination(KeysetPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    keyset_ordering = ('id',)
 
 
 @extend_schema(tags=['Tracks'])
-class TrackViewSet(viewsets.ModelViewSet):
-    queryset = Track.objects.all()
+class TrackViewSet(TokenUserAuthenticationMixin, SparseFieldsetMixin, PaginatedListMixin, viewsets.ModelViewSet):
+    queryset = Track.objects.select_related('event')
     serializer_class = TrackSerializer
     pagination_class = TrackPagination
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTCookieAuthentication]
     http_method_names = ['get', 'post', 'put', 'delete']
+    list_messages = {
+        'empty': "No tracks found",
+        'out_of_range': "No tracks found for the given page",
+        'success': "Tracks retrieved successfully",
+    }
+    # ETag / Last-Modified and 304 on list and retrieve
+    last_modified_field = 'updated_at'
+    token_user_actions = ('list',)
 
     @extend_schema(
         summary="List Tracks",
@@ -741,35 +873,7 @@ class TrackViewSet(viewsets.ModelViewSet):
         }
     )
     def list(self, request, *args, **kwargs):
-        try:
-            queryset = self.filter_queryset(self.get_queryset())
-
-            if not queryset.exists():
-                logger.warning("No tracks found")
-                return Response(
-                    BaseResponse.error_response("No tracks found"),
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            page = self.paginate_queryset(queryset)
-            if not page:
-                logger.warning("No tracks found for the given page")
-                return Response(
-                    BaseResponse.error_response("No tracks found for the given page"),
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(BaseResponse.success_response(
-                data=serializer.data,
-                message="Tracks retrieved successfully"
-            ))
-        except Exception as e:
-            logger.error(f"Error fetching tracks: {str(e)}")
-            return Response(
-                BaseResponse.error_response("An internal server error occurred. Please try again later."),
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return super().list(request, *args, **kwargs)
 
     @extend_schema(
         summary="Create Track",
@@ -790,14 +894,14 @@ class TrackViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_201_CREATED
             )
         except ValidationError as e:
-            logger.warning(f"Validation error: {e}")  
+            logger.warning("Validation error: %s", e)  
             error_message = str(e.detail) if isinstance(e.detail, str) else str(e.detail.get('non_field_errors', ['Validation error'])[0])
             return Response(
                 BaseResponse.error_response(error_message),
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            logger.error(f"Error create track: {str(e)}")
+            logger.error("Error create track: %s", e)
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -811,22 +915,27 @@ class TrackViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
+            validators = self.get_object_validators(instance)
+            not_modified = self.conditional_response(validators)
+            if not_modified is not None:
+                return not_modified
+
             serializer = self.get_serializer(instance)
-            return Response(
+            return self.with_validators(Response(
                 BaseResponse.success_response(
                     data=serializer.data,
                     message="Track retrieved successfully"
                 ),
                 status=status.HTTP_200_OK
-            )
+            ), validators)
         except Http404:
-            logger.warning(f"Track not found for ID: {kwargs.get('pk')}")  
+            logger.warning("Track not found for ID: %s", kwargs.get('pk'))  
             return Response(
                 BaseResponse.error_response("Track not found"),
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error retrieving track: {str(e)}")  
+            logger.error("Error retrieving track: %s", e)  
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -849,14 +958,27 @@ class TrackViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_204_NO_CONTENT
             )
         except Http404:
-            logger.warning(f"Track not found for deletion: ID {kwargs.get('pk')}")  
+            logger.warning("Track not found for deletion: ID %s", kwargs.get('pk'))  
             return Response(
                 BaseResponse.error_response("Track not found"),
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error deleting track: {str(e)}")  
+            logger.error("Error deleting track: %s", e)  
             return Response(
                 BaseResponse.error_response("An internal server error occurred. Please try again later."),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class MetricsView(APIView):
+    """
+    Request metrics aggregated by this process (core.utils.metrics) in the
+    Prometheus text format, for staff users and the METRICS_TOKEN bearer.
+    """
+    authentication_classes = [MetricsTokenAuthentication, JWTCookieTokenUserAuthentication]
+    permission_classes = [CanReadMetrics]
+
+    @extend_schema(exclude=True)
+    def get(self, request):
+        return HttpResponse(metrics_registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -49,9 +49,18 @@
 #         }
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.models import TokenUser
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework.authentication import BaseAuthentication
 from rest_framework.permissions import BasePermission
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
 from rest_framework.exceptions import AuthenticationFailed
 from .utils.base_response import BaseResponse
+from .utils.token_cache import verified_tokens
+import hmac
 import re
 
 
@@ -77,34 +86,67 @@ import re
 #                 detail=BaseResponse.error_response("Invalid authentication token.")
 #             )
 
+# Routes reachable without authentication, per method (HEAD follows GET).
+PUBLIC_ROUTES = {
+    'GET': [
+        r'/api/events/[^/]+/details/',
+        r'/api/events/current/',
+        r'/api/schema/',
+        r'/api/docs/',
+    ],
+    'POST': [
+        r'/api/attendees/',
+    ],
+}
+
+
+class PublicPathRegistry:
+    """
+    Public routes compiled once into a single alternation regex per method,
+    so deciding whether a request is public costs one dict lookup and one
+    regex match instead of a loop of re.match calls.
+    """
+
+    def __init__(self, routes):
+        routes = dict(routes)
+        if 'GET' in routes:
+            routes.setdefault('HEAD', routes['GET'])
+        self.patterns = {
+            method: re.compile('|'.join(f'(?:{path})' for path in paths))
+            for method, paths in routes.items()
+            if paths
+        }
+
+    def is_public(self, method, path):
+        pattern = self.patterns.get(method)
+        return pattern is not None and pattern.fullmatch(path) is not None
+
+
+public_paths = PublicPathRegistry(PUBLIC_ROUTES)
+
+
 class JWTCookieAuthentication(JWTAuthentication):
-    PUBLIC_PATHS = [
-        r'^/api/events/[^/]+/details/$', 
-        r'^/api/events/current/$',
-        r'^/api/schema/$',
-        r'^/api/docs/$',
-    ]
+    PUBLIC_PATHS = public_paths
 
     def authenticate(self, request):
-        current_path = request.path
-        current_method = request.method
-
-        if current_path == "/api/attendees/" and current_method == "POST":
+        if self.PUBLIC_PATHS.is_public(request.method, request.path):
             return None
 
-        for pattern in self.PUBLIC_PATHS:
-            if re.match(pattern, current_path):
-                return None
-
         token = request.COOKIES.get('access_token')
         if not token:
             raise AuthenticationFailed(
                 detail=BaseResponse.error_response("Authentication credentials were not provided.")
             )
 
+        cached = verified_tokens.get(token)
+        if cached is not None:
+            return cached
+
         try:
             validated_token = self.get_validated_token(token)
+            version = verified_tokens.user_version(validated_token.get(api_settings.USER_ID_CLAIM))
             user = self.get_user(validated_token)
+            verified_tokens.set(token, validated_token, user, version)
             return user, validated_token
         except AuthenticationFailed:
             raise AuthenticationFailed(
@@ -112,28 +154,136 @@ class JWTCookieAuthentication(JWTAuthentication):
             )
 
 
+class LazyTokenUser(TokenUser):
+    """
+    User built from the token claims (id, username, is_staff). The User row
+    is only loaded when an attribute the token does not carry is touched.
+    """
+
+    @cached_property
+    def _user(self):
+        return get_user_model().objects.get(pk=self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self._user, attr)
+
+    @property
+    def groups(self):
+        return self._user.groups
+
+    @property
+    def user_permissions(self):
+        return self._user.user_permissions
+
+    def get_group_permissions(self, obj=None):
+        return self._user.get_group_permissions(obj)
+
+    def get_all_permissions(self, obj=None):
+        return self._user.get_all_permissions(obj)
+
+    def has_perm(self, perm, obj=None):
+        return self._user.has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return self._user.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module):
+        return self._user.has_module_perms(module)
+
+    def save(self, *args, **kwargs):
+        return self._user.save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._user.delete(*args, **kwargs)
+
+    def set_password(self, raw_password):
+        return self._user.set_password(raw_password)
+
+    def check_password(self, raw_password):
+        return self._user.check_password(raw_password)
+
+
+class JWTCookieTokenUserAuthentication(JWTCookieAuthentication):
+    """
+    Stateless variant of JWTCookieAuthentication for read-only endpoints:
+    the user comes from the token claims, so no auth_user query is made.
+    A deactivated user keeps access until the token expires.
+    """
+
+    def authenticate(self, request):
+        if self.PUBLIC_PATHS.is_public(request.method, request.path):
+            return None
+
+        token = request.COOKIES.get('access_token')
+        if not token:
+            raise AuthenticationFailed(
+                detail=BaseResponse.error_response("Authentication credentials were not provided.")
+            )
+
+        try:
+            validated_token = self.get_validated_token(token)
+            return LazyTokenUser(validated_token), validated_token
+        except AuthenticationFailed:
+            raise AuthenticationFailed(
+                detail=BaseResponse.error_response("Invalid authentication token.")
+            )
+
+
+class TokenUserAuthenticationMixin:
+    """
+    Opt-in to JWTCookieTokenUserAuthentication for the listed viewset actions:
+
+        token_user_actions = ('list',)
+    """
+    token_user_actions = ()
+
+    def get_authenticators(self):
+        # Runs before the action is resolved, so look it up from the request
+        request = getattr(self, 'request', None)
+        action_map = getattr(self, 'action_map', None) or {}
+        if request is not None and action_map.get(request.method.lower()) in self.token_user_actions:
+            return [JWTCookieTokenUserAuthentication()]
+        return super().get_authenticators()
+
+
 class IsAuthenticatedExceptPaths(BasePermission):
-    PUBLIC_PATHS = [
-        {'url': r'^/api/events/[^/]+/details/$', 'method': 'GET'},
-        {'url': '/api/attendees/', 'method': 'POST'},
-        {'url': '/api/events/current/', 'method': 'GET'},
-        {'url': '/api/schema/', 'method': 'GET'},
-        {'url': '/api/docs/', 'method': 'GET'},
-    ]
+    PUBLIC_PATHS = public_paths
 
     def has_permission(self, request, view):
-        current_path = request.path
-        current_method = request.method
+        if self.PUBLIC_PATHS.is_public(request.method, request.path):
+            return True
 
-        for path_config in self.PUBLIC_PATHS:
-            url_pattern = path_config['url']
+        return request.user and request.user.is_authenticated
 
-            if '{id}' in url_pattern:
-                pattern = url_pattern.replace('{id}', '[^/]+')
-                if re.match(pattern, current_path) and current_method == path_config['method']:
-                    return True
 
-            elif re.match(url_pattern, current_path) and current_method == path_config['method']:
-                return True
+class MetricsTokenAuthentication(BaseAuthentication):
+    """
+    `Authorization: Bearer <settings.METRICS_TOKEN>`, for the scraper of
+    /api/_metrics/. Anonymous, it only grants CanReadMetrics.
+    """
+    scope = 'metrics'
 
-        return request.user and request.user.is_authenticated
+    def authenticate(self, request):
+        expected = getattr(settings, 'METRICS_TOKEN', None)
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if not expected or not header.startswith('Bearer '):
+            return None
+        if not hmac.compare_digest(header[len('Bearer '):].encode(), expected.encode()):
+            raise AuthenticationFailed(
+                detail=BaseResponse.error_response("Invalid metrics token.")
+            )
+        return AnonymousUser(), self.scope
+
+    def authenticate_header(self, request):
+        return 'Bearer'
+
+
+class CanReadMetrics(BasePermission):
+    """ Staff users and the metrics scraper """
+
+    def has_permission(self, request, view):
+        if request.auth == MetricsTokenAuthentication.scope:
+            return True
+        return bool(request.user and request.user.is_authenticated and request.user.is_staff)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from ...utils.constraints import (
+    EXCLUSION_CONSTRAINTS, RECHECK_SECONDS, install_exclusion_constraints, installed_exclusion_constraints,
+    remove_exclusion_constraints
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Install, remove or list the PostgreSQL exclusion constraints enforcing "
+        "\"no overlapping events\" and \"no overlapping sessions per track\". "
+        "While installed, the application skips its own overlap SELECTs on writes. "
+        f"Running application processes see a change within {RECHECK_SECONDS} seconds, "
+        "on their next new database connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['install', 'remove', 'status'])
+        parser.add_argument('names', nargs='*', metavar='constraint',
+                            help=f"Constraints to act on (default: all): {', '.join(EXCLUSION_CONSTRAINTS)}")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, action, names, database, **options):
+        if connections[database].vendor != 'postgresql':
+            raise CommandError("Exclusion constraints need PostgreSQL")
+        unknown = set(names) - set(EXCLUSION_CONSTRAINTS)
+        if unknown:
+            raise CommandError(f"Unknown constraint(s): {', '.join(sorted(unknown))}")
+
+        try:
+            if action == 'install':
+                install_exclusion_constraints(names, using=database)
+            elif action == 'remove':
+                remove_exclusion_constraints(names, using=database)
+        except DatabaseError as e:
+            raise CommandError(f"Could not {action} the constraints: {e}") from e
+
+        installed = installed_exclusion_constraints(database)
+        for name in EXCLUSION_CONSTRAINTS:
+            self.stdout.write(f"{name}: {'installed' if name in installed else 'not installed'}")
+        if action == 'remove':
+            # Until then their writes are checked neither by the database nor by them
+            self.stdout.write(self.style.WARNING(
+                f"Running application processes skip the overlap checks for up to {RECHECK_SECONDS} "
+                "more seconds, until their next new database connection. Restart them if "
+                "they keep persistent connections (CONN_MAX_AGE)."
+            ))
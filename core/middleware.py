@@ -1,5 +1,18 @@
 from django.utils.deprecation import MiddlewareMixin
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .utils.base_response import BaseResponse
+from .utils.limit import RateLimit, set_rate_limit_headers
+from .utils.log import request_context
+from .utils.metrics import registry, start_timer, stop_timer
+from .utils import querywatch
+from django.db import connections
+from contextlib import ExitStack
+import logging
+import re
+import time
+import uuid
 
 class DisableAuthForSwaggerMiddleware(MiddlewareMixin):
     def process_request(self, request):
@@ -8,4 +21,158 @@ class DisableAuthForSwaggerMiddleware(MiddlewareMixin):
             request.auth = None
             return None
 
-        return None
\ No newline at end of file
+        return None
+
+
+class RequestContextMiddleware:
+    """
+    Give each request an id, the client's X-Request-ID when it sent a sane
+    one, and expose it to the log records (core.utils.log) and in the
+    response's X-Request-ID header.
+    """
+    header = 'X-Request-ID'
+    valid_id = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(self.header, '')
+        if not self.valid_id.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+
+        # Cleared on request_finished (core.signals), after Django's own
+        # "Not Found: ..." / "Bad Request: ..." records
+        request_context.set((request_id, time.perf_counter()))
+        response = self.get_response(request)
+        response.headers[self.header] = request_id
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure every request (wall time, time and number of database queries,
+    serializer and renderer time, response size) and aggregate it per
+    resolved route in core.utils.metrics.registry, served by /api/_metrics/.
+    With settings.SERVER_TIMING the measures also go back to the client in
+    the Server-Timing header.
+
+    Routes are labelled with their URL name (e.g. event-detail), requests
+    that resolve to nothing as "unmatched". Removed from the stack when
+    settings.REQUEST_METRICS is off, the serializer and renderer hooks
+    then cost one ContextVar lookup.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'SERVER_TIMING', False)
+
+    def __call__(self, request):
+        timer, token = start_timer()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            stop_timer(token)
+        total = time.perf_counter() - started
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = timer.server_timing(total)
+        match = getattr(request, 'resolver_match', None)
+        registry.observe(match.view_name if match else 'unmatched', request.method, response.status_code, {
+            'request_duration_seconds': total,
+            'request_db_seconds': timer.db,
+            'request_db_queries': timer.queries,
+            'request_serialize_seconds': timer.sections['serialize'],
+            'request_render_seconds': timer.sections['render'],
+            # Streamed bodies are not buffered, their size is unknown here
+            'response_size_bytes': None if response.streaming else len(response.content),
+        })
+        return response
+
+
+class QueryDetectorMiddleware:
+    """
+    Development aid: log the N+1 queries of a request (a query shape run
+    settings.N_PLUS_ONE_THRESHOLD times or more) and its queries slower
+    than settings.SLOW_QUERY_MS, each with the line in core/ that ran it.
+    Findings also go to core.utils.querywatch.collect_findings() blocks,
+    which core.tests.runner uses to fail the API tests adding an N+1.
+    Removed from the stack unless settings.QUERY_DETECTOR is on.
+    """
+    logger = logging.getLogger('core.querywatch')
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_DETECTOR', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 3)
+        slow_ms = getattr(settings, 'SLOW_QUERY_MS', None)
+        self.slow_seconds = None if slow_ms is None else slow_ms / 1e3
+
+    def __call__(self, request):
+        detector = querywatch.QueryShapeDetector(self.threshold, self.slow_seconds)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(detector.execute_wrapper))
+            response = self.get_response(request)
+
+        findings = detector.findings()
+        for finding in findings:
+            self.logger.warning("%s %s: %s", request.method, request.path, querywatch.describe(finding))
+        querywatch.report(findings)
+        return response
+
+
+class RateLimitMiddleware:
+    """
+    Rate limits driven by settings.RATE_LIMITS, checked before URL resolution,
+    authentication and the DRF stack run so rejected floods cost almost nothing.
+
+        RATE_LIMITS = [
+            {'path': r'^/api/login/$', 'methods': ['POST'], 'max_calls': 10, 'period': 60, 'key': 'ip'},
+        ]
+
+    Each rule gets its own counter namespace ('name' or the path pattern).
+    The 'user' key falls back to the client IP here since the JWT cookie has
+    not been authenticated yet.
+    """
+
+    def __init__(self, get_response):
+        rules = getattr(settings, 'RATE_LIMITS', None)
+        if not rules:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.rules = [
+            (
+                re.compile(rule['path']),
+                frozenset(method.upper() for method in rule.get('methods', ())),
+                RateLimit(
+                    rule['max_calls'],
+                    rule['period'],
+                    key=rule.get('key', 'ip'),
+                    scope=rule.get('name', rule['path'])
+                ),
+            )
+            for rule in rules
+        ]
+
+    def __call__(self, request):
+        for pattern, methods, limit in self.rules:
+            if (not methods or request.method in methods) and pattern.match(request.path):
+                result = limit.hit(request)
+                if not result.allowed:
+                    response = JsonResponse(
+                        BaseResponse.error_response("Rate limiter exceeded."),
+                        status=429
+                    )
+                    return set_rate_limit_headers(response, result)
+                return set_rate_limit_headers(self.get_response(request), result)
+
+        return self.get_response(request)
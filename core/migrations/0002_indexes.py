@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendee',
+            index=models.Index(fields=['event', 'email'], name='attendee_event_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['end_date', 'start_date'], name='event_end_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['track', 'start_time', 'end_time'], name='session_track_time_idx'),
+        ),
+    ]
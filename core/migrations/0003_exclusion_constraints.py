@@ -0,0 +1,14 @@
+from django.db import migrations
+
+# Nothing to do in either direction: the exclusion constraints are not part
+# of the schema, they are opt-in and managed with manage.py
+# exclusion_constraints (core.utils.constraints).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_indexes'),
+    ]
+
+    operations = []
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_exclusion_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='registered_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        # Seed the counter from the attendees registered so far
+        migrations.RunSQL(
+            """
+            UPDATE core_event SET registered_count = (
+                SELECT COUNT(*) FROM core_attendee WHERE core_attendee.event_id = core_event.id
+            )
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
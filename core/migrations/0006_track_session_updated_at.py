@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
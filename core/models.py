@@ -1,5 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
+from .utils.constraints import exclusion_violations_as, SESSION_OVERLAP_CONSTRAINT
+from .utils.registration import CapacityReached, release_seats, reserve_seats
+from .utils.validation import (
+    check_capacity, check_event_dates, check_event_overlap, check_session, check_track_name,
+    validation_required
+)
 import uuid
 
 
@@ -11,23 +17,24 @@ class Event(models.Model):
     end_date = models.DateTimeField()
     venue = models.CharField(max_length=255)
     capacity = models.IntegerField()
+    # Maintained by Attendee.save()/delete(), see core.utils.registration
+    registered_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def clean(self):
-        """ Make sure end_date is greater than start_date """
+        """ End date after start date, and no other event at the same time """
+        check_event_dates(self.start_date, self.end_date)
+        check_event_overlap(self.start_date, self.end_date, exclude_id=self.id)
 
-        """ Validation so that the event does not collide with other events at the same time """
-        overlapping_events = Event.objects.filter(
-            start_date__lt=self.end_date,
-            end_date__gt=self.start_date
-        ).exclude(id=self.id)
-
-        if overlapping_events.exists():
-            raise ValidationError("Event overlaps with existing events.")
-
-        if self.end_date <= self.start_date:
-            raise ValidationError("End date must be after start date.")
+    class Meta:
+        indexes = [
+            # Serves both the latest event lookup (ORDER BY end_date DESC)
+            # and the overlap check (end_date > start AND start_date < end)
+            models.Index(fields=['end_date', 'start_date'], name='event_end_start_idx'),
+            # Keyset pagination of the event list
+            models.Index(fields=['start_date', 'id'], name='event_start_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -37,6 +44,13 @@ class Track(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="tracks")
+    # Track and session writes also touch the event's updated_at (core.signals)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        """ Validate track names to be unique within an event """
+        if self.event_id is not None:
+            check_track_name(self.name, self.event_id, exclude_id=self.id)
 
     def __str__(self):
         return f"{self.name} - {self.event.name}"
@@ -51,30 +65,29 @@ class Session(models.Model):
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     speaker = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def clean(self):
         """ Validate sessions to be in the event and not overlapping """
-        if self.start_time >= self.end_time:
-            raise ValidationError("Start time must be before end time.")
-
-        if self.start_time < self.event.start_date or self.end_time > self.event.end_date:
-            raise ValidationError("Session must be within the event time range.")
-
-        if self.track:
-            overlapping_sessions = Session.objects.filter(
-                track=self.track,
-                start_time__lt=self.end_time,
-                end_time__gt=self.start_time
-            ).exclude(id=self.id)
-
-            if overlapping_sessions.exists():
-                raise ValidationError("Session overlaps with another session in the same track.")
+        if None in (self.event_id, self.track_id, self.start_time, self.end_time):
+            # Reported by clean_fields()
+            return
+        check_session(self.start_time, self.end_time, self.event, self.track, exclude_id=self.id)
 
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        # Serializers ran the same rules already, see core.utils.validation
+        if validation_required():
+            self.full_clean()
+        with exclusion_violations_as({SESSION_OVERLAP_CONSTRAINT: "Session overlaps with another session in the same track in event"}):
+            super().save(*args, **kwargs)
 
     class Meta:
+        indexes = [
+            # Overlap check per track
+            models.Index(fields=['track', 'start_time', 'end_time'], name='session_track_time_idx'),
+            # Keyset pagination of the session list
+            models.Index(fields=['start_time', 'id'], name='session_start_id_idx'),
+        ]
         constraints = [
             # Constraint to make sure end_time > start_time
             models.CheckConstraint(
@@ -87,33 +100,78 @@ class Session(models.Model):
         return f"{self.title} - {self.track.name} ({self.event.name})"
 
 
+class AttendeeQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Give the seats back with one UPDATE per event, not one per row. The
+        rows go in a single DELETE, as nothing listens to attendee deletes.
+        Deleting an event drops its attendees without this, and with them
+        the counter.
+        """
+        with transaction.atomic(using=self.db):
+            seats = dict(
+                self.order_by().values_list('event_id').annotate(seats=models.Count('pk'))
+            )
+            deleted = super().delete()
+            for event_id, count in seats.items():
+                release_seats(event_id, count)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Attendee(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
     email = models.EmailField()
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="attendees")
 
+    objects = AttendeeQuerySet.as_manager()
+
     def clean(self):
         event = getattr(self, 'event', None)
         if not event:
             raise ValidationError("Event is required.")
-        
-        if event.attendees.count() >= event.capacity:
-            raise ValidationError("Event capacity has been reached. No more registrations allowed.")
 
-        """ Validate that emails are not duplicates in one event """
-        if Attendee.objects.filter(event=event, email=self.email).exclude(id=self.id).exists():
-            raise ValidationError("Email has been registered for this event.")
+        if self._state.adding:
+            # Fresh read of the counter, the event instance may be stale
+            check_capacity(*Event.objects.filter(pk=event.pk).values_list('registered_count', 'capacity').get())
+
+        # Duplicate emails per event are rejected by the unique_email_per_event
+        # constraint, which full_clean() checks after clean()
 
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        # Serializers ran the same rules already, see core.utils.validation
+        if validation_required():
+            self.full_clean()
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        # Reserve the seat and insert in one transaction: a failed insert
+        # (e.g. duplicate email) rolls the reservation back.
+        with transaction.atomic():
+            if not reserve_seats(self.event_id):
+                raise CapacityReached("Event capacity has been reached.")
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            release_seats(self.event_id)
+        return deleted
 
     class Meta:
         """
         This is done so that the same email cannot be registered for the same event & 
         1 email can be used to register for multiple events.
         """
+        indexes = [
+            # Per-event listings read it in order: the by-event export
+            # (ORDER BY email) and the keyset pages on (event, email)
+            models.Index(fields=['event', 'email'], name='attendee_event_email_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['email', 'event'],
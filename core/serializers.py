@@ -8,6 +8,12 @@ from drf_spectacular.utils import extend_schema, OpenApiResponse
 from rest_framework import serializers
 from .models import Event, Track, Session, Attendee
 from .utils import helpers
+from .utils.registration import CapacityReached
+from .utils.fieldsets import SparseFieldsetSerializerMixin
+from .utils.constraints import exclusion_constraint_installed, exclusion_violations_as, EVENT_OVERLAP_CONSTRAINT, SESSION_OVERLAP_CONSTRAINT
+from .utils.validation import (
+    TrustedWriteSerializerMixin, check_capacity, check_event_dates, check_session, check_track_name, event_timeline
+)
 from datetime import timedelta
 
 
@@ -68,6 +74,14 @@ from datetime import timedelta
 #             )
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Claims read by LazyTokenUser, so stateless endpoints need no user lookup
+        token['username'] = user.username
+        token['is_staff'] = user.is_staff
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         self.user = self.user  # Store user for view access
@@ -178,7 +192,11 @@ class CustomTokenRefreshView(TokenRefreshView):
             )
 
 
-class EventSerializer(serializers.ModelSerializer):
+def _non_field_error(message):
+    return serializers.ValidationError({'non_field_errors': [message]})
+
+
+class EventSerializer(SparseFieldsetSerializerMixin, TrustedWriteSerializerMixin, serializers.ModelSerializer):
 
     start_date = serializers.DateTimeField(
         format="%Y-%m-%dT%H:%M:%S",
@@ -197,16 +215,22 @@ class EventSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Event
-        fields = '__all__'
+        # The seat counter is internal to registrations
+        exclude = ['registered_count']
 
     def validate(self, data):
-        start_date = data.get('start_date')
-        end_date = data.get('end_date')
-
-        latest_event = Event.objects.exclude(id=self.instance.id if self.instance else None).order_by('-end_date').first()
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+
+        # Both rules from one query on the (end_date, start_date) index
+        latest_end_date, overlaps = event_timeline(
+            start_date, end_date,
+            exclude_id=self.instance.id if self.instance else None,
+            overlap=not exclusion_constraint_installed(EVENT_OVERLAP_CONSTRAINT),
+        )
 
-        if latest_event and not self.instance:
-            minimum_start_date = latest_event.end_date + timedelta(days=3)
+        if latest_end_date and not self.instance:
+            minimum_start_date = latest_end_date + timedelta(days=3)
             if start_date <= minimum_start_date:
                 raise serializers.ValidationError(
                     detail=BaseResponse.error_response(
@@ -214,88 +238,71 @@ class EventSerializer(serializers.ModelSerializer):
                     )["message"]
                 )
 
-        if end_date <= start_date:
-            raise serializers.ValidationError(
-                detail=BaseResponse.error_response("End date must be after start date")["message"]
-            )
-
-        overlapping_events = Event.objects.filter(
-            start_date__lt=end_date,
-            end_date__gt=start_date
-        )
-
-        if self.instance:
-            overlapping_events = overlapping_events.exclude(id=self.instance.id)
-
-        if overlapping_events.exists():
+        check_event_dates(start_date, end_date)
+        if overlaps:
             raise serializers.ValidationError(
                 detail=BaseResponse.error_response("Event overlaps with existing events")["message"]
             )
 
         return data
+
+    def create(self, validated_data):
+        with exclusion_violations_as({EVENT_OVERLAP_CONSTRAINT: "Event overlaps with existing events"}, _non_field_error):
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with exclusion_violations_as({EVENT_OVERLAP_CONSTRAINT: "Event overlaps with existing events"}, _non_field_error):
+            return super().update(instance, validated_data)
     
 
-class SessionSerializer(serializers.ModelSerializer):
+class SessionSerializer(SparseFieldsetSerializerMixin, TrustedWriteSerializerMixin, serializers.ModelSerializer):
     
     class Meta:
         model = Session
         fields = '__all__'
+        expandable_fields = {'event': 'EventSerializer', 'track': 'TrackSerializer'}
+        # Track choices (browsable API forms) are labelled with Track.__str__
+        extra_kwargs = {'track': {'queryset': Track.objects.select_related('event')}}
 
     def validate(self, data):
-        start_time = data.get('start_time')
-        end_time = data.get('end_time')
-        event = data.get('event')
-        track = data.get('track')
+        # Partial updates are checked against the stored values
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        event = data.get('event', getattr(self.instance, 'event', None))
+        track = data.get('track', getattr(self.instance, 'track', None))
 
         if not track:
             raise serializers.ValidationError({"track": "Track is required"})
 
-        if end_time <= start_time:
-            raise serializers.ValidationError(
-                detail=BaseResponse.error_response("End time must be after start time")["message"]
-            )
-
-        if start_time < event.start_date or end_time > event.end_date:
-            raise serializers.ValidationError(
-                detail=BaseResponse.error_response("Session must be within event duration")["message"]
-            )
-
-        if track and track.event != event:
-            raise serializers.ValidationError(
-                detail=BaseResponse.error_response("Track does not belong to the selected event")["message"]
-            )
-        
-        overlapping_sessions = Session.objects.filter(
-            track=track,
-            event=event,
-            start_time__lt=end_time,
-            end_time__gt=start_time
-        )
+        check_session(start_time, end_time, event, track, exclude_id=self.instance.id if self.instance else None)
 
-        if self.instance:
-            overlapping_sessions = overlapping_sessions.exclude(id=self.instance.id)
+        return data
 
-        if overlapping_sessions.exists():
-            raise serializers.ValidationError(
-                detail=BaseResponse.error_response("Session overlaps with another session in the same track in event")["message"]
-            )
+    def create(self, validated_data):
+        with exclusion_violations_as({SESSION_OVERLAP_CONSTRAINT: "Session overlaps with another session in the same track in event"}, _non_field_error):
+            return super().create(validated_data)
 
-        return data
+    def update(self, instance, validated_data):
+        with exclusion_violations_as({SESSION_OVERLAP_CONSTRAINT: "Session overlaps with another session in the same track in event"}, _non_field_error):
+            return super().update(instance, validated_data)
     
 
-class AttendeeSerializer(serializers.ModelSerializer):
+class AttendeeSerializer(SparseFieldsetSerializerMixin, TrustedWriteSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Attendee
         fields = ['id', 'name', 'email', 'event']
+        expandable_fields = {'event': 'EventSerializer'}
 
     def validate_name(self, value):
         """Input sanitation of name before saving."""
         return helpers.sanitize_input(value)
 
     def validate(self, data):
-        """Validate so that emails are not duplicated in one event."""
-        event = data.get("event")
-        email = data.get("email")
+        """
+        Capacity check on registration. Duplicated emails in one event are
+        rejected before, by the validator built from unique_email_per_event.
+        """
+        event = data.get("event", getattr(self.instance, 'event', None))
 
         if not event:
             # raise serializers.ValidationError("Event is required.")
@@ -303,48 +310,68 @@ class AttendeeSerializer(serializers.ModelSerializer):
                 detail=BaseResponse.error_response("Event is required.")["message"]
             )
 
-        """ Validasi kapasitas event """
-        if event.attendees.count() >= event.capacity:
-            raise serializers.ValidationError(
-                detail=BaseResponse.error_response("Event capacity has been reached.")["message"]
-            )
-
-        if event and email:
-            if Attendee.objects.filter(event=event, email=email).exists():
-                raise serializers.ValidationError(
-                    detail=BaseResponse.error_response("The fields email, event must make a unique set.")["message"]
-                )
+        # The event field just loaded the event, its counter is fresh
+        if self.instance is None:
+            check_capacity(event.registered_count, event.capacity)
 
         return data
+
+    def create(self, validated_data):
+        # The seat is only taken on insert, a concurrent registration may have won it
+        try:
+            return super().create(validated_data)
+        except CapacityReached:
+            raise _non_field_error(BaseResponse.error_response("Event capacity has been reached.")["message"])
     
 
-class TrackSerializer(serializers.ModelSerializer):
+class AttendeeImportRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk attendee import. Field checks only, the event lookup,
+    duplicate and capacity checks are done set-based for the whole batch.
+    """
+    name = serializers.CharField(max_length=255)
+    email = serializers.EmailField(max_length=254)
+    event = serializers.UUIDField()
+
+    def validate_name(self, value):
+        """Input sanitation of name before saving."""
+        return helpers.sanitize_input(value)
+
+
+class SessionImportRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk session import. Field checks only, the track, event
+    and overlap checks are done for the whole batch (core.utils.schedule).
+    """
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    speaker = serializers.CharField(max_length=255)
+    event = serializers.UUIDField()
+    track = serializers.UUIDField()
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+
+    def validate(self, data):
+        if data['end_time'] <= data['start_time']:
+            raise serializers.ValidationError("End time must be after start time")
+        return data
+
+
+class TrackSerializer(SparseFieldsetSerializerMixin, TrustedWriteSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Track
         fields = "__all__"
+        expandable_fields = {'event': 'EventSerializer'}
 
     def validate_name(self, data):
-        """ Validate track names to be unique within an event and not empty """
+        """ Validate track names not to be empty """
         if not data.strip():
             raise serializers.ValidationError("Track name cannot be empty or whitespace only.")
+        return data
 
-        event_id = self.initial_data.get("event")
-        if not event_id:
-            # raise serializers.ValidationError("Event is required.")
-            raise serializers.ValidationError(
-                detail=BaseResponse.error_response("Event is required.")["message"]
-            )
-
-        if not Event.objects.filter(id=event_id).exists():
-            # raise serializers.ValidationError("Event does not exist.")
-            raise serializers.ValidationError(
-                detail=BaseResponse.error_response("Event does not exist")["message"]
-            )
-
-        if Track.objects.filter(name=data, event_id=event_id).exists():
-            # raise serializers.ValidationError("Track name must be unique within the event.")
-            raise serializers.ValidationError(
-                detail=BaseResponse.error_response("Track name must be unique within the event")["message"]
-            )
-        
-        return data
\ No newline at end of file
+    def validate(self, data):
+        """ Validate track names to be unique within an event """
+        event = data.get('event', getattr(self.instance, 'event', None))
+        name = data.get('name', getattr(self.instance, 'name', None))
+        check_track_name(name, event.pk, exclude_id=self.instance.id if self.instance else None)
+        return data
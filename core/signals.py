@@ -0,0 +1,71 @@
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+from .models import Event, Track, Session
+from .utils.loaders import invalidate_current_event
+from .utils.conditional import touch_event
+from .utils.token_cache import verified_tokens
+from .utils.log import request_context
+from .utils.constraints import RECHECK_SECONDS, installed_exclusion_constraints
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Track)
+@receiver(post_delete, sender=Track)
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+def invalidate_current_event_snapshot(sender, instance, origin=None, **kwargs):
+    """ Any write to the event tree makes the cached current event stale """
+    if origin is None:
+        # Tracks and sessions are part of the event tree: move the event's
+        # updated_at (its ETag/Last-Modified)
+        if sender is not Event:
+            touch_event(instance.event_id)
+        invalidate_current_event()
+        return
+
+    # A delete sends one signal per row, cascades included: touch each event
+    # and drop the snapshot once per delete (the origin instance or
+    # queryset), and leave the events being deleted alone
+    touched = vars(origin).get('_touched_event_ids')
+    if touched is None:
+        touched = vars(origin)['_touched_event_ids'] = set()
+        invalidate_current_event()
+    deleting_events = isinstance(origin, Event) or getattr(origin, 'model', None) is Event
+    if sender is not Event and not deleting_events and instance.event_id not in touched:
+        touched.add(instance.event_id)
+        touch_event(instance.event_id)
+
+
+@receiver(pre_delete, sender=Event)
+@receiver(pre_delete, sender=Track)
+@receiver(pre_delete, sender=Session)
+def reset_touched_events(sender, instance, origin=None, **kwargs):
+    """ All pre_delete signals of a delete come before its post_delete signals """
+    if origin is not None:
+        vars(origin).pop('_touched_event_ids', None)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """ Deactivation, password change or removal must not be masked by cached tokens """
+    verified_tokens.invalidate_user(instance.pk)
+
+
+@receiver(request_finished)
+def clear_request_context(sender, **kwargs):
+    """ Log records after the response are not part of the request anymore """
+    request_context.set(None)
+
+
+@receiver(connection_created)
+def load_installed_exclusion_constraints(sender, connection, **kwargs):
+    """ Look the exclusion constraints up again when a connection opens and the last lookup is old """
+    # Not for the connections Django opens outside the configured databases
+    if connection.alias in connections.settings:
+        installed_exclusion_constraints(connection.alias, max_age=RECHECK_SECONDS)
@@ -0,0 +1,48 @@
+from functools import wraps
+from django.test.runner import DiscoverRunner
+from django.test.utils import iter_test_cases, override_settings
+from ..utils.querywatch import collect_findings, describe
+
+
+class QueryDetectorTestRunner(DiscoverRunner):
+    """
+    manage.py test with core.middleware.QueryDetectorMiddleware on. The
+    tests of `guarded_modules` fail when a request they make runs an N+1
+    (a query shape repeated settings.N_PLUS_ONE_THRESHOLD times), unless
+    marked with core.utils.querywatch.allow_n_plus_one. Queries the test
+    runs itself, outside a request (fixtures, assertions), are not watched.
+    """
+    guarded_modules = ('core.tests.test_apis',)
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.detector_settings = override_settings(QUERY_DETECTOR=True)
+        self.detector_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.detector_settings.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def build_suite(self, *args, **kwargs):
+        suite = super().build_suite(*args, **kwargs)
+        for test in iter_test_cases(suite):
+            if type(test).__module__ in self.guarded_modules:
+                guard_n_plus_one(test)
+        return suite
+
+
+def guard_n_plus_one(test):
+    """ Make `test` fail when the requests it makes run an N+1 """
+    method = getattr(test, test._testMethodName)
+    if getattr(method, 'allow_n_plus_one', False):
+        return
+
+    @wraps(method)
+    def guarded():
+        with collect_findings() as findings:
+            method()
+        repeated = [finding for finding in findings if finding.kind == 'n+1']
+        if repeated:
+            test.fail("N+1 queries:\n" + "\n".join(describe(finding) for finding in repeated))
+
+    setattr(test, test._testMethodName, guarded)
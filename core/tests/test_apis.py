@@ -3,6 +3,9 @@ warnings.filterwarnings("ignore", category=RuntimeWarning, message="Received a n
 
 from django.test import TestCase
 from ..models import Event, Session, Attendee, Track
+from ..apis import AttendeePagination, AttendeeViewSet
+from ..utils.pagination import estimated_count
+from ..utils.metrics import registry as metrics_registry
 from rest_framework.test import APIClient
 import uuid
 from datetime import datetime, timedelta
@@ -14,6 +17,15 @@ import uuid
 from django.urls import reverse
 from django.test import TestCase
 from django.utils import timezone
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
+import base64
+import csv
+import io
+import json
 
 
 User = get_user_model()
@@ -237,6 +249,266 @@ class AttendeeAPISetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['message'], "No attendees found for the given event")
 
+    def test_export_attendees_by_event_csv(self):
+        """ Test streaming the attendees of an event as CSV. """
+        john = Attendee.objects.create(name="John Doe", email="john@example.com", event=self.event)
+        jane = Attendee.objects.create(name="Jane, Doe", email="jane@example.com", event=self.event)
+
+        response = self.client.get(f"{self.url}by-event/{self.event.id}/", {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment;', response['Content-Disposition'])
+
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows, [
+            ['id', 'name', 'email', 'event'],
+            [str(jane.id), 'Jane, Doe', 'jane@example.com', str(self.event.id)],
+            [str(john.id), 'John Doe', 'john@example.com', str(self.event.id)],
+        ])
+
+    def test_export_attendees_by_event_ndjson(self):
+        """ Test streaming the attendees of an event as NDJSON, in chunks. """
+        self.event.capacity = 5
+        self.event.save()
+        for i in range(5):
+            Attendee.objects.create(name=f"Fan {i}", email=f"fan{i}@example.com", event=self.event)
+
+        with patch.object(AttendeeViewSet, 'export_chunk_size', 2):
+            response = self.client.get(f"{self.url}by-event/{self.event.id}/", {'format': 'ndjson'})
+            chunks = list(response.streaming_content)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(chunks), 3)
+        lines = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+        self.assertEqual([line['email'] for line in lines], [f"fan{i}@example.com" for i in range(5)])
+        self.assertEqual(lines[0]['event'], str(self.event.id))
+
+    def test_export_attendees_by_event_empty(self):
+        """ Test that an export of an event without attendees only has the header. """
+        response = self.client.get(f"{self.url}by-event/{uuid.uuid4()}/", {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content).decode().strip(), 'id,name,email,event')
+
+
+class AttendeeBulkImportAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', password='importer123')
+        self.client.force_authenticate(user=self.user)
+        self.event = Event.objects.create(
+            name="Partner Conference",
+            description="Partner onboarding",
+            start_date=datetime(2023, 12, 1, 10, 0),
+            end_date=datetime(2023, 12, 1, 18, 0),
+            venue="Convention Center",
+            capacity=4
+        )
+        Attendee.objects.create(name="Existing", email="existing@example.com", event=self.event)
+        self.url = reverse('attende-bulk')
+
+    def row(self, email, event=None, name="Partner"):
+        return {"name": name, "email": email, "event": str(event or self.event.id)}
+
+    def test_bulk_import_json_with_error_report(self):
+        """ Valid rows are created, the others are reported by row number. """
+        rows = [
+            self.row("a@example.com"),
+            self.row("existing@example.com"),
+            self.row("not-an-email"),
+            self.row("a@example.com"),
+            self.row("b@example.com", event=uuid.uuid4()),
+            self.row("b@example.com"),
+            self.row("c@example.com"),
+            self.row("d@example.com"),
+        ]
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['message'], "Attendees imported successfully")
+        report = response.data['data']
+        self.assertEqual(report['created'], 3)
+        self.assertEqual(report['failed'], 5)
+        errors = {item['row']: item['errors'] for item in report['errors']}
+        self.assertEqual(sorted(errors), [2, 3, 4, 5, 8])
+        self.assertEqual(errors[2]['non_field_errors'], ["The fields email, event must make a unique set."])
+        self.assertIn('email', errors[3])
+        self.assertEqual(errors[4]['non_field_errors'], ["The fields email, event must make a unique set."])
+        self.assertEqual(errors[5]['non_field_errors'], ["Event not found."])
+        self.assertEqual(errors[8]['non_field_errors'], ["Event capacity has been reached."])
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registered_count, 4)
+        self.assertEqual(Attendee.objects.filter(event=self.event).count(), 4)
+
+    def test_bulk_import_csv(self):
+        body = (
+            "name,email,event\n"
+            f"Alice,alice@example.com,{self.event.id}\n"
+            f"<b>Bob</b>,bob@example.com,{self.event.id}\n"
+        )
+        response = self.client.post(self.url, body, content_type='text/csv')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data']['created'], 2)
+        self.assertEqual(Attendee.objects.get(email="bob@example.com").name, "Bob")
+
+    def test_bulk_import_query_count_does_not_grow_with_rows(self):
+        self.event.capacity = 1000
+        self.event.save()
+
+        def queries_for(count, prefix):
+            rows = [self.row(f"{prefix}{i}@example.com") for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(self.url, rows, format='json')
+            self.assertEqual(response.data['data']['created'], count)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(5, "small"), queries_for(400, "large"))
+
+    def test_bulk_import_nothing_imported(self):
+        response = self.client.post(self.url, [self.row("existing@example.com")], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], "No attendee was imported.")
+        self.assertEqual(response.data['data']['failed'], 1)
+
+    def test_bulk_import_rejects_non_list(self):
+        response = self.client.post(self.url, self.row("x@example.com"), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], "Expected a non-empty list of attendees.")
+
+    @override_settings(ATTENDEE_IMPORT_MAX_ROWS=2)
+    def test_bulk_import_batch_size_limit(self):
+        rows = [self.row(f"{i}@example.com") for i in range(3)]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Attendee.objects.filter(email="0@example.com").exists())
+
+    def test_bulk_import_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.url, [self.row("x@example.com")], format='json')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+
+class SessionBulkAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='organizer', password='organizer123')
+        self.client.force_authenticate(user=self.user)
+        self.start = timezone.make_aware(datetime(2031, 3, 1, 8, 0))
+        self.event = Event.objects.create(
+            name="Agenda Day", description="Agenda", venue="Hall", capacity=100,
+            start_date=self.start, end_date=self.start + timedelta(hours=12),
+        )
+        self.track = Track.objects.create(name="Main", event=self.event)
+        self.other_track = Track.objects.create(name="Side", event=self.event)
+        self.existing = Session.objects.create(
+            title="Keynote", event=self.event, track=self.track, speaker="Host",
+            start_time=self.start + timedelta(hours=1), end_time=self.start + timedelta(hours=2),
+        )
+        self.url = reverse('session-bulk')
+
+    def row(self, start, end, title="Talk", track=None, event=None):
+        return {
+            "title": title, "speaker": "Speaker", "description": "Abstract",
+            "event": str(event or self.event.id), "track": str(track or self.track.id),
+            "start_time": (self.start + timedelta(minutes=start)).isoformat(),
+            "end_time": (self.start + timedelta(minutes=end)).isoformat(),
+        }
+
+    def test_bulk_create_with_conflict_report(self):
+        """ Accepted sessions are created, every rejected row is reported with what it overlaps """
+        rows = [
+            self.row(0, 60),                                  # before the keynote
+            self.row(90, 150),                                # overlaps the keynote
+            self.row(100, 180),                               # overlaps the keynote
+            self.row(120, 180, track=self.other_track.id),    # other track, fine
+            self.row(150, 210, track=self.other_track.id),    # overlaps row 4
+            self.row(30, 90),                                 # overlaps row 1 and the keynote
+            self.row(60, 60),                                 # empty interval
+            self.row(700, 800),                               # after the event
+            self.row(600, 660, track=uuid.uuid4()),
+            self.row(600, 660, event=uuid.uuid4()),
+            self.row(180, 240),                               # in the slot row 3 was refused
+        ]
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['message'], "Sessions created successfully")
+        report = response.data['data']
+        self.assertEqual((report['created'], report['failed']), (3, 8))
+        errors = {item['row']: item['errors'] for item in report['errors']}
+        self.assertEqual(sorted(errors), [2, 3, 5, 6, 7, 8, 9, 10])
+        overlap = "Session overlaps with another session in the same track in event"
+        self.assertEqual(errors[2]['non_field_errors'], [overlap])
+        self.assertEqual(errors[2]['conflicts'], {"sessions": [self.existing.id], "rows": []})
+        self.assertEqual(errors[3]['conflicts'], {"sessions": [self.existing.id], "rows": []})
+        self.assertEqual(errors[5]['conflicts'], {"sessions": [], "rows": [4]})
+        self.assertEqual(errors[6]['conflicts'], {"sessions": [self.existing.id], "rows": [1]})
+        self.assertEqual(errors[7]['non_field_errors'], ["End time must be after start time"])
+        self.assertEqual(errors[8]['non_field_errors'], ["Session must be within event duration"])
+        self.assertEqual(errors[9]['track'], ["Track not found."])
+        self.assertEqual(errors[10]['non_field_errors'], ["Track does not belong to the selected event"])
+
+        self.assertEqual(
+            sorted(Session.objects.exclude(pk=self.existing.pk).values_list('track__name', 'start_time')),
+            sorted([
+                ("Main", self.start), ("Main", self.start + timedelta(hours=3)),
+                ("Side", self.start + timedelta(hours=2)),
+            ])
+        )
+
+    def test_bulk_create_csv(self):
+        body = "title,description,speaker,event,track,start_time,end_time\n" + "".join(
+            f"Talk {i},,Speaker,{self.event.id},{self.other_track.id},"
+            f"{(self.start + timedelta(hours=i)).isoformat()},{(self.start + timedelta(hours=i, minutes=45)).isoformat()}\n"
+            for i in range(3)
+        )
+        response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Session.objects.filter(track=self.other_track).count(), 3)
+
+    def test_bulk_create_query_count_does_not_grow_with_rows(self):
+        def queries_for(count, track):
+            rows = [self.row(i * 5, i * 5 + 5, track=track.id) for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(self.url, rows, format='json')
+            self.assertEqual(response.data['data']['created'], count)
+            return len(ctx.captured_queries)
+
+        other = Track.objects.create(name="Other", event=self.event)
+        self.assertEqual(queries_for(3, self.other_track), queries_for(120, other))
+
+    def test_bulk_create_refreshes_the_event(self):
+        """ bulk_create sends no signals, the event tree is still invalidated """
+        cache.clear()
+        self.event.refresh_from_db()
+        updated_at = self.event.updated_at
+        with patch('core.utils.schedule.invalidate_current_event') as invalidate:
+            self.client.post(self.url, [self.row(0, 30)], format='json')
+        invalidate.assert_called_once()
+        self.event.refresh_from_db()
+        self.assertGreater(self.event.updated_at, updated_at)
+
+    def test_bulk_create_nothing_created(self):
+        response = self.client.post(self.url, [self.row(60, 120)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], "No session was created.")
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_bulk_create_rejects_non_list(self):
+        response = self.client.post(self.url, self.row(0, 30), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], "Expected a non-empty list of sessions.")
+
+    @override_settings(SESSION_IMPORT_MAX_ROWS=2)
+    def test_bulk_create_batch_size_limit(self):
+        response = self.client.post(self.url, [self.row(i, i + 1) for i in range(3)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_bulk_create_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.url, [self.row(0, 30)], format='json')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
 
 class TrackAPISetTest(APITestCase):
     def setUp(self):
@@ -492,4 +764,712 @@ class SessionAPISetTestCase(TestCase):
         response = self.client.post("/api/sessions/", invalid_data, format='json')
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn("Track does not belong to the selected event", response.data["message"])
\ No newline at end of file
+        self.assertIn("Track does not belong to the selected event", response.data["message"])
+
+class KeysetPaginationAPITestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='keyset', password='keyset123')
+        self.client.force_authenticate(user=self.user)
+        base = timezone.make_aware(datetime(2030, 1, 1, 10, 0))
+        # Pairs of events share a start date, the id breaks the tie
+        for i in range(7):
+            start = base + timedelta(days=i // 2, microseconds=1)
+            Event.objects.create(
+                name=f"Event {i}", description="Keyset", venue="Hall", capacity=50,
+                start_date=start, end_date=start + timedelta(hours=1),
+            )
+        self.expected = list(Event.objects.order_by('start_date', 'id').values_list('id', flat=True))
+
+    def walk(self, url, params=None):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_mode_walks_every_event_once(self):
+        pages = self.walk('/api/events/', {'pagination': 'cursor', 'page_size': 3})
+
+        self.assertEqual(len(pages), 3)
+        ids = [uuid.UUID(str(item['id'])) for page in pages for item in page['results']['data']]
+        self.assertEqual(ids, self.expected)
+        self.assertNotIn('count', pages[0])
+        self.assertIsNone(pages[0]['previous'])
+        self.assertTrue(pages[0]['results']['success'])
+        self.assertEqual(pages[0]['results']['message'], "Events retrieved successfully")
+
+    def test_cursor_mode_previous_link(self):
+        pages = self.walk('/api/events/', {'pagination': 'cursor', 'page_size': 3})
+
+        response = self.client.get(pages[2]['previous'])
+        self.assertEqual(response.data['results']['data'], pages[1]['results']['data'])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(response.data['results']['data'], pages[0]['results']['data'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_cursor_mode_skips_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/events/', {'pagination': 'cursor', 'page_size': 3})
+        sql = " ".join(q['sql'] for q in ctx.captured_queries).upper()
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_cursor_page_uses_index(self):
+        """ The seek condition and the ordering are answered by event_start_id_idx """
+        if connection.vendor != 'postgresql':
+            self.skipTest("EXPLAIN plans are checked on PostgreSQL only")
+        first = self.client.get('/api/events/', {'pagination': 'cursor', 'page_size': 3})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(first.data['next'])
+
+        queries = [q['sql'] for q in ctx.captured_queries if 'FROM "core_event"' in q['sql']]
+        self.assertTrue(queries)
+        with connection.cursor() as cursor:
+            # On 7 rows Postgres would scan and sort, see IndexUsageTest
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute('REINDEX TABLE "core_event"')
+            cursor.execute('ANALYZE "core_event"')
+            for sql in queries:
+                cursor.execute(f"EXPLAIN {sql}")
+                self.assertIn("event_start_id_idx", "\n".join(row[0] for row in cursor.fetchall()))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/events/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['message'], "No events found for the given page")
+
+    def test_tampered_cursors(self):
+        """ Well-formed cursors with the wrong content get the same empty page """
+        def cursor(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        start_date = Event.objects.order_by('start_date').first().start_date.isoformat()
+        for payload in (
+            {'v': [start_date, str(uuid.uuid4())]},  # no "k"
+            {'k': ['yesterday', str(uuid.uuid4())]},  # not a datetime
+            {'k': [start_date, 'not-a-uuid']},
+            {'k': [start_date, None]},
+            ['not', 'an', 'object'],
+        ):
+            with self.subTest(payload=payload):
+                response = self.client.get('/api/events/', {'cursor': cursor(payload)})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+                self.assertEqual(response.data['message'], "No events found for the given page")
+
+    def test_page_mode_is_the_default(self):
+        response = self.client.get('/api/events/', {'page_size': 3, 'page': 2})
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']['data']), 3)
+
+    def test_attendee_cursor_mode(self):
+        event = Event.objects.order_by('start_date').first()
+        for i in range(5):
+            Attendee.objects.create(name=f"Fan {i}", email=f"fan{i}@example.com", event=event)
+
+        pages = self.walk('/api/attendees/', {'pagination': 'cursor', 'page_size': 2})
+        emails = [item['email'] for page in pages for item in page['results']['data']]
+        self.assertEqual(emails, [f"fan{i}@example.com" for i in range(5)])
+
+
+class ListQueryCountTestCase(APITestCase):
+    """ list() answers empty / out of range / page from one count and one fetch """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='counter', password='counter123')
+        self.client.force_authenticate(user=self.user)
+
+    def create_events(self, count):
+        base = timezone.make_aware(datetime(2030, 1, 1, 10, 0))
+        for i in range(count):
+            Event.objects.create(
+                name=f"Event {i}", description="Count", venue="Hall", capacity=50,
+                start_date=base + timedelta(days=i), end_date=base + timedelta(days=i, hours=1),
+            )
+
+    def test_empty_list(self):
+        for url, queries, message in (
+            ('/api/events/', 1, "No events found"),
+            ('/api/sessions/', 1, "No sessions found"),
+            ('/api/tracks/', 1, "No tracks found"),
+            ('/api/attendees/', 1, "No attendee found"),
+        ):
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(response.data['message'], message)
+
+    def test_page(self):
+        self.create_events(3)
+        event = Event.objects.first()
+        track = Track.objects.create(name="Main", event=event)
+        Session.objects.create(
+            title="Talk", event=event, track=track, speaker="Speaker",
+            start_time=event.start_date, end_time=event.end_date,
+        )
+        Attendee.objects.create(name="Fan", email="fan@example.com", event=event)
+
+        # Attendees below the estimate threshold are counted exactly, no catalog lookup
+        for url, queries in (('/api/events/', 2), ('/api/sessions/', 2), ('/api/tracks/', 2), ('/api/attendees/', 2)):
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_page_out_of_range(self):
+        self.create_events(3)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/events/', {'page': 5})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['message'], "No events found for the given page")
+
+    def test_cursor_page(self):
+        self.create_events(3)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/events/', {'pagination': 'cursor'})
+        self.assertEqual(len(response.data['results']['data']), 3)
+
+    def test_estimated_count_for_big_tables(self):
+        event = Event.objects.create(
+            name="Big", description="Big", venue="Hall", capacity=50,
+            start_date=timezone.make_aware(datetime(2030, 1, 1, 10, 0)),
+            end_date=timezone.make_aware(datetime(2030, 1, 1, 18, 0)),
+        )
+        for i in range(3):
+            Attendee.objects.create(name=f"Fan {i}", email=f"fan{i}@example.com", event=event)
+
+        with patch.object(AttendeePagination, 'estimated_count_threshold', 2), \
+                patch('core.utils.pagination.estimated_count', return_value=250000), \
+                CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/attendees/')
+        self.assertEqual(response.data['count'], 250000)
+        # Counted up to the threshold only, then estimated
+        counts = [q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql'].upper()]
+        self.assertEqual(len(counts), 1)
+        self.assertIn("LIMIT 2", counts[0])
+
+        # Filtered lists need an exact count
+        self.assertIsNone(estimated_count(Attendee.objects.filter(event=event), 0))
+
+
+class WriteQueryCountTestCase(APITestCase):
+    """
+    Create endpoints validate once (the serializer, through the rules of
+    core.utils.validation) and save without running full_clean() again.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', password='writer123')
+        self.client.force_authenticate(user=self.user)
+        self.event = Event.objects.create(
+            name="Write", description="Count", venue="Hall", capacity=50,
+            start_date=timezone.make_aware(datetime(2030, 1, 1, 9, 0)),
+            end_date=timezone.make_aware(datetime(2030, 1, 1, 18, 0)),
+        )
+        self.track = Track.objects.create(name="Main", event=self.event)
+
+    def assertCreateQueries(self, url, data, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+    def test_create_event(self):
+        # Latest end date and overlap in one query (3 days rule), INSERT
+        self.assertCreateQueries('/api/events/', {
+            "name": "Next", "description": "Count", "venue": "Hall", "capacity": 10,
+            "start_date": "2030-02-01T09:00:00", "end_date": "2030-02-01T18:00:00",
+        }, 2)
+
+    def test_create_track(self):
+        # Event, unique name, INSERT, event's updated_at
+        self.assertCreateQueries('/api/tracks/', {"name": "Side", "event": str(self.event.id)}, 4)
+
+    def test_create_session(self):
+        # Event, track with its event, overlap, INSERT, event's updated_at
+        self.assertCreateQueries('/api/sessions/', {
+            "title": "Talk", "speaker": "Speaker", "event": str(self.event.id), "track": str(self.track.id),
+            "start_time": "2030-01-01T10:00:00+07:00", "end_time": "2030-01-01T11:00:00+07:00",
+        }, 5)
+
+    def test_create_attendee(self):
+        # Event, unique email, then SAVEPOINT, seat reservation, INSERT, RELEASE
+        self.assertCreateQueries('/api/attendees/', {
+            "name": "Fan", "email": "fan@example.com", "event": str(self.event.id),
+        }, 6)
+
+
+class SparseFieldsetAPITestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sparse', password='sparse123')
+        self.client.force_authenticate(user=self.user)
+        base = timezone.make_aware(datetime(2030, 1, 1, 10, 0))
+        self.sessions = []
+        for i in range(3):
+            start = base + timedelta(days=i)
+            event = Event.objects.create(
+                name=f"Event {i}", description="A long description " * 50, venue="Hall", capacity=50,
+                start_date=start, end_date=start + timedelta(hours=8),
+            )
+            track = Track.objects.create(name=f"Track {i}", event=event)
+            self.sessions.append(Session.objects.create(
+                title=f"Talk {i}", description="Abstract", event=event, track=track, speaker="Speaker",
+                start_time=start, end_time=start + timedelta(hours=1),
+            ))
+
+    def test_fields_narrow_output_and_sql(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/events/', {'fields': 'id,name'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for item in response.data['results']['data']:
+            self.assertEqual(set(item), {'id', 'name'})
+        select = ctx.captured_queries[-1]['sql']
+        self.assertIn('"core_event"."name"', select)
+        self.assertNotIn('"core_event"."description"', select)
+
+    def test_expand_uses_select_related(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/sessions/', {'fields': 'id,title,start_time', 'expand': 'track,event'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = response.data['results']['data'][0]
+        self.assertEqual(set(item), {'id', 'title', 'start_time', 'track', 'event'})
+        self.assertEqual(item['track']['name'], "Track 0")
+        self.assertEqual(item['event']['name'], "Event 0")
+
+    def test_retrieve_with_fields_and_expand(self):
+        track = self.sessions[1].track
+        response = self.client.get(f'/api/tracks/{track.id}/', {'fields': 'name', 'expand': 'event'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['name'], "Track 1")
+        self.assertEqual(response.data['data']['event']['id'], str(track.event_id))
+        self.assertNotIn('id', response.data['data'])
+
+    def test_fields_keep_keyset_columns_loaded(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/sessions/', {'fields': 'title', 'pagination': 'cursor', 'page_size': 2})
+        self.assertIsNotNone(response.data['next'])
+
+    def test_unknown_names_are_ignored(self):
+        response = self.client.get('/api/attendees/', {'fields': 'id,bogus', 'expand': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get('/api/events/', {'fields': 'id,bogus', 'expand': 'bogus'})
+        self.assertEqual(set(response.data['results']['data'][0]), {'id'})
+
+    def test_writes_ignore_fields(self):
+        event = self.sessions[0].event
+        response = self.client.put(f'/api/events/{event.id}/?fields=id', {
+            "name": "Renamed",
+            "description": event.description,
+            "start_date": "2030-01-01T10:00:00",
+            "end_date": "2030-01-01T18:00:00",
+            "venue": "Hall",
+            "capacity": 50,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('description', response.data['data'])
+
+
+class ListQueryCountGuardTestCase(APITestCase):
+    """
+    Every list endpoint (router lists and detail=False GET actions), the
+    browsable API and the admin pages must run the same number of queries
+    for 2 and for 6 rows per model; a growing count is an N+1.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='guard', password='guard123', email='guard@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.client.force_login(self.user)
+        self.seeded = 0
+
+    def seed(self, count):
+        base = timezone.make_aware(datetime(2030, 1, 1, 10, 0))
+        for i in range(self.seeded, self.seeded + count):
+            start = base + timedelta(days=i)
+            event = Event.objects.create(
+                name=f"Event {i}", description="Guard", venue="Hall", capacity=50,
+                start_date=start, end_date=start + timedelta(hours=8),
+            )
+            track = Track.objects.create(name=f"Track {i}", event=event)
+            Session.objects.create(
+                title=f"Talk {i}", event=event, track=track, speaker="Speaker",
+                start_time=start, end_time=start + timedelta(hours=1),
+            )
+            Attendee.objects.create(name=f"Fan {i}", email=f"fan{i}@example.com", event=event)
+        self.seeded += count
+
+    def list_urls(self):
+        from EvMan.urls import router
+
+        event = Event.objects.order_by('start_date').first()
+        urls = []
+        for _, viewset, basename in router.registry:
+            urls.append(reverse(f'{basename}-list'))
+            for extra in viewset.get_extra_actions():
+                if extra.detail or 'get' not in extra.mapping or extra.url_path == 'current':
+                    continue
+                kwargs = {'event_id': event.id} if 'event_id' in extra.url_path else {}
+                urls.append(reverse(f'{basename}-{extra.url_name}', kwargs=kwargs))
+        return urls
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, urls, params=None):
+        self.seed(2)
+        # Warm up the per-process caches (content types, ...)
+        for url in urls:
+            self.client.get(url, params)
+        small = {url: self.count_queries(url, params) for url in urls}
+        self.seed(4)
+        large = {url: self.count_queries(url, params) for url in urls}
+        self.assertEqual(small, large)
+
+    def test_api_list_endpoints(self):
+        self.seed(1)
+        self.assertConstantQueries(self.list_urls(), {'page_size': 50})
+
+    def test_api_list_endpoints_expanded(self):
+        self.seed(1)
+        urls = ['/api/sessions/', '/api/tracks/', '/api/attendees/']
+        self.assertConstantQueries(urls, {'page_size': 50, 'expand': 'event,track'})
+
+    def test_browsable_api_forms(self):
+        self.assertConstantQueries(['/api/sessions/', '/api/tracks/'], {'page_size': 50, 'format': 'api'})
+
+    def test_admin_pages(self):
+        self.assertConstantQueries([
+            '/admin/core/event/',
+            '/admin/core/track/',
+            '/admin/core/session/',
+            '/admin/core/attendee/',
+            '/admin/core/session/add/',
+        ])
+
+
+class CurrentEventAPITestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = '/api/events/current/'
+        self.event = Event.objects.create(
+            name="Ongoing Event",
+            start_date=now() - timedelta(hours=1),
+            end_date=now() + timedelta(days=1),
+            venue="ytta",
+            description="ytta",
+            capacity=50,
+        )
+
+    def _create_tracks(self, count, sessions_per_track=2):
+        for i in range(count):
+            track = Track.objects.create(name=f"Track {i}", event=self.event)
+            for j in range(sessions_per_track):
+                Session.objects.create(
+                    title=f"Session {i}-{j}",
+                    event=self.event,
+                    track=track,
+                    start_time=self.event.start_date + timedelta(hours=j),
+                    end_time=self.event.start_date + timedelta(hours=j, minutes=30),
+                    speaker="Speaker"
+                )
+
+    def test_current_event_tree(self):
+        """ Test tracks and sessions are nested under the current event """
+        self._create_tracks(2)
+        Track.objects.create(name="Empty Track", event=self.event)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(data['name'], "Ongoing Event")
+        self.assertEqual(len(data['tracks']), 3)
+        sessions = {track['name']: len(track['sessions']) for track in data['tracks']}
+        self.assertEqual(sessions, {"Track 0": 2, "Track 1": 2, "Empty Track": 0})
+
+    def test_current_event_query_count_is_constant(self):
+        """ Test the number of queries does not grow with the number of tracks """
+        self._create_tracks(1)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+        cache.clear()
+        self._create_tracks(10)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['data']['tracks']), 11)
+
+    def test_current_event_served_from_cache(self):
+        """ Test repeated reads do not hit the database """
+        self._create_tracks(2)
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['data']['tracks']), 2)
+
+    def test_current_event_cache_invalidated_on_write(self):
+        """ Test writes to event, track or session refresh the snapshot """
+        self._create_tracks(1)
+        self.client.get(self.url)
+
+        Track.objects.create(name="New Track", event=self.event)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['data']['tracks']), 2)
+
+        self.event.name = "Renamed Event"
+        self.event.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['data']['name'], "Renamed Event")
+
+        Session.objects.filter(track__name="New Track").delete()
+        Track.objects.get(name="New Track").delete()
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['data']['tracks']), 1)
+
+    def test_current_event_cache_expires_with_event(self):
+        """ Test the snapshot is not served after the event has ended """
+        self.client.get(self.url)
+        with patch('core.apis.timezone.now', return_value=self.event.end_date + timedelta(seconds=1)):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_no_current_event(self):
+        """ Test 404 when no event is ongoing """
+        self.event.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['message'], "No ongoing event found")
+
+
+class ConditionalRequestAPITestCase(APITestCase):
+    """ ETag / Last-Modified on event, track and session reads """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='conditional', password='conditional123')
+        self.client.force_authenticate(user=self.user)
+        start = now() - timedelta(hours=1)
+        self.event = Event.objects.create(
+            name="Cached Event", description="Description", venue="Hall", capacity=10,
+            start_date=start, end_date=start + timedelta(days=1),
+        )
+        self.track = Track.objects.create(name="Main", event=self.event)
+        self.session = Session.objects.create(
+            title="Talk", event=self.event, track=self.track, speaker="Speaker",
+            start_time=start + timedelta(hours=2), end_time=start + timedelta(hours=3),
+        )
+        self.event.refresh_from_db()
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_retrieve_not_modified(self):
+        """ Test a matching If-None-Match is answered with an empty 304, before serialization """
+        url = f'/api/events/{self.event.id}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+
+        with patch('core.serializers.EventSerializer.to_representation') as to_representation:
+            with self.assertNumQueries(1):
+                not_modified = self.revalidate(url, response)
+        to_representation.assert_not_called()
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+        not_modified = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_child_writes_change_the_event_validators(self):
+        """ Test track and session writes propagate to the event's ETag """
+        url = f'/api/events/{self.event.id}/'
+        writes = [
+            lambda: Track.objects.create(name="Side", event=self.event),
+            lambda: Session.objects.filter(pk=self.session.pk).get().save(),
+            lambda: self.session.delete(),
+        ]
+        response = self.client.get(url)
+        for write in writes:
+            write()
+            changed = self.revalidate(url, response)
+            self.assertEqual(changed.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(changed['ETag'], response['ETag'])
+            response = changed
+
+    def test_registrations_keep_the_event_validators(self):
+        """ Test a signup neither shows in the event nor changes its ETag """
+        url = f'/api/events/{self.event.id}/'
+        response = self.client.get(url)
+        self.assertNotIn('registered_count', response.data['data'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            attendee = Attendee.objects.create(name="Fan", email="fan@example.com", event=self.event)
+            attendee.delete()
+        self.assertFalse(any('"updated_at"' in q['sql'] for q in ctx.captured_queries))
+        not_modified = self.revalidate(url, response)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_deletes_touch_the_event_once(self):
+        """ Test a delete touches the event once, not once per cascaded or selected row """
+        start = self.session.end_time
+
+        def add_talks():
+            Session.objects.bulk_create([
+                Session(title=f"Talk {i}", event=self.event, track=self.track, speaker="Speaker",
+                        start_time=start + timedelta(minutes=10 * i), end_time=start + timedelta(minutes=10 * i + 5))
+                for i in range(9)
+            ])
+
+        add_talks()
+        side = Track.objects.create(name="Side", event=self.event)
+        url = f'/api/events/{self.event.id}/'
+
+        def touches(delete):
+            response = self.client.get(url)
+            with CaptureQueriesContext(connection) as ctx:
+                delete()
+            updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "core_event"')]
+            self.assertNotEqual(self.revalidate(url, response).status_code, status.HTTP_304_NOT_MODIFIED)
+            return len(updates)
+
+        talks = Session.objects.filter(title__startswith="Talk ")
+        self.assertEqual(touches(talks.delete), 1)
+        # The same queryset deleted again is a new delete
+        add_talks()
+        self.assertEqual(touches(talks.delete), 1)
+        self.assertEqual(touches(lambda: Track.objects.get(pk=self.track.pk).delete()), 1)
+        self.assertEqual(touches(lambda: Track.objects.filter(pk=side.pk).delete()), 1)
+
+    def test_list_not_modified(self):
+        """ Test list pages are revalidated without extra queries, deletes included """
+        Event.objects.create(
+            name="Other Event", description="Description", venue="Hall", capacity=10,
+            start_date=self.event.start_date + timedelta(days=10),
+            end_date=self.event.start_date + timedelta(days=11),
+        )
+        for url in ('/api/events/', '/api/events/?fields=name', '/api/events/?pagination=cursor',
+                    '/api/tracks/?expand=event', '/api/sessions/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                with CaptureQueriesContext(connection) as queries:
+                    not_modified = self.revalidate(url, response)
+                self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+                with self.assertNumQueries(len(queries)):
+                    self.client.get(url)
+
+        response = self.client.get('/api/events/')
+        Event.objects.get(name="Other Event").delete()
+        self.assertEqual(self.revalidate('/api/events/', response).status_code, status.HTTP_200_OK)
+
+    def test_expanded_relations_are_validated(self):
+        """ Test nested objects are part of the ETag """
+        url = f'/api/tracks/{self.track.id}/?expand=event'
+        response = self.client.get(url)
+        self.event.name = "Renamed Event"
+        self.event.save()
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_200_OK)
+        # Without the expansion the track itself did not change
+        url = f'/api/tracks/{self.track.id}/'
+        response = self.client.get(url)
+        self.event.save()
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_current_event_not_modified(self):
+        """ Test the current event is revalidated from its snapshot """
+        url = '/api/events/current/'
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.session.title = "Renamed Talk"
+        self.session.save()
+        changed = self.revalidate(url, response)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertEqual(changed.data['data']['tracks'][0]['sessions'][0]['title'], "Renamed Talk")
+
+    def test_browsable_api_not_validated(self):
+        """ Test only the JSON representation carries validators """
+        response = self.client.get(f'/api/events/{self.event.id}/?format=api')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(REQUEST_METRICS=True, SERVER_TIMING=True)
+class RequestMetricsAPITestCase(APITestCase):
+    """ Server-Timing headers and the /api/_metrics/ aggregates """
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.addCleanup(metrics_registry.reset)
+        self.user = User.objects.create_user(username='metered', password='metered123')
+        self.staff = User.objects.create_user(username='operator', password='operator123', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.event = Event.objects.create(
+            name="Metered", description="Metered", venue="Hall", capacity=10,
+            start_date=timezone.make_aware(datetime(2030, 1, 1, 9, 0)),
+            end_date=timezone.make_aware(datetime(2030, 1, 1, 18, 0)),
+        )
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/events/')
+        timing = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertEqual(set(timing), {'app', 'db', 'serialize', 'render'})
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing['db'])
+
+    def test_aggregates_per_route(self):
+        for _ in range(3):
+            self.client.get('/api/events/')
+        self.client.get(f'/api/events/{self.event.id}/')
+        self.client.get('/api/nowhere/')
+
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get('/api/_metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('evman_requests_total{route="event-list",method="GET",status="200"} 3', body)
+        self.assertIn('evman_requests_total{route="event-detail",method="GET",status="200"} 1', body)
+        self.assertIn('evman_requests_total{route="unmatched",method="GET",status="404"} 1', body)
+        self.assertIn('# TYPE evman_request_duration_seconds summary', body)
+        self.assertIn('evman_request_db_queries_count{route="event-list",method="GET"} 3', body)
+        self.assertIn('evman_request_db_queries{route="event-list",method="GET",quantile="0.5"} 2', body)
+        self.assertRegex(body, r'evman_request_duration_seconds\{route="event-list",method="GET",quantile="0.99"\} [0-9.e-]+')
+
+    def test_metrics_are_protected(self):
+        self.assertEqual(self.client.get('/api/_metrics/').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get('/api/_metrics/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_token(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/_metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, status.HTTP_200_OK)
+        self.assertEqual(client.get('/api/_metrics/', HTTP_AUTHORIZATION='Bearer guess').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get('/api/events/')
+        self.assertNotIn('Server-Timing', response)
+        # Still aggregated for /api/_metrics/
+        self.assertEqual(metrics_registry.statuses, {('event-list', 'GET', 200): 1})
+
+    @override_settings(REQUEST_METRICS=False)
+    def test_disabled(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get('/api/events/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(metrics_registry.routes, {})
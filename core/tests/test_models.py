@@ -1,10 +1,28 @@
 import warnings
 warnings.filterwarnings("ignore", category=RuntimeWarning, message="Received a naive datetime")
 
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from django.core.management import call_command
+from unittest.mock import patch
+import io
+import threading
 from django.core.exceptions import ValidationError
 from ..models import Event, Session, Attendee, Track
-from datetime import datetime
+from datetime import datetime, timedelta
+from django.db import connection, IntegrityError
+from django.test.utils import CaptureQueriesContext
+from ..serializers import EventSerializer, SessionSerializer
+from ..utils.validation import event_timeline, trusted_writes
+from ..utils.constraints import (
+    EVENT_OVERLAP_CONSTRAINT, RECHECK_SECONDS, SESSION_OVERLAP_CONSTRAINT, exclusion_constraint_installed,
+    install_exclusion_constraints, installed_exclusion_constraints
+)
+from django.db.backends.signals import connection_created
+from functools import partial
+from time import monotonic
+from django.utils import timezone
 
 
 class EventModelTest(TestCase):
@@ -101,6 +119,30 @@ class EventModelTest(TestCase):
         event.save()
         self.assertEqual(Event.objects.count(), 2)
 
+    def test_event_timeline(self):
+        """ Latest end date and overlap of the other events, in one query """
+        later = Event.objects.create(
+            name="Later", description="Later", venue="Room 1", capacity=10,
+            start_date=datetime(2023, 12, 10, 10, 0), end_date=datetime(2023, 12, 10, 18, 0),
+        )
+        # Aware datetimes, as read back from the database
+        later.refresh_from_db()
+        self.event1.refresh_from_db()
+        start, end = timezone.make_aware(datetime(2023, 12, 1, 12, 0)), timezone.make_aware(datetime(2023, 12, 1, 14, 0))
+
+        with self.assertNumQueries(1):
+            latest_end_date, overlaps = event_timeline(start, end)
+        self.assertEqual(latest_end_date, later.end_date)
+        self.assertTrue(overlaps)
+
+        # An update is checked against the other events only
+        self.assertEqual(event_timeline(start, end, exclude_id=later.id), (self.event1.end_date, True))
+        self.assertEqual(event_timeline(start, end, exclude_id=self.event1.id), (later.end_date, False))
+        self.assertEqual(event_timeline(start, end, overlap=False), (later.end_date, False))
+
+        Event.objects.all().delete()
+        self.assertEqual(event_timeline(start, end), (None, False))
+
 
 class SessionModelTest(TestCase):
 
@@ -238,6 +280,13 @@ class TrackModelTest(TestCase):
         track = Track.objects.create(name="Cyber Security", event=self.event)
         self.assertEqual(str(track), "Cyber Security - Lele Conference")
 
+    def test_track_name_unique_within_event(self):
+        """ full_clean() runs the same unique name rule as TrackSerializer """
+        Track.objects.create(name="Cyber Security", event=self.event)
+        with self.assertRaises(ValidationError) as ctx:
+            Track(name="Cyber Security", event=self.event).full_clean()
+        self.assertEqual(ctx.exception.message_dict['name'], ["Track name must be unique within the event"])
+
 
 class AttendeeModelTest(TestCase):
     def setUp(self):
@@ -357,4 +406,398 @@ class AttendeeModelTest(TestCase):
             attendee3.full_clean()
 
         self.assertIn("Event capacity has been reached", str(context.exception))
-        self.assertEqual(Attendee.objects.count(), 2)
\ No newline at end of file
+        self.assertEqual(Attendee.objects.count(), 2)
+
+    def test_registered_count_follows_inserts_and_deletes(self):
+        """ Test that the capacity counter is kept in sync with the attendees. """
+        attendee = Attendee.objects.create(name="John Doe", email="john@example.com", event=self.event1)
+        Attendee.objects.create(name="Jane Doe", email="jane@example.com", event=self.event1)
+        self.event1.refresh_from_db()
+        self.assertEqual(self.event1.registered_count, 2)
+
+        attendee.delete()
+        self.event1.refresh_from_db()
+        self.assertEqual(self.event1.registered_count, 1)
+
+        Attendee.objects.filter(event=self.event1).delete()
+        self.event1.refresh_from_db()
+        self.assertEqual(self.event1.registered_count, 0)
+
+    def test_queryset_delete_releases_seats_per_event(self):
+        """ Test that a bulk delete gives the seats back with one UPDATE per event. """
+        for event, count in ((self.event1, 2), (self.event2, 5)):
+            for i in range(count):
+                Attendee.objects.create(name=f"Guest {i}", email=f"guest{i}@example.com", event=event)
+
+        with CaptureQueriesContext(connection) as ctx:
+            Attendee.objects.filter(email__startswith="guest").delete()
+
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "core_event"')]
+        deletes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('DELETE FROM "core_attendee"')]
+        self.assertEqual((len(updates), len(deletes)), (2, 1))
+        self.assertEqual(
+            list(Event.objects.filter(pk__in=[self.event1.pk, self.event2.pk]).values_list('registered_count', flat=True)),
+            [0, 0]
+        )
+
+    def test_event_delete_query_count(self):
+        """ Test that deleting an event costs the same whatever its number of attendees. """
+        def delete_event_with(attendees, day):
+            event = Event.objects.create(
+                name="Crowded", description="Description", venue="Hall", capacity=100,
+                start_date=datetime(2030, 1, day, 9), end_date=datetime(2030, 1, day, 17)
+            )
+            Attendee.objects.bulk_create([
+                Attendee(name=f"Guest {i}", email=f"guest{i}@example.com", event=event) for i in range(attendees)
+            ])
+            with CaptureQueriesContext(connection) as ctx:
+                event.delete()
+            self.assertFalse(Attendee.objects.filter(event_id=event.pk).exists())
+            return [q["sql"] for q in ctx.captured_queries]
+
+        few, many = delete_event_with(2, 1), delete_event_with(20, 2)
+        self.assertEqual(len(few), len(many))
+        # The attendees go with the event, no seat to give back
+        self.assertFalse([sql for sql in many if sql.startswith('UPDATE "core_event"')])
+        self.assertEqual(len([sql for sql in many if sql.startswith('DELETE FROM "core_attendee"')]), 1)
+
+    def test_failed_insert_releases_seat(self):
+        """ Test that a rejected insert does not keep the reserved seat. """
+        Attendee.objects.create(name="John Doe", email="john@example.com", event=self.event1)
+        duplicate = Attendee(name="John Doe", email="john@example.com", event=self.event1)
+        # Skip the application check, as a concurrent request would
+        with patch.object(Attendee, 'full_clean'), self.assertRaises(IntegrityError):
+            duplicate.save()
+
+        self.event1.refresh_from_db()
+        self.assertEqual(self.event1.registered_count, 1)
+
+    def test_capacity_check_does_not_count_attendees(self):
+        """ Test that admission cost does not grow with the number of attendees. """
+        Event.objects.filter(pk=self.event2.pk).update(registered_count=400)
+
+        with CaptureQueriesContext(connection) as ctx:
+            Attendee.objects.create(name="Late", email="late@example.com", event=self.event2)
+
+        sql = " ".join(q["sql"] for q in ctx.captured_queries).upper()
+        self.assertNotIn("COUNT(", sql)
+        self.event2.refresh_from_db()
+        self.assertEqual(self.event2.registered_count, 401)
+
+
+class ConcurrentRegistrationTest(TransactionTestCase):
+    """ Registrations racing for the last seats must never overbook an event """
+
+    def setUp(self):
+        self.event = Event.objects.create(
+            name="Sold Out Conference",
+            description="Few seats, many fans",
+            start_date=datetime(2023, 12, 1, 10, 0),
+            end_date=datetime(2023, 12, 1, 18, 0),
+            venue="Small Room",
+            capacity=5
+        )
+
+    def test_no_overbooking_under_concurrency(self):
+        threads = 40
+        barrier = threading.Barrier(threads)
+        results = []
+
+        def register(i):
+            try:
+                barrier.wait()
+                Attendee.objects.create(name=f"Fan {i}", email=f"fan{i}@example.com", event=self.event)
+                results.append(True)
+            except ValidationError:
+                results.append(False)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=register, args=(i,)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.event.refresh_from_db()
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(results.count(False), threads - 5)
+        self.assertEqual(self.event.registered_count, 5)
+        self.assertEqual(Attendee.objects.filter(event=self.event).count(), 5)
+
+class TrustedWritesTest(TestCase):
+    """ Saves skip full_clean() inside trusted_writes() only """
+
+    def setUp(self):
+        self.event = Event.objects.create(
+            name="Trusted", description="Writes", venue="Hall", capacity=5,
+            start_date=datetime(2030, 1, 1, 9, 0), end_date=datetime(2030, 1, 1, 17, 0),
+        )
+        self.track = Track.objects.create(name="Main", event=self.event)
+
+    def session(self):
+        return Session(
+            title="Talk", speaker="Speaker", event=self.event, track=self.track,
+            start_time=datetime(2030, 1, 1, 10, 0), end_time=datetime(2030, 1, 1, 11, 0),
+        )
+
+    def test_untrusted_save_validates(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.session().save()
+        # full_clean() looked for overlapping sessions
+        self.assertTrue(any('"core_session"' in q['sql'] and q['sql'].startswith('SELECT') for q in ctx.captured_queries))
+
+        with self.assertRaises(ValidationError):
+            self.session().save()
+
+    def test_trusted_save_skips_full_clean(self):
+        # INSERT and the event's updated_at (core.signals), nothing else
+        with trusted_writes(), self.assertNumQueries(2):
+            self.session().save()
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_trust_ends_with_the_block(self):
+        with trusted_writes():
+            pass
+        with self.assertRaises(ValidationError):
+            Attendee(name="Fan", email="not-an-email", event=self.event).save()
+
+
+class IndexUsageTest(TestCase):
+    """
+    EXPLAIN the overlap checks run by the serializers and the per-event
+    attendee listings, and make sure the planner can answer them from the
+    composite indexes. Sequential scans are disabled for the test
+    transaction, since on a few hundred rows Postgres would always pick one.
+
+    The plans must not depend on what earlier tests or autovacuum left
+    behind: the tables hold a history of past events, sessions and
+    attendees, and _plans_for() rebuilds the indexes and statistics of the
+    table before EXPLAIN.
+    """
+
+    def setUp(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest("EXPLAIN plans are checked on PostgreSQL only")
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+        self.event = Event.objects.create(
+            name="Indexed Event",
+            description="Indexed Event",
+            start_date=datetime(2023, 12, 1, 10, 0),
+            end_date=datetime(2023, 12, 1, 18, 0),
+            venue="Convention Center",
+            capacity=100
+        )
+        self.track = Track.objects.create(name="Indexed Track", event=self.event)
+
+        # New events are scheduled after the past ones, new sessions among
+        # the sessions of the day, spread over many tracks
+        start = datetime(2023, 1, 1, 10, 0)
+        past_events = Event.objects.bulk_create([
+            Event(name=f"Past Event {i}", description="Past Event", venue="Hall", capacity=50,
+                  start_date=start + timedelta(hours=12 * i), end_date=start + timedelta(hours=12 * i + 8))
+            for i in range(600)
+        ])
+        tracks = Track.objects.bulk_create([Track(name=f"Track {i}", event=self.event) for i in range(20)])
+        Session.objects.bulk_create([
+            Session(title=f"Session {i}", speaker="Speaker", event=self.event, track=track,
+                    start_time=datetime(2023, 12, 1, 0, 0) + timedelta(minutes=45 * i),
+                    end_time=datetime(2023, 12, 1, 0, 30) + timedelta(minutes=45 * i))
+            for track in tracks + [self.track] for i in range(30)
+        ])
+        Attendee.objects.bulk_create([
+            Attendee(name=f"Attendee {i}", email=f"attendee{i}@example.com", event=event)
+            for event in past_events[:20] + [self.event] for i in range(30)
+        ])
+
+    def _plans_for(self, table, run):
+        """ EXPLAIN every query against `table` issued by `run` """
+        with CaptureQueriesContext(connection) as context:
+            run()
+        plans = []
+        with connection.cursor() as cursor:
+            # Index sizes and row estimates from this test's rows only
+            cursor.execute(f'REINDEX TABLE "{table}"')
+            cursor.execute(f'ANALYZE "{table}"')
+            for query in context.captured_queries:
+                if f'FROM "{table}"' not in query['sql']:
+                    continue
+                cursor.execute(f"EXPLAIN {query['sql']}")
+                plans.append("\n".join(row[0] for row in cursor.fetchall()))
+        self.assertTrue(plans)
+        return plans
+
+    def test_event_validate_uses_index(self):
+        serializer = EventSerializer(data={
+            "name": "Next Event",
+            "description": "Next Event",
+            "start_date": "2023-12-10T10:00:00",
+            "end_date": "2023-12-10T18:00:00",
+            "venue": "Room 1",
+            "capacity": 10,
+        })
+        for plan in self._plans_for('core_event', serializer.is_valid):
+            self.assertIn("event_end_start_idx", plan)
+            # The overlap check as well, not only the latest end date
+            self.assertNotIn("event_start_id_idx", plan)
+
+    def test_session_validate_uses_index(self):
+        serializer = SessionSerializer(data={
+            "title": "Indexed Session",
+            "event": str(self.event.id),
+            "track": str(self.track.id),
+            "start_time": "2023-12-01T11:00:00",
+            "end_time": "2023-12-01T12:00:00",
+            "speaker": "Speaker",
+        })
+        for plan in self._plans_for('core_session', serializer.is_valid):
+            self.assertIn("session_track_time_idx", plan)
+
+    def test_attendee_event_listings_use_index(self):
+        """ The by-event export (ORDER BY email) and the keyset pages on (event, email) """
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username='indexer', password='indexer123'))
+
+        def export():
+            response = client.get(f'/api/attendees/by-event/{self.event.id}/', {'format': 'csv'})
+            b''.join(response.streaming_content)
+
+        def pages():
+            first = client.get('/api/attendees/', {'pagination': 'cursor', 'page_size': 10})
+            client.get(first.data['next'])
+
+        for run in (export, pages):
+            for plan in self._plans_for('core_attendee', run):
+                self.assertIn("attendee_event_email_idx", plan)
+                # Read in index order, not sorted afterwards
+                self.assertNotIn("Sort", plan)
+
+
+class ExclusionConstraintTest(TestCase):
+    """ Overlaps enforced by the EXCLUDE constraints of core.utils.constraints """
+
+    def setUp(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest("Exclusion constraints need PostgreSQL")
+        # The constraints go with the test transaction, so does what was detected
+        detected = patch.dict('core.utils.constraints._installed')
+        detected.start()
+        self.addCleanup(detected.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='excluder', password='excluder123'))
+        self.event = Event.objects.create(
+            name="First Event",
+            description="First Event",
+            start_date=datetime(2023, 12, 1, 10, 0),
+            end_date=datetime(2023, 12, 1, 18, 0),
+            venue="Convention Center",
+            capacity=100
+        )
+        self.track = Track.objects.create(name="Main Track", event=self.event)
+
+    def _install(self, name):
+        with connection.cursor() as cursor:
+            if name == SESSION_OVERLAP_CONSTRAINT:
+                cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gist'")
+                if cursor.fetchone() is None:
+                    self.skipTest("btree_gist extension is not available")
+        install_exclusion_constraints([name])
+
+    def test_installed_constraints_are_detected(self):
+        """ The overlap SELECTs are skipped only for the constraints the database has """
+        self.assertEqual(installed_exclusion_constraints(), frozenset())
+        with self.assertNumQueries(0):
+            installed_exclusion_constraints()
+
+        output = io.StringIO()
+        call_command('exclusion_constraints', 'install', EVENT_OVERLAP_CONSTRAINT, stdout=output)
+        self.assertIn(f"{EVENT_OVERLAP_CONSTRAINT}: installed", output.getvalue())
+        self.assertTrue(exclusion_constraint_installed(EVENT_OVERLAP_CONSTRAINT))
+        self.assertFalse(exclusion_constraint_installed(SESSION_OVERLAP_CONSTRAINT))
+
+        output = io.StringIO()
+        call_command('exclusion_constraints', 'remove', EVENT_OVERLAP_CONSTRAINT, stdout=output)
+        self.assertFalse(exclusion_constraint_installed(EVENT_OVERLAP_CONSTRAINT))
+        self.assertIn("skip the overlap checks", output.getvalue())
+
+        # Without the constraint the application checks event overlaps again
+        overlapping = Event(
+            name="Overlapping", description="Overlapping", venue="Hall", capacity=10,
+            start_date=datetime(2023, 12, 1, 12, 0), end_date=datetime(2023, 12, 1, 20, 0)
+        )
+        with self.assertRaises(ValidationError):
+            overlapping.full_clean()
+
+    def test_change_from_another_process_seen_by_new_connections(self):
+        """ A removal made elsewhere is seen by the first connection opened RECHECK_SECONDS later """
+        self._install(EVENT_OVERLAP_CONSTRAINT)
+        self.assertTrue(exclusion_constraint_installed(EVENT_OVERLAP_CONSTRAINT))
+        with connection.cursor() as cursor:
+            # Behind the back of this process's cache
+            cursor.execute(f'ALTER TABLE core_event DROP CONSTRAINT {EVENT_OVERLAP_CONSTRAINT}')
+
+        opened = partial(connection_created.send, sender=type(connection), connection=connection)
+        opened()
+        self.assertTrue(exclusion_constraint_installed(EVENT_OVERLAP_CONSTRAINT))
+        with patch('core.utils.constraints.monotonic', return_value=monotonic() + RECHECK_SECONDS):
+            opened()
+        self.assertFalse(exclusion_constraint_installed(EVENT_OVERLAP_CONSTRAINT))
+
+    def test_event_overlap_rejected_by_database(self):
+        self._install('event_no_overlap')
+        other = Event.objects.create(
+            name="Second Event",
+            description="Second Event",
+            start_date=datetime(2023, 12, 10, 10, 0),
+            end_date=datetime(2023, 12, 10, 18, 0),
+            venue="Convention Center",
+            capacity=100
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.put(f'/api/events/{other.id}/', {
+                "start_date": "2023-12-01T12:00:00",
+                "end_date": "2023-12-01T20:00:00",
+            }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], "Event overlaps with existing events")
+        # No application side overlap SELECT
+        self.assertFalse([q for q in context.captured_queries if '"core_event"."start_date" <' in q['sql']])
+
+    def test_touching_events_allowed(self):
+        self._install('event_no_overlap')
+        Event.objects.create(
+            name="Back to back",
+            description="Back to back",
+            start_date=datetime(2023, 12, 1, 18, 0),
+            end_date=datetime(2023, 12, 1, 20, 0),
+            venue="Convention Center",
+            capacity=100
+        )
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_session_overlap_rejected_by_database(self):
+        self._install('session_no_overlap_per_track')
+        Session.objects.create(
+            title="First", event=self.event, track=self.track, speaker="Speaker",
+            start_time=datetime(2023, 12, 1, 11, 0), end_time=datetime(2023, 12, 1, 12, 0)
+        )
+        response = self.client.post('/api/sessions/', {
+            "title": "Second",
+            "event": str(self.event.id),
+            "track": str(self.track.id),
+            "start_time": "2023-12-01T11:30:00",
+            "end_time": "2023-12-01T12:30:00",
+            "speaker": "Speaker",
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], "Session overlaps with another session in the same track in event")
+
+        with self.assertRaises(ValidationError):
+            Session.objects.create(
+                title="Third", event=self.event, track=self.track, speaker="Speaker",
+                start_time=datetime(2023, 12, 1, 11, 15), end_time=datetime(2023, 12, 1, 11, 45)
+            )
+        self.assertEqual(Session.objects.count(), 1)
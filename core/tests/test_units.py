@@ -8,13 +8,26 @@ from django.test import TestCase, RequestFactory
 from django.contrib.auth.models import AnonymousUser, User
 # from ..apis import IsAuthenticatedExceptPaths
 from ..authentication import IsAuthenticatedExceptPaths
-from ..authentication import JWTCookieAuthentication
+from ..authentication import JWTCookieAuthentication, JWTCookieTokenUserAuthentication
+from ..serializers import CustomTokenObtainPairSerializer
 from core.utils.base_response import BaseResponse
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework import status
 from ..utils import helpers
-from ..utils.limit import rate_limiter
+from ..utils.limit import rate_limiter, RateLimit, rate_limit_exceeded_response
+from ..apis import AttendeeViewSet
+from ..utils.token_cache import verified_tokens, VerifiedTokenCache
+from ..utils.metrics import Histogram, timed, start_timer, stop_timer
+from ..utils.log import BackgroundHandler, JSONLinesFormatter, RequestContextFilter, request_context
+from django.test import override_settings
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import logging.handlers
 from django.test import TestCase, RequestFactory
 from django.core.cache import cache
 from django.urls import path
@@ -70,6 +83,32 @@ class IsAuthenticatedExceptPathsTest(TestCase):
         self.assertFalse(self.permission.has_permission(request, None))
 
 
+    def test_public_paths_are_method_aware(self):
+        """GET /api/attendees/ and POST /api/events/current/ are not public"""
+        request = self.factory.get('/api/attendees/')
+        request.user = AnonymousUser()
+        self.assertFalse(self.permission.has_permission(request, None))
+
+        request = self.factory.post('/api/events/current/')
+        request.user = AnonymousUser()
+        self.assertFalse(self.permission.has_permission(request, None))
+
+    def test_public_paths_match_whole_path(self):
+        """Public patterns must not match longer paths"""
+        request = self.factory.get('/api/events/current/extra/')
+        request.user = AnonymousUser()
+        self.assertFalse(self.permission.has_permission(request, None))
+
+    def test_authentication_and_permission_share_registry(self):
+        """Both classes must agree on which requests are public"""
+        authentication = JWTCookieAuthentication()
+        for method, path in [('GET', '/api/events/current/'), ('HEAD', '/api/docs/'), ('POST', '/api/attendees/')]:
+            request = self.factory.generic(method, path)
+            request.user = AnonymousUser()
+            self.assertIsNone(authentication.authenticate(request))
+            self.assertTrue(self.permission.has_permission(request, None))
+
+
 class JWTCookieAuthenticationTest(TestCase):
     def setUp(self):
         """ Setup database for testing """
@@ -217,4 +256,697 @@ class TestSanitizeInput(TestCase):
     def test_encoded_ampersand(self):
         input_text = "DESKRIPSI ANALISIS DATA%26INFORMASI"
         expected = "DESKRIPSI ANALISIS DATA&INFORMASI"
-        self.assertEqual(helpers.sanitize_input(input_text), expected)
\ No newline at end of file
+        self.assertEqual(helpers.sanitize_input(input_text), expected)
+
+class RateLimitTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        cache.clear()
+
+    def _hammer(self, limit, threads=200):
+        """ Fire `threads` concurrent hits from one client and count admissions """
+        barrier = threading.Barrier(threads)
+        results = []
+
+        def worker():
+            request = self.factory.get('/api/events/', REMOTE_ADDR='10.0.0.1')
+            barrier.wait()
+            results.append(limit.hit(request).allowed)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return results.count(True)
+
+    @patch('core.utils.limit.time.time', return_value=1_000_020.0)
+    def test_concurrent_hits_locmem_cache(self, mock_time):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual(self._hammer(RateLimit(50, 60)), 50)
+
+    @patch('core.utils.limit.time.time', return_value=1_000_020.0)
+    def test_concurrent_hits_file_cache(self, mock_time):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cache_dir,
+            }}):
+                self.assertEqual(self._hammer(RateLimit(50, 60)), 50)
+
+    def test_keys_are_pluggable(self):
+        request = self.factory.get('/api/events/', REMOTE_ADDR='10.0.0.2')
+        request.user = User.objects.create_user(username="limited", password="limited123")
+        self.assertEqual(RateLimit(1, 60, key='user').get_cache_key(request), f"rate_limit:user:{request.user.pk}")
+        self.assertEqual(RateLimit(1, 60, key='route').get_cache_key(request), "rate_limit:GET:/api/events/")
+        self.assertEqual(RateLimit(1, 60, key=lambda r: "custom").get_cache_key(request), "rate_limit:custom")
+
+    @patch('core.utils.limit.time.time', return_value=1_000_040.0)
+    def test_headers_and_retry_after(self, mock_time):
+        limit = RateLimit(2, 60)
+        request = self.factory.get('/api/events/', REMOTE_ADDR='10.0.0.3')
+
+        first = limit.hit(request)
+        self.assertTrue(first.allowed)
+        self.assertEqual(first.remaining, 1)
+        self.assertEqual(first.reset, 40)
+
+        limit.hit(request)
+        rejected = limit.hit(request)
+        self.assertFalse(rejected.allowed)
+        self.assertEqual(rejected.remaining, 0)
+        # The two admitted hits fall out of the sliding window halfway into the next one
+        self.assertEqual(rejected.retry_after, 70)
+
+        response = rate_limit_exceeded_response(rejected)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], "70")
+        self.assertEqual(response['X-RateLimit-Limit'], "2")
+        self.assertEqual(response['X-RateLimit-Remaining'], "0")
+
+    def test_previous_window_is_weighted(self):
+        limit = RateLimit(10, 60)
+        request = self.factory.get('/api/events/', REMOTE_ADDR='10.0.0.4')
+        with patch('core.utils.limit.time.time', return_value=1_000_019.0):
+            for _ in range(10):
+                self.assertTrue(limit.hit(request).allowed)
+        # 45s into the next window a quarter of the previous one still counts
+        with patch('core.utils.limit.time.time', return_value=1_000_065.0):
+            admitted = sum(limit.hit(request).allowed for _ in range(10))
+        self.assertEqual(admitted, 7)
+
+    def test_viewset_declared_limit(self):
+        client = APIClient(REMOTE_ADDR='10.0.0.5')
+        with patch.dict(AttendeeViewSet.rate_limits, {'create': RateLimit(1, 60, scope='test-create')}):
+            first = client.post('/api/attendees/', {}, format='json')
+            second = client.post('/api/attendees/', {}, format='json')
+        self.assertEqual(first['X-RateLimit-Remaining'], "0")
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(second.data['message'], "Rate limiter exceeded.")
+        self.assertIn('Retry-After', second)
+
+
+class RateLimitMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(RATE_LIMITS=[
+        {'path': r'^/api/login/$', 'methods': ['POST'], 'max_calls': 2, 'period': 60, 'key': 'ip'},
+    ])
+    def test_rejects_before_view_runs(self):
+        client = APIClient()
+        for _ in range(2):
+            response = client.post('/api/login/', {'username': 'nobody', 'password': 'wrong'}, format='json')
+            self.assertNotEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # No authentication, no user lookup: rejected without touching the database
+        with self.assertNumQueries(0):
+            response = client.post('/api/login/', {'username': 'nobody', 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.json()['message'], "Rate limiter exceeded.")
+        self.assertIn('Retry-After', response)
+
+    @override_settings(RATE_LIMITS=[
+        {'path': r'^/api/login/$', 'methods': ['POST'], 'max_calls': 1, 'period': 60},
+        {'path': r'^/api/refresh-token/$', 'methods': ['POST'], 'max_calls': 1, 'period': 60},
+    ])
+    def test_rules_are_namespaced_per_route(self):
+        client = APIClient()
+        client.post('/api/login/', {}, format='json')
+        response = client.post('/api/refresh-token/', {}, format='json')
+        self.assertNotEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['X-RateLimit-Remaining'], "0")
+
+    @override_settings(RATE_LIMITS=[
+        {'path': r'^/api/login/$', 'methods': ['POST'], 'max_calls': 1, 'period': 60},
+    ])
+    def test_other_methods_and_paths_pass_through(self):
+        client = APIClient()
+        client.post('/api/login/', {}, format='json')
+        response = client.get('/api/events/current/')
+        self.assertNotIn('X-RateLimit-Limit', response)
+
+    def test_decorated_views_do_not_share_budget(self):
+        class DummyView:
+            @rate_limiter(1, 1, 1)
+            def first(self, request):
+                return Response()
+
+            @rate_limiter(1, 1, 1)
+            def second(self, request):
+                return Response()
+
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.6')
+        view = DummyView()
+        self.assertEqual(view.first(request).status_code, status.HTTP_200_OK)
+        self.assertEqual(view.second(request).status_code, status.HTTP_200_OK)
+        self.assertEqual(view.first(request).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class VerifiedTokenCacheTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='cached', password='cachedpassword123')
+        self.access_token = str(AccessToken.for_user(self.user))
+        self.authentication = JWTCookieAuthentication()
+        verified_tokens.clear()
+
+    def _authenticate(self):
+        request = self.factory.get('/api/sessions/')
+        request.COOKIES['access_token'] = self.access_token
+        return self.authentication.authenticate(request)
+
+    def test_repeated_requests_skip_verification_and_user_query(self):
+        self._authenticate()
+        with self.assertNumQueries(0), patch.object(JWTCookieAuthentication, 'get_validated_token') as validate:
+            user, token = self._authenticate()
+        validate.assert_not_called()
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.username, 'cached')
+        self.assertEqual(token.payload['user_id'], self.user.id)
+
+    def test_cached_user_is_a_fresh_instance(self):
+        first, _ = self._authenticate()
+        first.username = 'changed'
+        second, _ = self._authenticate()
+        self.assertEqual(second.username, 'cached')
+
+    def test_deactivation_invalidates_cached_token(self):
+        self._authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate()
+
+    def test_password_change_invalidates_cached_token(self):
+        self._authenticate()
+        self.user.set_password('newpassword123')
+        self.user.save()
+        with self.assertNumQueries(1):
+            self._authenticate()
+
+    def test_entry_does_not_outlive_token(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=-1))
+        verified_tokens.set(str(token), token, self.user, verified_tokens.user_version(self.user.pk))
+        self.assertIsNone(verified_tokens.get(str(token)))
+
+    def test_cache_is_bounded(self):
+        tokens = VerifiedTokenCache(max_entries=2)
+        for _ in range(3):
+            token = AccessToken.for_user(self.user)
+            tokens.set(str(token), token, self.user, 0)
+        self.assertEqual(len(tokens._entries), 2)
+
+
+class TokenUserAuthenticationTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='stateless', password='stateless123', email='stateless@example.com', is_staff=True)
+        self.access_token = str(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+        self.authentication = JWTCookieTokenUserAuthentication()
+
+    def test_token_carries_user_claims(self):
+        token = AccessToken(self.access_token)
+        self.assertEqual(token['username'], 'stateless')
+        self.assertTrue(token['is_staff'])
+
+    def test_authenticate_without_user_query(self):
+        request = self.factory.get('/api/sessions/')
+        request.COOKIES['access_token'] = self.access_token
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate(request)
+            self.assertEqual(user.id, self.user.id)
+            self.assertEqual(user.username, 'stateless')
+            self.assertTrue(user.is_staff)
+            self.assertTrue(user.is_authenticated)
+
+    def test_user_row_loaded_lazily(self):
+        request = self.factory.get('/api/sessions/')
+        request.COOKIES['access_token'] = self.access_token
+        user, token = self.authentication.authenticate(request)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'stateless@example.com')
+            self.assertTrue(user.check_password('stateless123'))
+
+    def test_list_endpoints_use_token_user(self):
+        client = APIClient()
+        client.cookies['access_token'] = self.access_token
+        with self.assertNumQueries(1):
+            # Only the tracks query itself, no auth_user lookup
+            response = client.get('/api/tracks/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = client.get('/api/tracks/8f0f753e-9634-4a57-b9d4-40ec77238df2/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ValuesSerializerTest(TestCase):
+    """ The values() path must render exactly what the model serializers render """
+
+    def setUp(self):
+        from ..models import Event, Track, Session, Attendee
+
+        self.event = Event.objects.create(
+            name="Fast Event", description="", venue="Hall", capacity=10,
+            start_date=datetime(2030, 1, 1, 10, 0, 5, 123456), end_date=datetime(2030, 1, 1, 18, 0),
+        )
+        self.track = Track.objects.create(name="Track <1>", event=self.event)
+        Session.objects.create(
+            title="Talk", description=None, event=self.event, track=self.track, speaker="Speaker",
+            start_time=datetime(2030, 1, 1, 10, 30), end_time=datetime(2030, 1, 1, 11, 0),
+        )
+        Attendee.objects.create(name="Fan", email="fan@example.com", event=self.event)
+
+    def assertSameOutput(self, serializer_class, fields=None):
+        from rest_framework.renderers import JSONRenderer
+        from ..utils.fast_serializers import ValuesSerializer
+
+        queryset = serializer_class.Meta.model.objects.all()
+        expected = serializer_class(queryset, many=True, fields=fields).data
+        fast = ValuesSerializer.for_serializer(serializer_class, fields)
+        actual = fast.serialize(queryset.values(*fast.columns))
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_same_output_as_model_serializers(self):
+        from ..serializers import EventSerializer, SessionSerializer, TrackSerializer, AttendeeSerializer
+
+        for serializer_class in (EventSerializer, SessionSerializer, TrackSerializer, AttendeeSerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertSameOutput(serializer_class)
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_same_output_in_another_time_zone(self):
+        from ..serializers import EventSerializer
+
+        self.assertSameOutput(EventSerializer)
+
+    def test_same_output_with_fields(self):
+        from ..serializers import EventSerializer, SessionSerializer
+
+        self.assertSameOutput(EventSerializer, ['name', 'start_date', 'bogus'])
+        self.assertSameOutput(SessionSerializer, ['id', 'event', 'description'])
+
+    def test_unsupported_field(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from rest_framework import serializers as drf_serializers
+        from ..models import Track
+        from ..utils.fast_serializers import ValuesSerializer
+
+        class EventNameSerializer(drf_serializers.ModelSerializer):
+            event_name = drf_serializers.CharField(source='event.name')
+
+            class Meta:
+                model = Track
+                fields = ['id', 'event_name']
+
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer.compile(EventNameSerializer)
+
+
+class FastJSONRendererTest(TestCase):
+    """ FastJSONRenderer must produce the bytes JSONRenderer produces """
+
+    def setUp(self):
+        import uuid
+        from decimal import Decimal
+        from datetime import timezone as dt_timezone
+        from django.utils import timezone as django_timezone
+        from django.utils.translation import gettext_lazy
+
+        self.item = {
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "name": "Café   <tag> \"quoted\"",
+            "start_date": datetime(2030, 1, 1, 10, 0, 5, 123456, tzinfo=dt_timezone.utc),
+            "end_date": django_timezone.make_aware(datetime(2030, 1, 1, 18, 0)),
+            "day": datetime(2030, 1, 1).date(),
+            "price": Decimal("12.50"),
+            "capacity": 10,
+            "ratio": 0.5,
+            "tags": ("a", "b"),
+            "label": gettext_lazy("This field is required."),
+            "nested": {1: None, "ok": True},
+        }
+
+    def assertSameBytes(self, data, accepted_media_type=None, renderer_context=None):
+        from rest_framework.renderers import JSONRenderer
+        from ..utils.renderers import FastJSONRenderer
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type, renderer_context),
+            JSONRenderer().render(data, accepted_media_type, renderer_context),
+        )
+
+    def test_same_bytes(self):
+        payloads = {
+            "plain": self.item,
+            "list": [self.item, self.item],
+            "envelope": BaseResponse.success_response(data=self.item, message="Event retrieved successfully"),
+            "error": BaseResponse.error_response("No ongoing event found"),
+            "empty": None,
+            "paginated": {
+                "count": 2, "next": "http://testserver/api/events/?page=2", "previous": None,
+                "results": BaseResponse.success_response(data=[self.item, self.item]),
+            },
+            "cursor page": {"next": None, "previous": None, "results": [self.item]},
+        }
+        for name, data in payloads.items():
+            with self.subTest(payload=name):
+                self.assertSameBytes(data)
+
+    def test_same_bytes_without_orjson(self):
+        from ..utils import renderers
+
+        with patch.object(renderers, 'orjson', None):
+            self.assertSameBytes(BaseResponse.success_response(data=[self.item]))
+
+    def test_indent_falls_back_to_json_renderer(self):
+        self.assertSameBytes(self.item, 'application/json; indent=4')
+        self.assertSameBytes(self.item, None, {'indent': 2})
+
+    def test_envelope_prefix_is_cached(self):
+        from ..utils.renderers import FastJSONRenderer, _envelope_prefix
+
+        _envelope_prefix.cache_clear()
+        for _ in range(3):
+            FastJSONRenderer().render(BaseResponse.success_response(data=[1], message="Cached"))
+        self.assertEqual(_envelope_prefix.cache_info().misses, 1)
+        self.assertEqual(_envelope_prefix.cache_info().hits, 2)
+
+    def test_api_responses_use_it(self):
+        from rest_framework.renderers import JSONRenderer
+        from ..models import Event
+        from ..utils.renderers import FastJSONRenderer
+
+        Event.objects.create(
+            name="Rendered", description="", venue="Hall", capacity=10,
+            start_date=datetime(2030, 1, 1, 10, 0), end_date=datetime(2030, 1, 1, 18, 0),
+        )
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username="renderer", password="password"))
+        response = client.get('/api/events/')
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertEqual(response.json()["results"]["data"][0]["name"], "Rendered")
+
+
+class TrackScheduleTest(TestCase):
+    """ The interval search must find exactly what a pairwise overlap check finds """
+
+    def test_conflicts_with_stored_sessions(self):
+        from ..utils.schedule import TrackSchedule
+
+        # "long" overlaps "short", as legacy rows can without the exclusion constraint
+        schedule = TrackSchedule([(0, 100, "long"), (10, 20, "short"), (120, 130, "late")])
+        self.assertEqual(schedule.conflicts(50, 60), (["long"], []))
+        self.assertEqual(schedule.conflicts(15, 125), (["long", "short", "late"], []))
+        # Touching intervals do not overlap
+        self.assertEqual(schedule.conflicts(100, 120), ([], []))
+        self.assertEqual(schedule.conflicts(130, 140), ([], []))
+
+        schedule.add(140, 150, 1)
+        schedule.add(100, 110, 2)
+        self.assertEqual(schedule.conflicts(105, 145), (["late"], [2, 1]))
+
+    def test_check_schedule_matches_pairwise_checks(self):
+        import random
+        from ..utils.schedule import check_schedule
+
+        rng = random.Random(7)
+        stored = []
+        for i in range(200):
+            start = rng.randrange(0, 5000)
+            stored.append((rng.choice("ab"), start, start + rng.randrange(1, 60), f"s{i}"))
+        candidates = {}
+        for i in range(300):
+            start = rng.randrange(0, 5000)
+            candidates[i] = (rng.choice("abc"), start, start + rng.randrange(1, 60))
+
+        accepted, rejected = check_schedule(candidates, stored)
+
+        kept = []
+        for key, (track, start, end) in candidates.items():
+            sessions = [s for t, s_start, s_end, s in sorted(stored, key=lambda x: x[1:3])
+                        if t == track and s_start < end and s_end > start]
+            rows = [k for k in kept if candidates[k][0] == track
+                    and candidates[k][1] < end and candidates[k][2] > start]
+            if sessions or rows:
+                self.assertEqual(rejected[key], (sessions, sorted(rows, key=lambda k: candidates[k][1])))
+            else:
+                kept.append(key)
+        self.assertEqual(accepted, kept)
+        self.assertEqual(len(accepted) + len(rejected), len(candidates))
+
+
+class StructuredLoggingTest(TestCase):
+    """ core.utils.log: records handed to a writer thread as JSON lines with the request id """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = f"{self.directory.name}/app.log"
+        self.handler = BackgroundHandler({
+            'class': 'logging.handlers.RotatingFileHandler', 'filename': self.path, 'maxBytes': 2000, 'backupCount': 2,
+        })
+        self.addCleanup(self.handler.close)
+        self.handler.setFormatter(JSONLinesFormatter())
+        self.handler.addFilter(RequestContextFilter())
+        self.logger = logging.getLogger('core.tests.structured')
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+        self.logger.setLevel(logging.WARNING)
+        self.logger.propagate = False
+
+    def entries(self):
+        # Stopping the listener flushes the queue
+        self.handler.close()
+        with open(self.path) as file:
+            return [json.loads(line) for line in file]
+
+    def test_json_lines_with_request_context(self):
+        token = request_context.set(("req-1", time.perf_counter()))
+        try:
+            self.logger.warning("Event not found: ID %s", 42)
+        finally:
+            request_context.reset(token)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            self.logger.error("Failed", exc_info=True)
+
+        first, second = self.entries()
+        self.assertEqual(first['message'], "Event not found: ID 42")
+        self.assertEqual((first['level'], first['logger'], first['request_id']), ("WARNING", 'core.tests.structured', "req-1"))
+        self.assertGreaterEqual(first['elapsed_ms'], 0)
+        self.assertIsNone(second['request_id'])
+        self.assertIn("ValueError: boom", second['exc_info'])
+
+    def test_arguments_are_merged_in_the_calling_thread(self):
+        data = {'name': 'before'}
+        self.logger.warning("Data: %s", data)
+        data['name'] = 'after'
+        self.assertEqual(self.entries()[0]['message'], "Data: {'name': 'before'}")
+
+    def test_disabled_levels_are_not_formatted(self):
+        class Argument:
+            formatted = 0
+
+            def __str__(self):
+                self.formatted += 1
+                return "argument"
+
+        argument = Argument()
+        self.logger.debug("Debug: %s", argument)
+        self.logger.warning("Warning: %s", argument)
+        self.assertEqual(argument.formatted, 1)
+
+    def test_size_based_rotation(self):
+        for i in range(40):
+            self.logger.warning("Entry %s", i)
+        self.handler.close()
+        self.assertTrue(os.path.exists(f"{self.path}.1"))
+        self.assertLessEqual(os.path.getsize(self.path), 2000)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        writing, stalled = threading.Event(), threading.Event()
+
+        class StalledDisk(logging.Handler):
+            def emit(self, record):
+                writing.set()
+                stalled.wait(5)
+
+        with patch.object(logging.handlers, 'StalledDisk', StalledDisk, create=True):
+            handler = BackgroundHandler({'class': 'logging.handlers.StalledDisk'}, queue_size=1)
+        logger = logging.getLogger('core.tests.stalled')
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        logger.propagate = False
+
+        logger.warning("Being written")
+        writing.wait(5)
+        logger.warning("Queued")
+        logger.warning("Dropped")
+        self.assertEqual(handler.dropped, 1)
+        stalled.set()
+        handler.close()
+
+    def test_request_id_header(self):
+        client = APIClient()
+        response = client.get('/api/events/current/', HTTP_X_REQUEST_ID="abc-123")
+        self.assertEqual(response['X-Request-ID'], "abc-123")
+        # Anything else is replaced by a generated id
+        response = client.get('/api/events/current/', HTTP_X_REQUEST_ID="bad id\n")
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+        self.assertIsNone(request_context.get())
+
+
+class RequestMetricsTest(TestCase):
+    def test_histogram_quantiles(self):
+        histogram = Histogram(1e-4, 120)
+        for ms in range(1, 1001):
+            histogram.observe(ms / 1000)
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.sum, 500.5)
+        # Within the 10% bucket growth of the exact value
+        for q, exact in ((0.5, 0.5), (0.95, 0.95), (0.99, 0.99)):
+            self.assertLessEqual(exact, histogram.quantile(q))
+            self.assertLessEqual(histogram.quantile(q), exact * 1.1)
+        self.assertIsNone(Histogram(1, 10).quantile(0.5))
+
+    def test_histogram_clamps_out_of_range_values(self):
+        histogram = Histogram(1, 10)
+        histogram.observe(0.5)
+        histogram.observe(1e6)
+        self.assertEqual(histogram.quantile(0.1), 1)
+        self.assertEqual(histogram.quantile(1), 1e6)
+        self.assertEqual(histogram.buckets[0] + histogram.buckets[-1], 2)
+
+        constant = Histogram(1, 1e5)
+        for _ in range(3):
+            constant.observe(2)
+        self.assertEqual(constant.quantile(0.5), 2)
+
+    def test_timed_counts_nested_calls_once(self):
+        now = [100.0]
+
+        @timed('serialize')
+        def outer():
+            inner()
+            now[0] += 1
+
+        @timed('serialize')
+        def inner():
+            now[0] += 2
+
+        with patch('core.utils.metrics.perf_counter', side_effect=lambda: now[0]) as clock:
+            outer()  # No request measured: nothing to record
+            self.assertEqual(clock.call_count, 0)
+            timer, token = start_timer()
+            try:
+                outer()
+            finally:
+                stop_timer(token)
+        # Timed from outer() only: inner()'s 2 seconds are not added again
+        self.assertEqual(timer.sections['serialize'], 3)
+        self.assertEqual(clock.call_count, 2)
+
+
+
+def tracks_per_event(request):
+    from django.http import JsonResponse
+    from ..models import Event
+
+    # One tracks query per event: the N+1 QueryWatchTest expects to catch
+    tracks = {}
+    for event in Event.objects.all():
+        tracks[str(event.id)] = [track.name for track in event.tracks.all()]
+    return JsonResponse(tracks)
+
+
+urlpatterns = [path('tracks-per-event/', tracks_per_event)]
+
+
+@override_settings(QUERY_DETECTOR=True, N_PLUS_ONE_THRESHOLD=3, SLOW_QUERY_MS=None, ROOT_URLCONF=__name__)
+class QueryWatchTest(TestCase):
+    def setUp(self):
+        from ..models import Event, Track
+
+        start = datetime(2030, 1, 1, 9)
+        events = Event.objects.bulk_create([
+            Event(name=f"Event {i}", description="Description", venue="Hall", capacity=10,
+                  start_date=start + timedelta(days=i), end_date=start + timedelta(days=i, hours=8))
+            for i in range(3)
+        ])
+        Track.objects.bulk_create([Track(name="Main", event=event) for event in events])
+
+    def test_normalize_sql(self):
+        from ..utils.querywatch import normalize_sql
+
+        self.assertEqual(
+            normalize_sql('SELECT "a"."id" FROM "a"\n  WHERE "a"."id" IN (%s, %s, %s) AND "a"."n" = \'it\'\'s\' LIMIT 21'),
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" IN (?, ...) AND "a"."n" = ? LIMIT ?'
+        )
+        self.assertEqual(normalize_sql('SELECT * FROM "t1" WHERE x IN (%s, %s)'),
+                         normalize_sql('SELECT * FROM "t1" WHERE x IN (%s, %s, %s, %s)'))
+
+    def test_detector_groups_queries_by_shape(self):
+        from django.db import connection
+        from ..models import Event
+        from ..utils.querywatch import QueryShapeDetector
+
+        detector = QueryShapeDetector(threshold=3)
+        with connection.execute_wrapper(detector.execute_wrapper):
+            for event in Event.objects.all():
+                list(event.tracks.all())
+        [finding] = detector.findings()
+        self.assertEqual((finding.kind, finding.count), ('n+1', 3))
+        self.assertIn('FROM "core_track"', finding.shape)
+        # The loop above, as no application code ran the queries
+        self.assertEqual(finding.frame[0], os.path.join('core', 'tests', 'test_units.py'))
+        self.assertEqual(finding.frame[2], 'test_detector_groups_queries_by_shape')
+
+        # Prefetched: one query per relation, whatever the number of events
+        detector = QueryShapeDetector(threshold=3)
+        with connection.execute_wrapper(detector.execute_wrapper):
+            for event in Event.objects.prefetch_related('tracks'):
+                list(event.tracks.all())
+        self.assertEqual(detector.findings(), [])
+
+    def test_middleware_logs_n_plus_one(self):
+        with self.assertLogs('core.querywatch', level='WARNING') as logs:
+            self.client.get('/tracks-per-event/')
+        [message] = logs.output
+        self.assertIn('GET /tracks-per-event/: N+1: 3 x SELECT', message)
+        self.assertIn('core/tests/test_units.py', message)
+        self.assertIn('in tracks_per_event()', message)
+
+    def test_runner_fails_tests_adding_n_plus_one(self):
+        import unittest
+        from .runner import guard_n_plus_one
+        from ..utils.querywatch import allow_n_plus_one
+
+        class Probe(unittest.TestCase):
+            def test_n_plus_one(self):
+                APIClient().get('/tracks-per-event/')
+
+            @allow_n_plus_one
+            def test_known_n_plus_one(self):
+                APIClient().get('/tracks-per-event/')
+
+            def test_outside_requests(self):
+                from ..models import Event
+                for event in Event.objects.all():
+                    list(event.tracks.all())
+
+        result = unittest.TestResult()
+        with self.assertLogs('core.querywatch', level='WARNING'):
+            for name in ('test_n_plus_one', 'test_known_n_plus_one', 'test_outside_requests'):
+                probe = Probe(name)
+                guard_n_plus_one(probe)
+                probe.run(result)
+        self.assertEqual(result.testsRun, 3)
+        [(test, message)] = result.failures
+        self.assertEqual(test._testMethodName, 'test_n_plus_one')
+        self.assertIn('N+1 queries:\nN+1: 3 x SELECT', message)
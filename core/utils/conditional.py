@@ -0,0 +1,111 @@
+from collections import namedtuple
+from datetime import datetime
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.http import http_date
+from .fieldsets import EXPAND_PARAM, parse_list_param
+import hashlib
+
+# ETag (quoted) and Last-Modified (datetime) of a representation
+Validators = namedtuple('Validators', ['etag', 'last_modified'])
+
+
+def make_validators(*parts, last_modified=None):
+    """
+    Weak ETag hashing `parts`, which must change whenever the representation
+    does (a version, an updated_at, a count), plus the Last-Modified date.
+    """
+    digest = hashlib.md5('|'.join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+    return Validators(f'W/"{digest}"', last_modified)
+
+
+def touch_event(event_id):
+    """ Move an event's updated_at after a write to one of its tracks or sessions """
+    from ..models import Event
+
+    # Like auto_now, not the database's now() which is frozen for a transaction
+    Event.objects.filter(pk=event_id).update(updated_at=timezone.now())
+
+
+class ConditionalReadMixin:
+    """
+    ETag / Last-Modified on reads, and 304 Not Modified for a matching
+    If-None-Match / If-Modified-Since, answered before anything is serialized.
+
+    Validators come from `last_modified_field` (None disables all of this)
+    of what the view already fetched, so they cost no query: the object on
+    retrieve, the rows of the page on list (primary keys and values, plus
+    the count or cursor state the paginator answers from), and the same
+    field of the relations nested with ?expand=. Only the JSON
+    representation is validated, the browsable API is always rendered.
+
+    Last-Modified has a one second resolution and cannot see a delete,
+    the ETag can: If-None-Match takes precedence when both are sent.
+    """
+    last_modified_field = None
+
+    def conditional_enabled(self):
+        request = getattr(self, 'request', None)
+        return (self.last_modified_field is not None and request is not None
+                and request.method in ('GET', 'HEAD')
+                and getattr(request.accepted_renderer, 'format', None) == 'json')
+
+    def get_expanded_relations(self):
+        serializer_class = self.get_serializer_class()
+        if not hasattr(serializer_class, 'get_expandable_fields'):
+            return []
+        expandable = serializer_class.get_expandable_fields()
+        return [name for name in parse_list_param(self.request, EXPAND_PARAM) or () if name in expandable]
+
+    def get_row_stamps(self, instance, expanded=()):
+        """ Primary key and last modified values of an object and of its expanded relations """
+        stamps = [instance.pk, getattr(instance, self.last_modified_field)]
+        for name in expanded:
+            related = getattr(instance, name)
+            stamps.append(getattr(related, self.last_modified_field, None) if related is not None else None)
+        return stamps
+
+    def get_object_validators(self, instance):
+        if not self.conditional_enabled():
+            return None
+        return self.build_validators(self.get_row_stamps(instance, self.get_expanded_relations()))
+
+    def get_list_validators(self, page):
+        if not self.conditional_enabled() or not page:
+            return None
+        if isinstance(page[0], dict):
+            # .values() rows, never expanded
+            pk, field = self.queryset.model._meta.pk.attname, self.last_modified_field
+            stamps = [stamp for row in page for stamp in (row[pk], row[field])]
+        else:
+            expanded = self.get_expanded_relations()
+            stamps = [stamp for row in page for stamp in self.get_row_stamps(row, expanded)]
+        state = self.paginator.get_page_state() if getattr(self, 'paginator', None) is not None else ()
+        return self.build_validators(stamps, *state)
+
+    def build_validators(self, stamps, *parts):
+        moments = [stamp for stamp in stamps if isinstance(stamp, datetime)]
+        return make_validators(
+            type(self).__name__, *parts, *stamps,
+            last_modified=max(moments) if moments else None
+        )
+
+    def conditional_response(self, validators):
+        """ The 304 (or 412) answering a conditional request, None to go on """
+        if validators is None:
+            return None
+        response = get_conditional_response(
+            self.request._request,
+            etag=validators.etag,
+            last_modified=int(validators.last_modified.timestamp()) if validators.last_modified else None,
+        )
+        if response is not None:
+            self.with_validators(response, validators)
+        return response
+
+    def with_validators(self, response, validators):
+        if validators is not None and response.status_code in (200, 304):
+            response.headers['ETag'] = validators.etag
+            if validators.last_modified is not None:
+                response.headers['Last-Modified'] = http_date(validators.last_modified.timestamp())
+        return response
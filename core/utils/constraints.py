@@ -0,0 +1,155 @@
+from contextlib import contextmanager
+from time import monotonic
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction, IntegrityError
+
+# SQLSTATE raised by PostgreSQL when an EXCLUDE constraint is violated
+EXCLUSION_VIOLATION = '23P01'
+
+EVENT_OVERLAP_CONSTRAINT = 'event_no_overlap'
+SESSION_OVERLAP_CONSTRAINT = 'session_no_overlap_per_track'
+
+# name: (table, definition, extension it needs)
+EXCLUSION_CONSTRAINTS = {
+    EVENT_OVERLAP_CONSTRAINT: (
+        'core_event',
+        'EXCLUDE USING gist (tstzrange(start_date, end_date) WITH &&)',
+        None,
+    ),
+    SESSION_OVERLAP_CONSTRAINT: (
+        'core_session',
+        'EXCLUDE USING gist (track_id WITH =, tstzrange(start_time, end_time) WITH &&)',
+        # btree_gist provides the "=" operator class for track_id
+        'btree_gist',
+    ),
+}
+
+# Age after which a new connection looks the constraints up again, so a
+# change made by another process is picked up without a restart
+RECHECK_SECONDS = 30
+
+# (alias, database name): (names of the constraints found in that database,
+# monotonic() of the lookup)
+_installed = {}
+
+
+def _cache_key(using):
+    return using, connections[using].settings_dict['NAME']
+
+
+def installed_exclusion_constraints(using='default', max_age=None):
+    """
+    Names of the EXCLUSION_CONSTRAINTS present in the database, read from
+    pg_constraint and cached, looked up again when the cache is older than
+    `max_age` seconds. Empty off PostgreSQL. core.signals refreshes it with
+    max_age=RECHECK_SECONDS when a connection opens, before its first query:
+    a change made by manage.py exclusion_constraints in another process is
+    seen by the next connection opened RECHECK_SECONDS later (every request
+    with the default CONN_MAX_AGE = 0).
+    """
+    key = _cache_key(using)
+    cached = _installed.get(key)
+    if cached is not None and (max_age is None or monotonic() - cached[1] < max_age):
+        return cached[0]
+
+    connection = connections[using]
+    names = frozenset()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conname FROM pg_constraint"
+                " WHERE contype = 'x' AND conname = ANY(%s)"
+                " AND connamespace = current_schema()::regnamespace",
+                [list(EXCLUSION_CONSTRAINTS)]
+            )
+            names = frozenset(row[0] for row in cursor.fetchall())
+    _installed[key] = (names, monotonic())
+    return names
+
+
+def exclusion_constraint_installed(name, using='default'):
+    """
+    True when `name` is installed, in which case the database checks the
+    overlap on write and the application skips its own overlap SELECT.
+    """
+    return name in installed_exclusion_constraints(using)
+
+
+def forget_installed_exclusion_constraints(using='default'):
+    _installed.pop(_cache_key(using), None)
+
+
+def install_exclusion_constraints(names=None, using='default'):
+    """
+    Add the named constraints (all by default) that are not installed yet.
+    Fails, adding none, when rows already overlap or a needed extension is
+    not available on the server.
+    """
+    connection = connections[using]
+    forget_installed_exclusion_constraints(using)
+    installed = installed_exclusion_constraints(using)
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            for name in names or EXCLUSION_CONSTRAINTS:
+                if name in installed:
+                    continue
+                table, definition, extension = EXCLUSION_CONSTRAINTS[name]
+                if extension:
+                    cursor.execute(f'CREATE EXTENSION IF NOT EXISTS {extension}')
+                cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}')
+    finally:
+        forget_installed_exclusion_constraints(using)
+
+
+def remove_exclusion_constraints(names=None, using='default'):
+    connection = connections[using]
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            for name in names or EXCLUSION_CONSTRAINTS:
+                table = EXCLUSION_CONSTRAINTS[name][0]
+                cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}')
+    finally:
+        forget_installed_exclusion_constraints(using)
+
+
+class ExclusionViolation(ValidationError):
+    """ Validation error raised for a violated exclusion constraint """
+
+    def __init__(self, message, constraint):
+        super().__init__(message)
+        self.constraint = constraint
+
+
+def _violated_constraint(exc):
+    if isinstance(exc, ExclusionViolation):
+        return exc.constraint
+    cause = exc.__cause__
+    if getattr(cause, 'pgcode', None) == EXCLUSION_VIOLATION:
+        return cause.diag.constraint_name
+    return None
+
+
+@contextmanager
+def exclusion_violations_as(messages, error=None, using='default'):
+    """
+    Turn an exclusion constraint violation raised inside the block into
+    `error(message)` (an ExclusionViolation by default), using the message
+    registered for the constraint name. Violations already translated by an
+    inner block (e.g. Model.save inside serializer.save) are mapped again.
+    The block runs in a savepoint so the surrounding transaction survives,
+    when one of the constraints of `messages` is installed.
+    """
+    if not installed_exclusion_constraints(using).intersection(messages):
+        yield
+        return
+
+    try:
+        with transaction.atomic(using=using):
+            yield
+    except (IntegrityError, ExclusionViolation) as e:
+        constraint = _violated_constraint(e)
+        if constraint in messages:
+            if error is None:
+                raise ExclusionViolation(messages[constraint], constraint) from e
+            raise error(messages[constraint]) from e
+        raise
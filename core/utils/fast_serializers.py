@@ -0,0 +1,131 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601
+from rest_framework.settings import api_settings
+from .metrics import timed
+import threading
+
+
+class ValuesSerializer:
+    """
+    Read-only twin of a ModelSerializer working on `.values()` rows.
+
+    The serializer's fields are introspected once and compiled into one
+    converter per field, reproducing its to_representation() exactly (same
+    types, same datetime formats and time zone), without instantiating
+    serializers, fields or model instances per row. Only plain model fields
+    and primary key relations are supported, anything else is refused when
+    the converters are built rather than serialized differently.
+
+        fast = ValuesSerializer.for_serializer(SessionSerializer)
+        data = fast.serialize(queryset.values(*fast.columns))
+    """
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, converters):
+        self.converters = converters
+        self.columns = [column for _, column, _ in converters]
+
+    @classmethod
+    def compile(cls, serializer_class):
+        serializer = serializer_class()
+        model = serializer_class.Meta.model
+        return cls([
+            (name, cls._column(model, field), cls._converter(field))
+            for name, field in serializer.fields.items() if not field.write_only
+        ])
+
+    @classmethod
+    def for_serializer(cls, serializer_class, fields=None):
+        """
+        Compiled converters for a serializer, narrowed to `fields` like
+        SparseFieldsetSerializerMixin does. Cached per process, keyed on the
+        field names that exist, so arbitrary ?fields= values add no entries.
+        """
+        full = cls._cached((serializer_class, None), lambda: cls.compile(serializer_class))
+        if fields is None:
+            return full
+        names = tuple(name for name, _, _ in full.converters if name in fields)
+        return cls._cached((serializer_class, names), lambda: cls(
+            [converter for converter in full.converters if converter[0] in names]
+        ))
+
+    @classmethod
+    def _cached(cls, key, build):
+        fast = cls._cache.get(key)
+        if fast is None:
+            with cls._cache_lock:
+                fast = cls._cache.setdefault(key, build())
+        return fast
+
+    @staticmethod
+    def _column(model, field):
+        if '.' in field.source or field.source == '*':
+            raise ImproperlyConfigured(f"{field.field_name}: only model fields can use the values() path")
+        return model._meta.get_field(field.source).attname
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                return field.pk_field.to_representation
+            return None
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            if output_format is None:
+                return None
+            return _DateTimeConverter(field, output_format)
+        if isinstance(field, serializers.UUIDField):
+            return str if field.uuid_format == 'hex_verbose' else field.to_representation
+        # str() / int() are what CharField / IntegerField.to_representation do
+        if type(field).to_representation is serializers.CharField.to_representation:
+            return str
+        if type(field).to_representation is serializers.IntegerField.to_representation:
+            return int
+        if isinstance(field, (serializers.CharField, serializers.IntegerField, serializers.BooleanField)):
+            return field.to_representation
+        raise ImproperlyConfigured(f"{field.field_name}: {type(field).__name__} is not supported by the values() path")
+
+    @timed('serialize')
+    def serialize(self, rows):
+        """ List of dicts equal to ModelSerializer(instances, many=True).data """
+        converters = [
+            (name, column, convert.bind() if isinstance(convert, _DateTimeConverter) else convert)
+            for name, column, convert in self.converters
+        ]
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in converters:
+                value = row[column]
+                item[name] = value if value is None or convert is None else convert(value)
+            data.append(item)
+        return data
+
+
+class _DateTimeConverter:
+    """ DateTimeField.to_representation with the time zone resolved once per call """
+
+    def __init__(self, field, output_format):
+        self.field = field
+        self.output_format = output_format
+        self.iso = output_format.lower() == ISO_8601
+
+    def bind(self):
+        field = self.field
+        tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if tz is None:
+            return field.to_representation
+        output_format, iso = self.output_format, self.iso
+
+        def convert(value):
+            if not value or not timezone.is_aware(value):
+                return field.to_representation(value)
+            value = value.astimezone(tz)
+            if iso:
+                value = value.isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return value.strftime(output_format)
+        return convert
@@ -0,0 +1,142 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+from .metrics import timed
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+# Only reads are narrowed, writes always go through the full serializer
+SPARSE_ACTIONS = ('list', 'retrieve')
+
+
+def parse_list_param(request, name):
+    """ ?name=a,b,c as a list, None when the parameter is absent or blank """
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    ModelSerializer mixin taking `fields` and `expand` keyword arguments.
+
+    `fields` keeps only the listed fields in the output. `expand` replaces a
+    relation's primary key by the nested object, for the relations listed in
+    Meta.expandable_fields ({field name: serializer class or its name in the
+    serializer's module}). Expanded fields are kept even when not in `fields`.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        expandable = self.get_expandable_fields()
+        for name in expand or ():
+            if name in expandable and name in self.fields:
+                self.fields[name] = expandable[name](read_only=True)
+
+        if fields is not None:
+            keep = set(fields) | set(expand or ())
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+    @classmethod
+    def get_expandable_fields(cls):
+        expandable = {}
+        for name, serializer in getattr(cls.Meta, 'expandable_fields', {}).items():
+            if isinstance(serializer, str):
+                serializer = import_string(f'{cls.__module__}.{serializer}')
+            expandable[name] = serializer
+        return expandable
+
+    @timed('serialize')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+
+class SparseFieldsetFilter(BaseFilterBackend):
+    """
+    Narrow the SQL to what ?fields= and ?expand= ask for: .only() on the
+    requested columns and select_related() on the expanded relations.
+
+    The primary key, the pagination keyset columns and the view's
+    last_modified_field are always loaded, and nothing is deferred when a
+    requested field is not a plain model field, so the serializer never
+    lazy-loads a column row by row.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'action', None) not in SPARSE_ACTIONS:
+            return queryset
+
+        fields = parse_list_param(request, FIELDS_PARAM)
+        expand = self.get_expand(request, view)
+        meta = queryset.model._meta
+
+        related = [name for name in expand if meta.get_field(name).is_relation]
+        if related:
+            queryset = queryset.select_related(*related)
+
+        if fields is not None:
+            keyset = getattr(getattr(view, 'pagination_class', None), 'keyset_ordering', ())
+            names = {meta.pk.name}
+            # ETag / Last-Modified source, see ConditionalReadMixin
+            if getattr(view, 'last_modified_field', None):
+                names.add(view.last_modified_field)
+            # Relations joined by the view's own queryset cannot be deferred
+            if isinstance(queryset.query.select_related, dict):
+                names.update(queryset.query.select_related)
+            for name in [*fields, *expand, *keyset]:
+                try:
+                    field = meta.get_field(name)
+                except FieldDoesNotExist:
+                    return queryset
+                if not field.concrete:
+                    return queryset
+                names.add(field.name)
+            queryset = queryset.only(*names)
+
+        return queryset
+
+    def get_expand(self, request, view):
+        serializer_class = view.get_serializer_class()
+        if not hasattr(serializer_class, 'get_expandable_fields'):
+            return []
+        expandable = serializer_class.get_expandable_fields()
+        return [name for name in parse_list_param(request, EXPAND_PARAM) or () if name in expandable]
+
+    def get_schema_operation_parameters(self, view):
+        parameters = [{
+            'name': FIELDS_PARAM,
+            'required': False,
+            'in': 'query',
+            'description': 'Comma separated fields to return, e.g. fields=id,name',
+            'schema': {'type': 'string'},
+        }]
+        serializer_class = view.get_serializer_class()
+        if getattr(serializer_class, 'get_expandable_fields', None) and serializer_class.get_expandable_fields():
+            parameters.append({
+                'name': EXPAND_PARAM,
+                'required': False,
+                'in': 'query',
+                'description': 'Comma separated relations to nest instead of their id: '
+                               + ', '.join(serializer_class.get_expandable_fields()),
+                'schema': {'type': 'string'},
+            })
+        return parameters
+
+
+class SparseFieldsetMixin:
+    """
+    Viewset side of ?fields= / ?expand=: SparseFieldsetFilter narrows the
+    queryset and get_serializer() narrows the output, on list and retrieve.
+    """
+    filter_backends = [SparseFieldsetFilter]
+
+    def get_serializer(self, *args, **kwargs):
+        if getattr(self, 'action', None) in SPARSE_ACTIONS and getattr(self, 'request', None) is not None:
+            kwargs.setdefault('fields', parse_list_param(self.request, FIELDS_PARAM))
+            kwargs.setdefault('expand', parse_list_param(self.request, EXPAND_PARAM))
+        return super().get_serializer(*args, **kwargs)
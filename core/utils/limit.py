@@ -1,45 +1,219 @@
+from contextlib import nullcontext
 from functools import wraps
-from django.core.cache import cache
-from django.http import JsonResponse
-from datetime import datetime, timedelta
+from typing import NamedTuple
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
 from .base_response import BaseResponse
 from rest_framework import status
 from rest_framework.response import Response
+import math
+import threading
+import time
 
 
-def rate_limiter(max_calls: int, time_frame: int, reset_time: int):
+def ip_key(request):
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+def user_key(request):
+    """ Authenticated user id, falling back to the client IP for anonymous requests """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{ip_key(request)}"
+
+
+def route_key(request):
+    """ One shared budget per route, regardless of the client """
+    return f"{request.method}:{request.path}"
+
+
+KEY_FUNCTIONS = {
+    'ip': ip_key,
+    'user': user_key,
+    'route': route_key,
+}
+
+# Backends without a native atomic incr (file, database) fall back to
+# BaseCache.incr which is a get + set; serialize those within the process.
+_incr_lock = threading.Lock()
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int
+    retry_after: int
+
+
+class RateLimit:
+    """
+    Sliding window rate limit backed by atomic cache counters.
+
+    Every window of `period` seconds has its own counter which is bumped with
+    cache.incr; the previous window's counter is weighted by how much of it
+    still overlaps the sliding window. No read-modify-write of Python objects
+    takes place, so concurrent requests cannot undercount.
+    - max_calls: Maximum number of requests allowed within `period`.
+    - period: Window length in seconds.
+    - key: 'ip', 'user', 'route' or a callable taking the request.
+    - scope: Namespace of the counters.
+    """
+
+    def __init__(self, max_calls: int, period: int, key='ip', scope: str = '', cache_alias: str = 'default'):
+        self.max_calls = max_calls
+        self.period = period
+        self.key_func = KEY_FUNCTIONS[key] if isinstance(key, str) else key
+        self.scope = scope
+        self.cache_alias = cache_alias
+
+    def get_cache_key(self, request):
+        if self.scope:
+            return f"rate_limit:{self.scope}:{self.key_func(request)}"
+        return f"rate_limit:{self.key_func(request)}"
+
+    def _lock(self, cache):
+        if type(cache).incr is BaseCache.incr:
+            return _incr_lock
+        return nullcontext()
+
+    def _add_or_incr(self, cache, key):
+        # Counters outlive their window so they can serve as the previous one
+        while True:
+            if cache.add(key, 1, timeout=self.period * 2):
+                return 1
+            try:
+                return cache.incr(key)
+            except ValueError:
+                # Expired between add() and incr(), try again
+                continue
+
+    def _retry_after(self, previous, current, elapsed):
+        """ Seconds until one more request fits into the sliding window """
+        budget = self.max_calls - current - 1
+        if budget >= 0:
+            wait = (1 - budget / previous) * self.period - elapsed if previous else 0
+        else:
+            # Only once the current window has become the previous one
+            wait = self.period - elapsed + (1 - (self.max_calls - 1) / current) * self.period
+        return max(1, math.ceil(wait))
+
+    def hit(self, request) -> RateLimitResult:
+        cache = caches[self.cache_alias]
+        now = time.time()
+        window = int(now // self.period)
+        elapsed = now - window * self.period
+        base_key = self.get_cache_key(request)
+        current_key = f"{base_key}:{window}"
+
+        with self._lock(cache):
+            current = self._add_or_incr(cache, current_key)
+        previous = cache.get(f"{base_key}:{window - 1}", 0)
+        estimated = previous * (1 - elapsed / self.period) + current
+        reset = max(1, math.ceil(self.period - elapsed))
+
+        if estimated > self.max_calls:
+            # Rejected requests do not consume the budget
+            with self._lock(cache):
+                try:
+                    cache.decr(current_key)
+                except ValueError:
+                    pass
+            return RateLimitResult(
+                allowed=False,
+                limit=self.max_calls,
+                remaining=0,
+                reset=reset,
+                retry_after=self._retry_after(previous, current - 1, elapsed),
+            )
+
+        return RateLimitResult(
+            allowed=True,
+            limit=self.max_calls,
+            remaining=max(0, self.max_calls - math.ceil(estimated)),
+            reset=reset,
+            retry_after=0,
+        )
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, result: RateLimitResult):
+        super().__init__("Rate limiter exceeded.")
+        self.result = result
+
+
+def set_rate_limit_headers(response, result: RateLimitResult):
+    response['X-RateLimit-Limit'] = str(result.limit)
+    response['X-RateLimit-Remaining'] = str(result.remaining)
+    response['X-RateLimit-Reset'] = str(result.reset)
+    if not result.allowed:
+        response['Retry-After'] = str(result.retry_after)
+    return response
+
+
+def rate_limit_exceeded_response(result: RateLimitResult):
+    response = Response(
+        BaseResponse.error_response("Rate limiter exceeded."),
+        status=status.HTTP_429_TOO_MANY_REQUESTS
+    )
+    return set_rate_limit_headers(response, result)
+
+
+class RateLimitMixin:
+    """
+    Per-view rate limits declared on the viewset, keyed by action name:
+
+        rate_limits = {
+            'create': RateLimit(20, 60, key='ip'),
+        }
+
+    The limit is checked after authentication so that 'user' keys work.
+    """
+    rate_limits = {}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.rate_limit_result = None
+        limit = self.rate_limits.get(getattr(self, 'action', None))
+        if limit is not None:
+            self.rate_limit_result = limit.hit(request)
+            if not self.rate_limit_result.allowed:
+                raise RateLimitExceeded(self.rate_limit_result)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, RateLimitExceeded):
+            return rate_limit_exceeded_response(exc.result)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        result = getattr(self, 'rate_limit_result', None)
+        if result is not None and result.allowed:
+            set_rate_limit_headers(response, result)
+        return response
+
+
+def rate_limiter(max_calls: int, time_frame: int, reset_time: int, key='ip', scope: str = None):
     """
     Rate limiter decorator untuk Django ViewSet.
     - max_calls: Jumlah maksimal permintaan dalam `reset_time` menit.
     - reset_time: Waktu reset cache dalam menit.
+    - key: 'ip', 'user', 'route' atau callable yang menerima request.
+    - scope: Namespace counter, default nama view sehingga setiap view punya budget sendiri.
     """
 
     def decorator(view_func):
+        limit = RateLimit(max_calls, reset_time * 60, key=key, scope=scope or view_func.__qualname__)
+
         @wraps(view_func)
         def wrapper(self, request, *args, **kwargs):
-            # Ambil request dari parameter kedua
-            ip_address = request.META.get('REMOTE_ADDR', 'unknown')
-            cache_key = f"rate_limit:{ip_address}"
-            request_data = cache.get(cache_key, {'count': 0, 'last_reset_time': datetime.now()})
-
-            current_time = datetime.now()
-
-            # Reset hitungan jika melewati reset_time menit
-            if current_time >= request_data['last_reset_time'] + timedelta(minutes=reset_time):
-                request_data = {'count': 0, 'last_reset_time': current_time}
-
-            # Jika melewati batas rate limit
-            if request_data['count'] >= max_calls:
-                return Response(
-                    BaseResponse.error_response("Rate limiter exceeded."),
-                    status=status.HTTP_429_TOO_MANY_REQUESTS
-                )
-
-            # Tambah hitungan
-            request_data['count'] += 1
-            cache.set(cache_key, request_data, timeout=reset_time * 60)
+            result = limit.hit(request)
+            if not result.allowed:
+                return rate_limit_exceeded_response(result)
 
-            return view_func(self, request, *args, **kwargs)
+            response = view_func(self, request, *args, **kwargs)
+            return set_rate_limit_headers(response, result)
 
         return wrapper
     return decorator
@@ -0,0 +1,88 @@
+from rest_framework import status
+from rest_framework.response import Response
+from .base_response import BaseResponse
+from .conditional import ConditionalReadMixin
+from .fast_serializers import ValuesSerializer
+from .fieldsets import EXPAND_PARAM, FIELDS_PARAM, parse_list_param
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PaginatedListMixin(ConditionalReadMixin):
+    """
+    Shared list() for the paginated viewsets.
+
+    "empty", "page out of range" and the page itself are told apart from
+    what the paginator already ran (one COUNT(*) and one page fetch, or one
+    fetch in cursor mode) instead of a separate exists() beforehand.
+
+    Viewsets set `list_messages` and filter the list through
+    get_list_queryset(); errors raised there are reported like the others.
+
+    Pages are serialized from .values() rows by a ValuesSerializer compiled
+    from the viewset's serializer (same output, no per-row serializer and
+    model instances), except for ?expand= which needs nested serializers.
+
+    With a `last_modified_field`, a matching conditional request is answered
+    with a 304 once the page is fetched (see ConditionalReadMixin).
+    """
+    list_messages = {
+        'empty': "No items found",
+        'out_of_range': "No items found for the given page",
+        'success': "Items retrieved successfully",
+    }
+    values_serialization = True
+
+    def get_list_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_values_serializer(self):
+        if not self.values_serialization or parse_list_param(self.request, EXPAND_PARAM):
+            return None
+        return ValuesSerializer.for_serializer(
+            self.get_serializer_class(), parse_list_param(self.request, FIELDS_PARAM)
+        )
+
+    def list(self, request, *args, **kwargs):
+        try:
+            queryset = self.get_list_queryset()
+            fast = self.get_values_serializer()
+            if fast is not None:
+                # The keyset and validator columns are needed even when ?fields= leaves them out
+                extra = [*getattr(self.pagination_class, 'keyset_ordering', ())]
+                if self.conditional_enabled():
+                    extra += [queryset.model._meta.pk.attname, self.last_modified_field]
+                queryset = queryset.values(*fast.columns, *dict.fromkeys(c for c in extra if c not in fast.columns))
+
+            page = self.paginate_queryset(queryset)
+            if page is None:
+                page = list(queryset)
+
+            if not page:
+                empty = self.paginator is None or self.paginator.is_empty()
+                message = self.list_messages['empty' if empty else 'out_of_range']
+                logger.warning(message)
+                return Response(
+                    BaseResponse.error_response(message),
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            validators = self.get_list_validators(page)
+            not_modified = self.conditional_response(validators)
+            if not_modified is not None:
+                return not_modified
+
+            data = BaseResponse.success_response(
+                data=fast.serialize(page) if fast is not None else self.get_serializer(page, many=True).data,
+                message=self.list_messages['success']
+            )
+            if self.paginator is None:
+                return self.with_validators(Response(data), validators)
+            return self.with_validators(self.get_paginated_response(data), validators)
+        except Exception as e:
+            logger.error("Error in %s list view: %s", type(self).__name__, str(e), exc_info=True)
+            return Response(
+                BaseResponse.error_response("An internal server error occurred. Please try again later."),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
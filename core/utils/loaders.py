@@ -0,0 +1,139 @@
+from django.core.cache import cache
+from django.db import connection
+from datetime import timedelta
+from ..models import Event
+import math
+
+
+def load_current_event(current_time):
+    """
+    Load the ongoing event together with its tracks and sessions.
+
+    The whole event -> tracks -> sessions tree is built from two set-based
+    queries (one for the event, one LEFT JOIN for tracks and sessions),
+    so the number of round-trips does not grow with the number of tracks.
+    Returns None when no event is running at `current_time`.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT id, name, description, start_date, end_date, venue, capacity, created_at, updated_at
+            FROM core_event
+            WHERE %s BETWEEN start_date AND end_date
+            LIMIT 1
+        """, [current_time])
+
+        event = cursor.fetchone()
+        if not event:
+            return None
+
+        event_data = {
+            "id": event[0],
+            "name": event[1],
+            "description": event[2],
+            "start_date": event[3],
+            "end_date": event[4],
+            "venue": event[5],
+            "capacity": event[6],
+            "created_at": event[7],
+            "updated_at": event[8],
+            "tracks": []
+        }
+
+        cursor.execute("""
+            SELECT t.id, t.name, s.id, s.title, s.description, s.start_time, s.end_time, s.speaker
+            FROM core_track t
+            LEFT JOIN core_session s ON s.track_id = t.id
+            WHERE t.event_id = %s
+            ORDER BY t.name, t.id, s.start_time
+        """, [event[0]])
+
+        tracks = {}
+        for row in cursor.fetchall():
+            track_data = tracks.get(row[0])
+            if track_data is None:
+                track_data = {
+                    "id": row[0],
+                    "name": row[1],
+                    "sessions": []
+                }
+                tracks[row[0]] = track_data
+                event_data["tracks"].append(track_data)
+
+            # LEFT JOIN yields a single NULL session row for empty tracks
+            if row[2] is not None:
+                track_data["sessions"].append({
+                    "id": row[2],
+                    "title": row[3],
+                    "description": row[4],
+                    "start_time": row[5],
+                    "end_time": row[6],
+                    "speaker": row[7]
+                })
+
+    return event_data
+
+
+CURRENT_EVENT_CACHE_PREFIX = "current_event"
+CURRENT_EVENT_GENERATION_KEY = "current_event:generation"
+# Upper bound for caching "no ongoing event" when no upcoming event is known
+CURRENT_EVENT_EMPTY_TIMEOUT = 60 * 60
+
+
+def _current_event_generation():
+    return cache.get_or_set(CURRENT_EVENT_GENERATION_KEY, 0, timeout=None)
+
+
+def invalidate_current_event():
+    """
+    Drop the cached current event snapshot.
+
+    Bumping the generation (instead of deleting a key) makes sure a reader
+    that loaded the tree before the write cannot store a stale snapshot
+    under the key that the next reader will use.
+    """
+    try:
+        cache.incr(CURRENT_EVENT_GENERATION_KEY)
+    except ValueError:
+        cache.set(CURRENT_EVENT_GENERATION_KEY, 1, timeout=None)
+
+
+def get_current_event_snapshot(current_time):
+    """
+    Return the current event tree, served from cache whenever possible.
+
+    The snapshot records the event id and the window (start_date..end_date)
+    it is valid for, expires by itself when the event ends and is
+    invalidated on every Event, Track or Session write (see core.signals).
+    """
+    cache_key = f"{CURRENT_EVENT_CACHE_PREFIX}:{_current_event_generation()}"
+    snapshot = cache.get(cache_key)
+    if snapshot and snapshot["valid_from"] <= current_time <= snapshot["valid_until"]:
+        return snapshot["data"]
+
+    event_data = load_current_event(current_time)
+    if event_data:
+        snapshot = {
+            "event_id": event_data["id"],
+            "valid_from": event_data["start_date"],
+            "valid_until": event_data["end_date"],
+            "data": event_data,
+        }
+    else:
+        # Nothing is running: the answer holds until the next event starts
+        next_start = Event.objects.filter(start_date__gt=current_time) \
+            .order_by("start_date").values_list("start_date", flat=True).first()
+        valid_until = current_time + timedelta(seconds=CURRENT_EVENT_EMPTY_TIMEOUT)
+        if next_start and next_start < valid_until:
+            valid_until = next_start
+        snapshot = {
+            "event_id": None,
+            "valid_from": current_time,
+            "valid_until": valid_until,
+            "data": None,
+        }
+
+    timeout = math.ceil((snapshot["valid_until"] - current_time).total_seconds())
+    if timeout > 0:
+        cache.set(cache_key, snapshot, timeout=timeout)
+
+    return event_data
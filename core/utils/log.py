@@ -0,0 +1,113 @@
+from contextvars import ContextVar
+from django.utils.module_loading import import_string
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
+import logging
+import queue
+import time
+import traceback
+
+# (request id, perf_counter() at the start of the request) of the request
+# being served, set by core.middleware.RequestContextMiddleware
+request_context = ContextVar('request_context', default=None)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp records with the id of the request they were logged in and the
+    milliseconds elapsed since it started (None outside a request). Attach
+    it to the handler receiving the records: it must run in the thread
+    that logs, not in a BackgroundHandler's writer thread.
+    """
+
+    def filter(self, record):
+        context = request_context.get()
+        if context is None:
+            record.request_id, record.elapsed_ms = None, None
+        else:
+            record.request_id = context[0]
+            record.elapsed_ms = round((time.perf_counter() - context[1]) * 1e3, 3)
+        return True
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """ One JSON object per record: time, level, logger, message, request id and timing """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'elapsed_ms': getattr(record, 'elapsed_ms', None),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+    def formatTime(self, record, datefmt=None):
+        # ISO 8601 in UTC with milliseconds, sortable across processes
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z'
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Waits for room in a full queue, the records before it get written
+        self.queue.put(self._sentinel)
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Hand records to a thread that writes them with `target`, so the thread
+    logging never waits on the disk (a slow write, an fsync, a rotation).
+
+        'file': {
+            '()': 'core.utils.log.BackgroundHandler',
+            'target': {'class': 'logging.handlers.RotatingFileHandler', 'filename': ..., 'maxBytes': ...},
+            'formatter': 'json',
+        }
+
+    The logging thread only merges the message arguments and renders the
+    traceback (both may refer to objects that change afterwards); the
+    formatter runs in the writer thread. The queue is bounded: when the
+    writer falls `queue_size` records behind, further records are counted
+    in `dropped` instead of blocking the request.
+    """
+
+    def __init__(self, target, queue_size=10000):
+        target = dict(target)
+        self.target = import_string(target.pop('class'))(**target)
+        super().__init__(queue.Queue(queue_size))
+        self.dropped = 0
+        self.listener = _Listener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip('\n')
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # Drains the queue, then stops the writer thread
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.target.close()
+        super().close()
@@ -0,0 +1,195 @@
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+import math
+import threading
+
+# RequestTimer of the request being measured, set by
+# core.middleware.RequestMetricsMiddleware (None when metrics are disabled)
+_current_timer = ContextVar('request_timer', default=None)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RequestTimer:
+    """ Time spent in the database, serializers and renderers during one request """
+    __slots__ = ('db', 'queries', 'sections', 'open')
+
+    def __init__(self):
+        self.db = 0.0
+        self.queries = 0
+        self.sections = {'serialize': 0.0, 'render': 0.0}
+        self.open = set()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """ connection.execute_wrapper() hook timing every query """
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self, total):
+        """ Server-Timing header value, durations in milliseconds """
+        return ', '.join([
+            f'app;dur={total * 1e3:.2f}',
+            f'db;dur={self.db * 1e3:.2f};desc="{self.queries} queries"',
+            *(f'{name};dur={seconds * 1e3:.2f}' for name, seconds in self.sections.items()),
+        ])
+
+
+def start_timer():
+    timer = RequestTimer()
+    return timer, _current_timer.set(timer)
+
+
+def stop_timer(token):
+    _current_timer.reset(token)
+
+
+def timed(section):
+    """
+    Add the time spent in the decorated function to `section` of the
+    current request's timer. Nested calls (a serializer expanding another
+    one) are counted once. Outside a measured request this is one
+    ContextVar lookup.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            timer = _current_timer.get()
+            if timer is None or section in timer.open:
+                return function(*args, **kwargs)
+            timer.open.add(section)
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timer.sections[section] += perf_counter() - started
+                timer.open.discard(section)
+        return wrapper
+    return decorator
+
+
+class Histogram:
+    """
+    Log-bucketed histogram: bucket i counts the values up to low * growth**i,
+    so a quantile is known within `growth` (10%) of its value, whatever
+    the number of observations, in a few hundred counters. Quantiles are
+    clamped to the smallest and largest values seen.
+    """
+    __slots__ = ('low', 'log_growth', 'bounds', 'buckets', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, low, high, growth=1.1):
+        self.low = low
+        self.log_growth = math.log(growth)
+        size = math.ceil(math.log(high / low) / self.log_growth) + 1
+        # The last bucket also holds everything above `high`
+        self.bounds = [low * growth ** i for i in range(size - 1)] + [math.inf]
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value):
+        index = 0 if value <= self.low else math.ceil(math.log(value / self.low) / self.log_growth)
+        self.buckets[min(index, len(self.buckets) - 1)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """ Upper bound of the bucket holding the q-th value, None when empty """
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= rank:
+                break
+        return max(self.min, min(bound, self.max))
+
+
+# name: (help, unit range of its histogram)
+METRICS = {
+    'request_duration_seconds': ("Wall time of the request", (1e-4, 120)),
+    'request_db_seconds': ("Time spent in database queries", (1e-5, 120)),
+    'request_db_queries': ("Number of database queries", (1, 1e5)),
+    'request_serialize_seconds': ("Time spent in serializers", (1e-5, 120)),
+    'request_render_seconds': ("Time spent rendering the response", (1e-5, 120)),
+    'response_size_bytes': ("Size of the response body", (1, 1e9)),
+}
+
+
+class MetricsRegistry:
+    """
+    In-process aggregates per (route, method): a request counter per status
+    code and a Histogram per METRICS entry, exposed in the Prometheus text
+    format as summaries (p50/p95/p99, sum, count). Each worker process has
+    its own registry, scrape them all to see every request.
+    """
+
+    def __init__(self, namespace='evman'):
+        self.namespace = namespace
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.statuses = {}
+
+    def observe(self, route, method, status, values):
+        with self.lock:
+            histograms = self.routes.get((route, method))
+            if histograms is None:
+                histograms = self.routes[(route, method)] = {
+                    name: Histogram(*bounds) for name, (_, bounds) in METRICS.items()
+                }
+            for name, value in values.items():
+                if value is not None:
+                    histograms[name].observe(value)
+            key = (route, method, status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+            self.statuses.clear()
+
+    def render(self):
+        """ The aggregates in the Prometheus text exposition format """
+        with self.lock:
+            routes = {key: {name: (histogram.count, histogram.sum, [histogram.quantile(q) for q in QUANTILES])
+                            for name, histogram in histograms.items()}
+                      for key, histograms in self.routes.items()}
+            statuses = dict(self.statuses)
+
+        lines = [
+            f'# HELP {self.namespace}_requests_total Requests served, per route, method and status',
+            f'# TYPE {self.namespace}_requests_total counter',
+        ]
+        for (route, method, status), count in sorted(statuses.items()):
+            lines.append(f'{self.namespace}_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+        for name, (description, _) in METRICS.items():
+            family = f'{self.namespace}_{name}'
+            lines += [f'# HELP {family} {description}', f'# TYPE {family} summary']
+            for (route, method), summaries in sorted(routes.items()):
+                count, total, quantiles = summaries[name]
+                if not count:
+                    continue
+                for q, value in zip(QUANTILES, quantiles):
+                    lines.append(f'{family}{_labels(route=route, method=method, quantile=q)} {value:.6g}')
+                lines.append(f'{family}_sum{_labels(route=route, method=method)} {total:.6g}')
+                lines.append(f'{family}_count{_labels(route=route, method=method)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+registry = MetricsRegistry()
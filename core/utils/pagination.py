@@ -0,0 +1,237 @@
+from collections import OrderedDict
+from functools import cached_property, partial
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+import base64
+import binascii
+import json
+
+
+def _encode_value(value):
+    # isoformat keeps the microseconds, the cursor must match rows exactly
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def can_estimate_count(queryset):
+    """ An unfiltered queryset on PostgreSQL: its row count is the table's """
+    return (connections[queryset.db].vendor == 'postgresql'
+            and not queryset.query.where and not queryset.query.distinct)
+
+
+def estimated_count(queryset, threshold):
+    """
+    pg_class.reltuples of the queryset's table when the queryset is not
+    filtered and the table holds at least `threshold` rows, None otherwise.
+    The estimate is refreshed by (auto)vacuum/analyze, good enough for a
+    page count on huge tables where an exact COUNT(*) is a full scan.
+    """
+    if not can_estimate_count(queryset):
+        return None
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                       [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] < threshold:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Django Paginator counting big unfiltered tables with estimated_count().
+    The rows are first counted up to `estimate_threshold` (COUNT(*) over a
+    LIMIT subquery), so smaller tables get their exact count in one query
+    and only a table reaching the threshold pays the catalog lookup.
+    """
+
+    def __init__(self, *args, estimate_threshold, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estimate_threshold = estimate_threshold
+
+    @cached_property
+    def count(self):
+        if not can_estimate_count(self.object_list):
+            return super().count
+        capped = self.object_list.order_by()[:self.estimate_threshold].count()
+        if capped < self.estimate_threshold:
+            return capped
+        estimate = estimated_count(self.object_list, self.estimate_threshold)
+        return super().count if estimate is None else estimate
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset (cursor) mode.
+
+    By default this is PageNumberPagination (COUNT(*) + OFFSET). With
+    ?pagination=cursor, or once a ?cursor= is given, pages are read with
+        WHERE (a, b) > (last a, last b) ORDER BY a, b LIMIT page_size + 1
+    on `keyset_ordering`, which must be unique (end it with the primary key)
+    and should be backed by an index. Deep pages then cost the same as the
+    first one, and no COUNT(*) is run, so the response has no "count".
+    """
+    keyset_ordering = ('id',)
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    # Row count above which unfiltered lists report an estimated count
+    # instead of a full COUNT(*), None to always count (PostgreSQL only)
+    estimated_count_threshold = None
+
+    def __init__(self):
+        if self.estimated_count_threshold is not None:
+            self.django_paginator_class = partial(
+                EstimatedCountPaginator, estimate_threshold=self.estimated_count_threshold
+            )
+
+    def cursor_mode(self, request):
+        return (self.cursor_query_param in request.query_params
+                or request.query_params.get(self.mode_query_param) == 'cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_mode(request)
+        if not self.use_cursor:
+            try:
+                return super().paginate_queryset(queryset, request, view)
+            except NotFound:
+                # Page out of range, see is_empty()
+                return []
+
+        self.request = request
+        self.has_next = self.has_previous = False
+        page_size = self.get_page_size(request)
+        try:
+            position, reverse = self.decode_cursor(request, queryset.model)
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            # Same outcome as a page number out of range: an empty page
+            return []
+
+        ordering = [f'-{field}' if reverse else field for field in self.keyset_ordering]
+        if position is not None:
+            queryset = queryset.filter(self.seek(position, reverse))
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page_rows = rows
+        return rows
+
+    def is_empty(self):
+        """
+        After paginate_queryset returned no rows: True when the whole list
+        is empty, False when only the requested page is (out of range).
+        Answered from the count or cursor already used, without a query.
+        """
+        if getattr(self, 'use_cursor', False):
+            return self.request.query_params.get(self.cursor_query_param) is None
+        paginator = getattr(self, 'django_paginator', None)
+        return paginator is None or paginator.count == 0
+
+    def get_page_state(self):
+        """ What a page's response says besides its rows: the count, or the cursor links """
+        if getattr(self, 'use_cursor', False):
+            return (self.has_next, self.has_previous)
+        return (self.page.paginator.count, self.page.number)
+
+    def get_page_number(self, request, paginator):
+        # Keep the paginator (and its cached count) for is_empty()
+        self.django_paginator = paginator
+        return super().get_page_number(request, paginator)
+
+    def seek(self, position, reverse):
+        """
+        Rows after `position` in keyset order, spelled out as
+            a > x OR (a = x AND b > y)
+        plus a leading a >= x so the index scan starts at the position.
+        """
+        op = 'lt' if reverse else 'gt'
+        first = self.keyset_ordering[0]
+        condition = Q()
+        for i, field in enumerate(self.keyset_ordering):
+            equal = {name: position[name] for name in self.keyset_ordering[:i]}
+            condition |= Q(**equal, **{f'{field}__{op}': position[field]})
+        return Q(**{f'{first}__{op}e': position[first]}) & condition
+
+    def decode_cursor(self, request, model):
+        """
+        (position, reverse) of the ?cursor= parameter, (None, False) without
+        one. The keyset values go through the model fields' to_python(), so
+        a tampered cursor fails here (ValueError, ValidationError, ...)
+        rather than in the query.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        values = payload.get('k') if isinstance(payload, dict) else None
+        # encode_cursor() writes one string per field of the ordering
+        if (not isinstance(values, list) or len(values) != len(self.keyset_ordering)
+                or not all(isinstance(value, str) for value in values)):
+            raise ValueError("Cursor does not match the ordering")
+        position = {
+            field: model._meta.get_field(field).to_python(value)
+            for field, value in zip(self.keyset_ordering, values)
+        }
+        return position, bool(payload.get('r'))
+
+    def encode_cursor(self, row, reverse):
+        # Pages are model instances or .values() rows
+        get = row.get if isinstance(row, dict) else partial(getattr, row)
+        payload = {'k': [_encode_value(get(field)) for field in self.keyset_ordering]}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not getattr(self, 'use_cursor', False):
+            return super().get_next_link()
+        if not self.has_next or not self.page_rows:
+            return None
+        return self.encode_cursor(self.page_rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not getattr(self, 'use_cursor', False):
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_rows:
+            return None
+        return self.encode_cursor(self.page_rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if not getattr(self, 'use_cursor', False):
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to "cursor" for keyset pagination (no count, stable deep pages).',
+                'schema': {'type': 'string', 'enum': ['page', 'cursor']},
+            },
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor taken from the next/previous link of a cursor mode page.',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -0,0 +1,24 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+import codecs
+import csv
+
+
+class CSVParser(BaseParser):
+    """
+    Parse a text/csv body into a list of dicts keyed by the header row,
+    the same shape as a JSON array of objects.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        try:
+            reader = csv.DictReader(codecs.getreader(encoding)(stream))
+            return [
+                {key.strip(): (value or '').strip() for key, value in row.items() if key}
+                for row in reader
+            ]
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ParseError(f"CSV parse error - {e}")
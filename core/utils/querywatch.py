@@ -0,0 +1,132 @@
+from collections import namedtuple
+from contextlib import contextmanager
+from time import perf_counter
+import os
+import re
+import sys
+
+CORE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.join(CORE_DIR, 'tests')
+_SKIPPED_FILES = (os.path.abspath(__file__), os.path.join(CORE_DIR, 'middleware.py'))
+
+# kind is 'n+1' or 'slow', frame a (path relative to the project, line,
+# function) of the code in core/ that ran the query, count the executions
+# of the shape in the request (1 for a slow query), duration in seconds
+Finding = namedtuple('Finding', ['kind', 'shape', 'count', 'duration', 'frame'])
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))+\s*\)')
+_SPACES = re.compile(r'\s+')
+_TRANSACTION = re.compile(r'^\s*(?:SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT)\b', re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """
+    The shape of a query: literals and placeholders as ?, IN lists of any
+    length as (?, ...), whitespace collapsed. Queries only differing by
+    their parameters share a shape.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _PLACEHOLDER_LIST.sub('(?, ...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def calling_frame():
+    """
+    Innermost frame in core/ outside this module, the middleware and other
+    execute_wrapper() hooks (core.utils.metrics), preferring application
+    code over core/tests. None when core/ is not on the stack.
+    """
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(CORE_DIR) and filename not in _SKIPPED_FILES
+                and frame.f_code.co_name != 'execute_wrapper'):
+            location = (os.path.relpath(filename, os.path.dirname(CORE_DIR)), frame.f_lineno, frame.f_code.co_name)
+            if not filename.startswith(TESTS_DIR):
+                return location
+            fallback = fallback or location
+        frame = frame.f_back
+    return fallback
+
+
+class QueryShapeDetector:
+    """
+    Group the queries of one request by shape (normalize_sql). A shape
+    executed `threshold` times is an N+1: a query run per row of an outer
+    loop instead of once for all rows. The stack is only walked when that
+    happens, and for queries slower than `slow_seconds`, so the code that
+    issued them can be reported.
+    """
+
+    def __init__(self, threshold, slow_seconds=None):
+        self.threshold = threshold
+        self.slow_seconds = slow_seconds
+        self.shapes = {}
+        self.slow = []
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """ connection.execute_wrapper() hook """
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, perf_counter() - started)
+
+    def record(self, sql, duration):
+        if _TRANSACTION.match(sql):
+            return
+        shape = normalize_sql(sql)
+        seen = self.shapes.get(shape)
+        if seen is None:
+            seen = self.shapes[shape] = [0, 0.0, None]
+        seen[0] += 1
+        seen[1] += duration
+        if seen[0] == self.threshold:
+            seen[2] = calling_frame()
+        if self.slow_seconds is not None and duration >= self.slow_seconds:
+            self.slow.append(Finding('slow', shape, 1, duration, calling_frame()))
+
+    def findings(self):
+        repeated = [
+            Finding('n+1', shape, count, duration, frame)
+            for shape, (count, duration, frame) in self.shapes.items()
+            if count >= self.threshold
+        ]
+        return repeated + self.slow
+
+
+_collectors = []
+
+
+@contextmanager
+def collect_findings():
+    """ List receiving the findings of the requests served in the block """
+    collected = []
+    _collectors.append(collected)
+    try:
+        yield collected
+    finally:
+        _collectors.remove(collected)
+
+
+def report(findings):
+    for collected in _collectors:
+        collected.extend(findings)
+
+
+def describe(finding):
+    where = '%s:%s in %s()' % finding.frame if finding.frame else 'outside core/'
+    if finding.kind == 'n+1':
+        return f"N+1: {finding.count} x {finding.shape} at {where}"
+    return f"Slow query ({finding.duration * 1e3:.0f} ms): {finding.shape} at {where}"
+
+
+def allow_n_plus_one(test):
+    """ Exempt a test from core.tests.runner's N+1 check (a known case) """
+    test.allow_n_plus_one = True
+    return test
@@ -0,0 +1,90 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+
+
+class CapacityReached(ValidationError):
+    """ No seat left on the event """
+
+
+def reserve_seats(event_id, seats=1):
+    """
+    Take `seats` seats on an event with a single conditional UPDATE:
+
+        UPDATE core_event SET registered_count = registered_count + n
+        WHERE id = %s AND registered_count + n <= capacity
+
+    The row lock taken by the UPDATE serializes concurrent registrations, so
+    the counter can never go past capacity. Must run inside the transaction
+    that inserts the attendees, so that a failed insert gives the seats back.
+    Returns False when the event does not have enough seats left. The
+    counter is internal bookkeeping, not part of the event's representation,
+    so updated_at (the event's ETag / Last-Modified) is left alone.
+    """
+    from ..models import Event
+
+    updated = Event.objects.filter(
+        pk=event_id,
+        registered_count__lte=F('capacity') - seats
+    ).update(registered_count=F('registered_count') + seats)
+    return updated == 1
+
+
+def release_seats(event_id, seats=1):
+    from ..models import Event
+
+    Event.objects.filter(pk=event_id, registered_count__gte=seats) \
+        .update(registered_count=F('registered_count') - seats)
+
+
+def import_attendees(rows):
+    """
+    Register a batch of already validated rows ({'name', 'email', 'event'}
+    with `event` a primary key) and return (created, errors), where errors
+    maps a row index to its message.
+
+    Instead of the per-attendee clean()/save() round trips, the batch costs a
+    fixed number of queries: one SELECT ... FOR UPDATE of the events, one
+    set-based lookup of the (event, email) pairs already registered, one seat
+    reservation UPDATE per event and the bulk INSERT. Rows beyond an event's
+    remaining seats are rejected, earlier rows win.
+    """
+    from ..models import Event, Attendee
+
+    errors = {}
+    event_ids = {row['event'] for row in rows}
+    emails = {row['email'] for row in rows}
+
+    with transaction.atomic():
+        # Locking the events serializes concurrent imports and registrations
+        events = Event.objects.select_for_update().only('id', 'capacity', 'registered_count').in_bulk(event_ids)
+        registered = set(
+            Attendee.objects.filter(event_id__in=events.keys(), email__in=emails)
+            .values_list('event_id', 'email')
+        )
+        seats_left = {pk: event.capacity - event.registered_count for pk, event in events.items()}
+
+        accepted = {}
+        for index, row in enumerate(rows):
+            event_id, email = row['event'], row['email']
+            if event_id not in events:
+                errors[index] = "Event not found."
+            elif (event_id, email) in registered:
+                errors[index] = "The fields email, event must make a unique set."
+            elif seats_left[event_id] <= 0:
+                errors[index] = "Event capacity has been reached."
+            else:
+                registered.add((event_id, email))
+                seats_left[event_id] -= 1
+                accepted[index] = Attendee(name=row['name'], email=email, event_id=event_id)
+
+        seats = {}
+        for attendee in accepted.values():
+            seats[attendee.event_id] = seats.get(attendee.event_id, 0) + 1
+        for event_id, count in seats.items():
+            # Cannot fail while the event row is locked
+            reserve_seats(event_id, count)
+
+        created = Attendee.objects.bulk_create(accepted.values(), batch_size=500)
+
+    return created, errors
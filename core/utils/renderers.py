@@ -0,0 +1,128 @@
+from functools import lru_cache
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from .metrics import timed
+import csv
+import io
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover, the stdlib encoder is used instead
+    orjson = None
+
+ENVELOPE_KEYS = ('success', 'message', 'data')
+PAGINATED_KEYS = ('count', 'next', 'previous', 'results')
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    text/csv, selected with ?format=csv or the Accept header. Exports are
+    streamed by the view (see core.utils.export), this renderer only handles
+    the regular Response objects of the same request, e.g. error envelopes,
+    as a header row plus one row per object.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    @timed('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """ application/x-ndjson, one JSON document per line (?format=ndjson) """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    @timed('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(json.dumps(row, default=str) + '\n' for row in rows).encode(self.charset)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer producing the same bytes, faster.
+
+    Documents are encoded by orjson when it is installed (UUIDs, dicts,
+    lists and strings natively, anything else through DRF's own encoder so
+    datetimes, Decimals and lazy strings come out exactly as before), by a
+    reused stdlib encoder otherwise. The only difference: NaN and Infinity,
+    which JSONRenderer refuses under STRICT_JSON, are written as null by
+    orjson. The BaseResponse envelope and the page wrapper around it are
+    not walked: their constant prefix is encoded once per message and
+    cached, only `data` / `results` are encoded per request.
+    Indented output (`application/json; indent=4`) is left to JSONRenderer.
+    """
+    _drf_encoder = JSONEncoder()
+    _stdlib_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+
+    @timed('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if not self.fast_path or self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return self.encode(data)
+
+    @property
+    def fast_path(self):
+        # The default COMPACT_JSON / UNICODE_JSON / STRICT_JSON settings
+        return self.compact and not self.ensure_ascii and self.strict and self.encoder_class is JSONEncoder
+
+    def encode(self, data):
+        if isinstance(data, dict):
+            keys = tuple(data)
+            if keys == ENVELOPE_KEYS and type(data['message']) is str and type(data['success']) is bool:
+                return _envelope_prefix(data['success'], data['message']) + self.encode(data['data']) + b'}'
+            if keys == PAGINATED_KEYS:
+                return (
+                    b'{"count":' + self.dumps(data['count'])
+                    + b',"next":' + self.dumps(data['next'])
+                    + b',"previous":' + self.dumps(data['previous'])
+                    + b',"results":' + self.encode(data['results']) + b'}'
+                )
+        return self.dumps(data)
+
+    @classmethod
+    def dumps(cls, data):
+        if orjson is not None:
+            try:
+                encoded = orjson.dumps(data, default=cls._drf_encoder.default, option=_ORJSON_OPTIONS)
+            except orjson.JSONEncodeError:
+                # e.g. integers beyond 64 bits or non str keys orjson refuses
+                encoded = cls._stdlib_encoder.encode(data).encode()
+        else:
+            encoded = cls._stdlib_encoder.encode(data).encode()
+        # Same escaping as JSONRenderer, those are valid JSON but not valid JavaScript
+        if b'\xe2\x80\xa8' in encoded or b'\xe2\x80\xa9' in encoded:
+            encoded = encoded.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return encoded
+
+
+if orjson is not None:
+    # Datetimes, dates and times go through DRF's encoder (millisecond
+    # precision, "Z" for UTC), str/dict/list subclasses are encoded natively
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+else:
+    _ORJSON_OPTIONS = None
+
+
+@lru_cache(maxsize=512)
+def _envelope_prefix(success, message):
+    """ b'{"success":true,"message":"...","data":' for one message """
+    return b'{"success":' + (b'true' if success else b'false') \
+        + b',"message":' + FastJSONRenderer.dumps(message) + b',"data":'
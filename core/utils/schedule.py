@@ -0,0 +1,148 @@
+from bisect import bisect_left
+from itertools import accumulate
+from django.db import transaction
+from .conditional import touch_event
+from .constraints import exclusion_violations_as, SESSION_OVERLAP_CONSTRAINT
+from .loaders import invalidate_current_event
+
+OVERLAP_MESSAGE = "Session overlaps with another session in the same track in event"
+
+
+class TrackSchedule:
+    """
+    The sessions of one track as sorted intervals, answering "what overlaps
+    [start, end)" with a binary search instead of a query per candidate.
+
+    Stored sessions are sorted by start time along with the running maximum
+    of their end times, so even overlapping legacy rows are all found: the
+    search walks back from the last session starting before `end` and stops
+    once nothing earlier ends after `start`. Sessions accepted from the
+    batch are disjoint by construction, their end times are sorted as well.
+    Each lookup is O(log n + k) for k conflicts, a batch O(n log n).
+    """
+
+    def __init__(self, stored=()):
+        stored = sorted(stored, key=lambda interval: interval[:2])
+        self.stored = stored
+        self.stored_starts = [start for start, _, _ in stored]
+        self.stored_max_ends = list(accumulate((end for _, end, _ in stored), max))
+        self.accepted = []
+        self.accepted_starts = []
+
+    def conflicts(self, start, end):
+        """ Keys of the (stored, accepted) intervals overlapping [start, end), in start order """
+        stored = []
+        i = bisect_left(self.stored_starts, end) - 1
+        while i >= 0 and self.stored_max_ends[i] > start:
+            if self.stored[i][1] > start:
+                stored.append(self.stored[i][2])
+            i -= 1
+
+        accepted = []
+        i = bisect_left(self.accepted_starts, end) - 1
+        while i >= 0 and self.accepted[i][1] > start:
+            accepted.append(self.accepted[i][2])
+            i -= 1
+
+        return stored[::-1], accepted[::-1]
+
+    def add(self, start, end, key):
+        i = bisect_left(self.accepted_starts, start)
+        self.accepted_starts.insert(i, start)
+        self.accepted.insert(i, (start, end, key))
+
+
+def check_schedule(candidates, stored):
+    """
+    Check a batch of sessions against each other and the stored ones.
+
+    `candidates` maps a key to (track id, start, end) and `stored` is an
+    iterable of (track id, start, end, session id). Earlier candidates win:
+    one that overlaps a stored session or an earlier accepted candidate is
+    rejected. Returns (accepted keys, {rejected key: (session ids, keys)}).
+    """
+    schedules = {}
+    for track_id, start, end, session_id in stored:
+        schedules.setdefault(track_id, []).append((start, end, session_id))
+    schedules = {track_id: TrackSchedule(intervals) for track_id, intervals in schedules.items()}
+
+    accepted, rejected = [], {}
+    for key, (track_id, start, end) in candidates.items():
+        schedule = schedules.get(track_id)
+        if schedule is None:
+            schedule = schedules[track_id] = TrackSchedule()
+        sessions, keys = schedule.conflicts(start, end)
+        if sessions or keys:
+            rejected[key] = (sessions, keys)
+        else:
+            schedule.add(start, end, key)
+            accepted.append(key)
+    return accepted, rejected
+
+
+def schedule_sessions(rows):
+    """
+    Create a batch of already validated sessions ({row key: {'title',
+    'description', 'speaker', 'event', 'track', 'start_time', 'end_time'}},
+    relations as primary keys) and return (created, errors), errors mapping
+    a row key to its serializer-like errors.
+
+    Runs the checks of SessionSerializer for the whole batch with a fixed
+    number of queries: the tracks (with their events) locked FOR UPDATE,
+    the stored sessions of those tracks within the batch's time range, and
+    one bulk INSERT. The accepted rows are written in one transaction.
+    """
+    from ..models import Track, Session
+
+    errors = {}
+    track_ids = {row['track'] for row in rows.values()}
+
+    with transaction.atomic():
+        # Locking the tracks serializes concurrent batches on the same tracks
+        tracks = Track.objects.select_for_update(of=('self',)).select_related('event').in_bulk(track_ids)
+
+        candidates = {}
+        for key, row in rows.items():
+            track = tracks.get(row['track'])
+            if track is None:
+                errors[key] = {"track": ["Track not found."]}
+            elif track.event_id != row['event']:
+                errors[key] = {"non_field_errors": ["Track does not belong to the selected event"]}
+            elif row['start_time'] < track.event.start_date or row['end_time'] > track.event.end_date:
+                errors[key] = {"non_field_errors": ["Session must be within event duration"]}
+            else:
+                candidates[key] = (track.pk, row['start_time'], row['end_time'])
+
+        stored = []
+        if candidates:
+            stored = Session.objects.filter(
+                track_id__in={track_id for track_id, _, _ in candidates.values()},
+                start_time__lt=max(end for _, _, end in candidates.values()),
+                end_time__gt=min(start for _, start, _ in candidates.values()),
+            ).values_list('track_id', 'start_time', 'end_time', 'id')
+
+        accepted, rejected = check_schedule(candidates, stored)
+        for key, (sessions, keys) in rejected.items():
+            errors[key] = {
+                "non_field_errors": [OVERLAP_MESSAGE],
+                "conflicts": {"sessions": sessions, "rows": keys},
+            }
+
+        sessions = [
+            Session(
+                title=rows[key]['title'], description=rows[key].get('description'), speaker=rows[key]['speaker'],
+                event_id=rows[key]['event'], track_id=rows[key]['track'],
+                start_time=rows[key]['start_time'], end_time=rows[key]['end_time'],
+            )
+            for key in accepted
+        ]
+        with exclusion_violations_as({SESSION_OVERLAP_CONSTRAINT: OVERLAP_MESSAGE}):
+            created = Session.objects.bulk_create(sessions, batch_size=500)
+
+        # bulk_create sends no post_save, do what core.signals would do
+        for event_id in {session.event_id for session in created}:
+            touch_event(event_id)
+        if created:
+            invalidate_current_event()
+
+    return created, errors
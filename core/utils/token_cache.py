@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+import hashlib
+import threading
+import time
+
+
+def _user_version_key(user_id):
+    return f"auth_token_version:{user_id}"
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of already verified access tokens.
+
+    Entries are keyed by a SHA-256 of the raw token and hold the validated
+    token plus a snapshot of the user's row, so a hit skips both the
+    signature check and the auth_user SELECT. An entry never outlives the
+    token's `exp` claim nor `timeout` seconds.
+
+    Revocation is checked against a per-user version kept in the shared
+    Django cache: bumping it (see invalidate_user) makes entries held by
+    every worker process stale.
+    """
+
+    def __init__(self, max_entries=1024, timeout=60):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash(raw_token):
+        return hashlib.sha256(raw_token.encode()).hexdigest()
+
+    def get(self, raw_token):
+        """ Return (user, validated_token) for a cached token, or None """
+        key = self._hash(raw_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+
+        if self.user_version(entry["user_id"]) != entry["version"]:
+            self.discard(raw_token)
+            return None
+
+        User = get_user_model()
+        user = User.from_db(entry["db"], entry["field_names"], entry["values"])
+        return user, entry["token"]
+
+    def user_version(self, user_id):
+        return cache.get(_user_version_key(user_id), 0)
+
+    def set(self, raw_token, validated_token, user, version):
+        """
+        Remember a verified token. `version` must be read with user_version()
+        before the user row was loaded, so that an invalidation racing with
+        the lookup leaves the entry stale instead of caching old user data.
+        """
+        expires_at = time.time() + self.timeout
+        exp = validated_token.payload.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+
+        field_names = [field.attname for field in user._meta.concrete_fields]
+        entry = {
+            "token": validated_token,
+            "user_id": user.pk,
+            "db": user._state.db,
+            "field_names": field_names,
+            "values": tuple(getattr(user, name) for name in field_names),
+            "version": version,
+            "expires_at": expires_at,
+        }
+
+        key = self._hash(raw_token)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, raw_token):
+        with self._lock:
+            self._entries.pop(self._hash(raw_token), None)
+
+    def invalidate_user(self, user_id):
+        """ Drop every cached token of a user, in this and other processes """
+        version_key = _user_version_key(user_id)
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, 1, timeout=None)
+
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry["user_id"] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(
+    max_entries=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 1024),
+    timeout=getattr(settings, "AUTH_TOKEN_CACHE_TIMEOUT", 60),
+)
@@ -0,0 +1,138 @@
+"""
+Write-path rules shared by the models' clean() and the serializers'
+validate(), so each rule (and its message) exists once. They raise Django's
+ValidationError, which DRF reports as a non field error.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.core.exceptions import ValidationError
+from django.db import connection
+from .constraints import exclusion_constraint_installed, EVENT_OVERLAP_CONSTRAINT, SESSION_OVERLAP_CONSTRAINT
+from .registration import CapacityReached
+
+_trusted_writes = ContextVar('trusted_writes', default=False)
+
+
+@contextmanager
+def trusted_writes():
+    """
+    Model.save() in this block does not run full_clean(): for callers that
+    already ran the rules below on the data they write, such as the
+    serializers. Bulk loaders (bulk_create) and fixtures (raw saves) never
+    go through save() in the first place. Database constraints still apply.
+    """
+    token = _trusted_writes.set(True)
+    try:
+        yield
+    finally:
+        _trusted_writes.reset(token)
+
+
+def validation_required():
+    """ False inside trusted_writes() """
+    return not _trusted_writes.get()
+
+
+def check_event_dates(start_date, end_date):
+    if end_date <= start_date:
+        raise ValidationError("End date must be after start date")
+
+
+def check_event_overlap(start_date, end_date, exclude_id=None):
+    """ Skipped when the event_no_overlap exclusion constraint checks it on write """
+    from ..models import Event
+
+    if exclusion_constraint_installed(EVENT_OVERLAP_CONSTRAINT):
+        return
+    if Event.objects.filter(start_date__lt=end_date, end_date__gt=start_date).exclude(id=exclude_id).exists():
+        raise ValidationError("Event overlaps with existing events")
+
+
+def event_timeline(start_date, end_date, exclude_id=None, overlap=True):
+    """
+    (latest end date, overlaps [start_date, end_date)) over the events other
+    than `exclude_id`, in one round trip. Both subqueries are answered by
+    the (end_date, start_date) index, which the database keeps current on
+    every write: the latest end date is its last entry, and the overlap
+    probe starts at end_date > start_date, nothing for an event placed
+    after the others. Neither depends on the number of past events.
+    `overlap=False` leaves the overlap to the exclusion constraint.
+    """
+    from ..models import Event
+
+    quote = connection.ops.quote_name
+    table = quote(Event._meta.db_table)
+    id_column, start_column, end_column = (
+        quote(Event._meta.get_field(name).column) for name in ('id', 'start_date', 'end_date')
+    )
+    others, others_params = ("TRUE", []) if exclude_id is None else (f"{id_column} <> %s", [exclude_id])
+
+    sql = f"SELECT (SELECT {end_column} FROM {table} WHERE {others} ORDER BY {end_column} DESC LIMIT 1)"
+    params = list(others_params)
+    if overlap:
+        sql += f", EXISTS (SELECT 1 FROM {table} WHERE {end_column} > %s AND {start_column} < %s AND {others})"
+        params += [start_date, end_date, *others_params]
+    else:
+        sql += ", FALSE"
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        latest_end_date, overlaps = cursor.fetchone()
+    return latest_end_date, bool(overlaps)
+
+
+def check_session(start_time, end_time, event, track, exclude_id=None):
+    """
+    Times in order and within the event, track of the same event, and no
+    overlap in the track (unless the exclusion constraint checks it on write).
+    `event` must be loaded, `track` only needs its event_id.
+    """
+    from ..models import Session
+
+    if end_time <= start_time:
+        raise ValidationError("End time must be after start time")
+
+    if start_time < event.start_date or end_time > event.end_date:
+        raise ValidationError("Session must be within event duration")
+
+    if track.event_id != event.pk:
+        raise ValidationError("Track does not belong to the selected event")
+
+    if not exclusion_constraint_installed(SESSION_OVERLAP_CONSTRAINT):
+        overlapping_sessions = Session.objects.filter(
+            track_id=track.pk,
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        ).exclude(id=exclude_id)
+        if overlapping_sessions.exists():
+            raise ValidationError("Session overlaps with another session in the same track in event")
+
+
+def check_capacity(registered_count, capacity):
+    """ Early answer only, the seat itself is taken by reserve_seats() on insert """
+    if registered_count >= capacity:
+        raise CapacityReached("Event capacity has been reached.")
+
+
+def check_track_name(name, event_id, exclude_id=None):
+    from ..models import Track
+
+    if Track.objects.filter(name=name, event_id=event_id).exclude(id=exclude_id).exists():
+        raise ValidationError({"name": "Track name must be unique within the event"})
+
+
+class TrustedWriteSerializerMixin:
+    """
+    ModelSerializer mixin for serializers whose validate() runs the rules
+    above: the instance is saved inside trusted_writes(), so the model does
+    not run them (and full_clean()'s field, unique and constraint queries)
+    a second time.
+    """
+
+    def create(self, validated_data):
+        with trusted_writes():
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with trusted_writes():
+            return super().update(instance, validated_data)